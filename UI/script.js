@@ -3,6 +3,12 @@ let responseTimeChartInstance;
 let topicTimelineChartInstance;
 let selectedTopics = [];
 let isDashboardInitialized = false;
+// Timeline buckets received so far, keyed by bucket start time
+let timelineBuckets = {};
+let timelineSince = 0;
+// Identifies this tab's conversation so the chit-chat model sees earlier turns
+const sessionId = sessionStorage.getItem('sessionId') || crypto.randomUUID();
+sessionStorage.setItem('sessionId', sessionId);
 
 function selectTopic(element) {
     const topic = element.textContent.trim();
@@ -37,27 +43,65 @@ function sendMessage() {
 }
 
 async function getBotResponse(message, topics) {
-    const response = await fetch('http://127.0.0.1:5000/chat', {
+    const response = await fetch('http://127.0.0.1:5000/chat/stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ message, topics }),
+        body: JSON.stringify({ message, topics, session_id: sessionId }),
     });
-    const data = await response.json();
 
     const chatMessages = document.getElementById('chat-messages');
-    const botMessage = `<div class="bot-message">${data.response}</div>`;
-    chatMessages.innerHTML += botMessage;
+    const botMessage = document.createElement('div');
+    botMessage.className = 'bot-message';
+    chatMessages.appendChild(botMessage);
+
+    if (!response.ok) {
+        // 503 while models are still loading or the server is at capacity
+        const data = await response.json();
+        botMessage.textContent = data.error;
+        return;
+    }
+
+    // Read Server-Sent Events frames ("data: {...}\n\n") as they arrive
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
 
-    chatMessages.scrollTop = chatMessages.scrollHeight;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            if (!frame.startsWith('data: ')) {
+                continue;
+            }
+            const event = JSON.parse(frame.slice(6));
+            if (event.type === 'token' || event.type === 'result' || event.type === 'error') {
+                botMessage.textContent += event.text;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            }
+        }
+    }
 }
 
 async function fetchMetrics() {
     try {
-        const response = await fetch('http://127.0.0.1:5000/metrics');
+        const response = await fetch(`http://127.0.0.1:5000/metrics?since=${timelineSince}`);
         const metrics = await response.json();
 
+        // Only buckets from timelineSince on are sent; the newest one may still be filling up
+        metrics.topic_timeline.forEach(bucket => {
+            timelineBuckets[bucket.timestamp] = bucket.counts;
+            timelineSince = Math.max(timelineSince, bucket.timestamp);
+        });
+
         document.getElementById('total-queries').textContent = metrics.total_queries;
         document.getElementById('chitchat-count').textContent = metrics.chitchat_count;
         document.getElementById('most-popular-topic').textContent = metrics.most_popular_topic;
@@ -68,12 +112,12 @@ async function fetchMetrics() {
         if (!isDashboardInitialized) {
             initializeQueriesChart(metrics.queries_by_topic);
             initializeResponseTimeChart(metrics.avg_response_times);
-            initializeTopicTimelineChart(metrics.topic_timeline);
+            initializeTopicTimelineChart(timelineBuckets);
             isDashboardInitialized = true;
         } else {
             updateQueriesChart(metrics.queries_by_topic);
             updateResponseTimeChart(metrics.avg_response_times);
-            updateTopicTimelineChart(metrics.topic_timeline);
+            updateTopicTimelineChart(timelineBuckets);
         }
     } catch (error) {
         console.error("Error fetching metrics:", error);
@@ -193,26 +237,13 @@ function updateTopicTimelineChart(topicTimeline) {
 
 // Prepare Topic Timeline Data
 function prepareTopicTimelineData(topicTimeline) {
-    const timeStamps = [];
-    const topicFrequency = {};
-
-    topicTimeline.forEach(item => {
-        const timestamp = new Date(item.timestamp * 1000).toLocaleTimeString();
-        if (!timeStamps.includes(timestamp)) {
-            timeStamps.push(timestamp);
-        }
-        if (!topicFrequency[timestamp]) {
-            topicFrequency[timestamp] = {};
-        }
-        topicFrequency[timestamp][item.topic] = (topicFrequency[timestamp][item.topic] || 0) + 1;
-    });
-
-    const labels = timeStamps;
+    const starts = Object.keys(topicTimeline).map(Number).sort((a, b) => a - b);
+    const labels = starts.map(start => new Date(start * 1000).toLocaleTimeString());
     const datasets = [];
-    const allTopics = [...new Set(topicTimeline.map(item => item.topic))];
+    const allTopics = [...new Set(starts.flatMap(start => Object.keys(topicTimeline[start])))];
 
     allTopics.forEach(topic => {
-        const topicData = labels.map(time => topicFrequency[time]?.[topic] || 0);
+        const topicData = starts.map(start => topicTimeline[start][topic] || 0);
         datasets.push({
             label: topic,
             data: topicData,
@@ -0,0 +1,236 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from bm25 import TOKEN_PATTERN
+from classifier import hash_token
+from corpus import iter_corpus
+from shards import file_fingerprint
+
+ANSWER_INDEX_PATH = "answer_index"
+QUERY_LOG_PATH = "query_log.jsonl"
+
+
+def normalize(query: str, topics=()) -> str:
+    # Questions differing only in case, punctuation or spacing share one form. Unlike
+    # the BM25 tokenizer no stop words are dropped: "not", "no" and the question word
+    # change the answer, and so does word order. The topics searched are part of the
+    # form since they change the answer too
+    return ",".join(sorted(topics or [])) + "\t" + " ".join(TOKEN_PATTERN.findall(query.lower()))
+
+
+def document_key(doc: dict) -> str:
+    # Same key Indexer.document_key gives the document in Solr
+    return doc.get("url") or doc.get("title")
+
+
+class QueryLog:
+    # One JSON line per answered message. Lines are written whole in append mode, so
+    # several pre-forked workers can share the file.
+    def __init__(self, path: str = QUERY_LOG_PATH):
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+        self.lock = threading.Lock()
+
+    def record(self, message: str, topics: list, answer: str):
+        # answer is "retrieval", "generation" or "index"
+        line = json.dumps({"time": time.time(), "message": message, "topics": topics or [], "answer": answer},
+                          ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+
+
+def mine_queries(records, min_count: int = 2, limit: int = 1000) -> list:
+    # The `limit` most frequent normalized forms of retrieval questions, seen at least
+    # min_count times, as (form, most common phrasing, its topics, count)
+    counts = Counter()
+    phrasings = defaultdict(Counter)
+    for record in records:
+        if record.get("answer") == "generation":
+            continue
+        topics = tuple(record.get("topics") or ())
+        form = normalize(record["message"], topics)
+        if not form.split("\t", 1)[1]:
+            continue
+        counts[form] += 1
+        phrasings[form][(record["message"], topics)] += 1
+    return [(form, *phrasings[form].most_common(1)[0][0], count)
+            for form, count in counts.most_common(limit) if count >= min_count]
+
+
+class AnswerIndex:
+    # Precomputed answers for frequent questions: sorted 64-bit hashes of the
+    # normalized question, memory-mapped and searched with searchsorted, pointing into
+    # a blob of JSON records (the record repeats the form, so a hash collision is a
+    # miss, never a wrong answer). Each record names the document it was answered from
+    # so the entry can be dropped when that document changes.
+    def __init__(self, path: str = ANSWER_INDEX_PATH):
+        self.path = path
+        self.stats = {"hits": 0, "misses": 0}
+        self.load()
+
+    def load(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        meta = {}
+        if os.path.isfile(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        if meta.get("entries"):
+            keys = np.load(os.path.join(self.path, "keys.npy"), mmap_mode="r")
+            offsets = np.load(os.path.join(self.path, "offsets.npy"), mmap_mode="r")
+            data = np.memmap(os.path.join(self.path, "data.bin"), dtype=np.uint8, mode="r")
+        else:
+            keys, offsets, data = np.zeros(0, dtype=np.uint64), np.zeros(1, dtype=np.int64), np.zeros(0, np.uint8)
+        # Swapped as one tuple so a concurrent lookup sees either the old or the new table
+        self.table = (keys, offsets, data)
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return len(self.table[0])
+
+    def record(self, position: int, table: tuple = None) -> dict:
+        _, offsets, data = table or self.table
+        return json.loads(data[offsets[position]:offsets[position + 1]].tobytes().decode("utf-8"))
+
+    def records(self) -> list:
+        table = self.table
+        return [self.record(position, table) for position in range(len(table[0]))]
+
+    def lookup(self, query: str, topics=()):
+        table = self.table
+        keys = table[0]
+        if len(keys):
+            form = normalize(query, topics)
+            key = hash_token(form)
+            position = int(np.searchsorted(keys, key))
+            if position < len(keys) and keys[position] == key:
+                record = self.record(position, table)
+                if record["form"] == form:
+                    self.stats["hits"] += 1
+                    return record["answer"]
+        self.stats["misses"] += 1
+        return None
+
+    @staticmethod
+    def write(path: str, records: list, corpus: dict = None):
+        # Files are replaced one by one (meta.json last), like the classifier artifact
+        by_key = {}
+        for record in records:
+            by_key.setdefault(hash_token(record["form"]), record)
+        keys = np.array(sorted(by_key), dtype=np.uint64)
+        blobs = [json.dumps(by_key[int(key)], ensure_ascii=False).encode("utf-8") for key in keys]
+        offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+
+        os.makedirs(path, exist_ok=True)
+        files = {"data.bin": b"".join(blobs), "keys.npy": keys, "offsets.npy": offsets,
+                 "meta.json": json.dumps({"entries": len(keys), "corpus": corpus, "built": time.time()})}
+        for name, content in files.items():
+            temporary = os.path.join(path, f".tmp-{os.getpid()}-{name}")
+            if isinstance(content, np.ndarray):
+                with open(temporary, "wb") as f:
+                    np.save(f, content)
+            else:
+                with open(temporary, "wb" if isinstance(content, bytes) else "w") as f:
+                    f.write(content)
+            os.replace(temporary, os.path.join(path, name))
+
+    def refresh(self, data_path: str) -> int:
+        # Run after re-indexing: drops the entries whose document was removed or has a
+        # new revision. Documents added since the build can change rankings too; those
+        # entries stay until the next offline build. Returns the number dropped.
+        if not os.path.isfile(data_path):
+            return 0
+        corpus = file_fingerprint(data_path)
+        if not len(self) or self.meta.get("corpus") == corpus:
+            return 0
+        revisions = {document_key(doc): str(doc.get("revision_id")) for doc in iter_corpus(data_path)}
+        records = self.records()
+        kept = [record for record in records if record["doc"] in revisions
+                and (record["revision"] is None or record["revision"] == revisions[record["doc"]])]
+        self.write(self.path, kept, corpus)
+        self.load()
+        return len(records) - len(kept)
+
+
+def build_answer_index(records, retriever, path: str = ANSWER_INDEX_PATH, min_count: int = 2, limit: int = 1000,
+                       data_path: str = None) -> list:
+    # The offline job: answers every frequent question form through the retriever
+    # and writes them as an AnswerIndex
+    entries = []
+    for form, message, topics, count in mine_queries(records, min_count, limit):
+        results = retriever.search(message, list(topics))
+        if not results:
+            continue
+        top = results[0]
+        entries.append({
+            "form": form,
+            "answer": retriever.format_results(results, message),
+            "doc": document_key(top),
+            "revision": None if top.get("revision_id") is None else str(top["revision_id"]),
+            "count": count,
+        })
+    corpus = file_fingerprint(data_path) if data_path and os.path.isfile(data_path) else None
+    AnswerIndex.write(path, entries, corpus)
+    return entries
+
+
+def replay(records, index: AnswerIndex, answer, limit: int = 200) -> dict:
+    # Hit rate of the index over logged retrieval questions, and the latency saved per
+    # hit: answer(message, topics) (the classify + retrieve path) against a lookup
+    questions = [record for record in records if record.get("answer") != "generation"]
+    hits = [record for record in questions if index.lookup(record["message"], record.get("topics")) is not None]
+    lookup_times, full_times = [], []
+    for record in hits[:limit]:
+        start = time.perf_counter()
+        index.lookup(record["message"], record.get("topics"))
+        lookup_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        answer(record["message"], record.get("topics") or [])
+        full_times.append(time.perf_counter() - start)
+    lookup = float(np.mean(lookup_times)) if hits else 0.0
+    full = float(np.mean(full_times)) if hits else 0.0
+    return {"questions": len(questions), "hits": len(hits), "hit_rate": len(hits) / max(1, len(questions)),
+            "lookup_ms": lookup * 1000, "full_ms": full * 1000,
+            "saved_seconds": (full - lookup) * len(hits)}
+
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+
+    os.environ.setdefault("CHATBOT_PRELOAD", "0")
+    from chatbot import RETRIEVER_BACKENDS, WikipediaRetriever
+    from classifier import load_classifier
+
+    parser = argparse.ArgumentParser(description="Build the answer index from the query log and report its hit rate")
+    parser.add_argument("--log", default=QUERY_LOG_PATH, help="JSON Lines query log (CHATBOT_QUERY_LOG)")
+    parser.add_argument("--output", default=ANSWER_INDEX_PATH)
+    parser.add_argument("--backend", default="solr", choices=RETRIEVER_BACKENDS)
+    parser.add_argument("--min-count", type=int, default=2)
+    parser.add_argument("--limit", type=int, default=1000, help="Number of question forms to precompute")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Newest share of the log used for the report")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    records = list(iter_corpus(args.log))
+    split = int(len(records) * (1 - args.holdout))
+    retriever = WikipediaRetriever(args.backend)
+    entries = build_answer_index(records[:split], retriever, args.output, args.min_count, args.limit,
+                                 retriever.data_path)
+    print(f"{len(entries)} answers from {split} logged messages written to {args.output}")
+
+    classifier = load_classifier()
+
+    def answer(message, topics):
+        classifier.predict_proba([message])
+        return retriever.get_data(message, topics)
+
+    report = replay(records[split:], AnswerIndex(args.output), answer)
+    print(f"held-out: {report['hits']} / {report['questions']} questions answered from the index "
+          f"({report['hit_rate']:.1%}), {report['lookup_ms']:.3f}ms vs {report['full_ms']:.1f}ms, "
+          f"{report['saved_seconds']:.1f}s saved")
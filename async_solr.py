@@ -0,0 +1,89 @@
+import asyncio
+import os
+import threading
+
+import aiohttp
+
+
+class LoopThread:
+    # A long-lived event loop on a daemon thread, so the pooled session outlives any
+    # single request loop (Flask runs each async view in its own loop)
+    def __init__(self):
+        self.loop = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        with self.lock:
+            if self.loop is None or self.pid != os.getpid():
+                self.loop = asyncio.new_event_loop()
+                self.pid = os.getpid()
+                threading.Thread(target=self.loop.run_forever, daemon=True).start()
+            return self.loop
+
+    def run(self, coro, timeout: float = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop()).result(timeout)
+
+    async def run_async(self, coro):
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.get_loop()))
+
+
+class AsyncSolrClient:
+    # Sends one edismax request per (core, topic) concurrently over a pooled keep-alive
+    # session and merges the hits by score. Reuses the Indexer's query parameters.
+    def __init__(self, indexer, cores: list = None, pool_size: int = 32, connect_timeout: float = 1.0,
+                 request_timeout: float = 5.0):
+        self.indexer = indexer
+        self.cores = cores or [indexer.core_name]
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=request_timeout, connect=connect_timeout)
+        self.session = None
+        self.session_loop = None
+        self.loop_thread = LoopThread()
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # Must be called on the loop thread; sessions are bound to their loop
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self.session_loop = loop
+        return self.session
+
+    async def search_core(self, core: str, query: str, topics: list, k: int) -> list:
+        params = {**self.indexer.search_params(topics, k), "q": query, "wt": "json"}
+        async with self.get_session().get(self.indexer.solr_url + core + "/select", params=params) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        return data["response"]["docs"]
+
+    async def search(self, query: str, topics: list, k: int = 10) -> list:
+        # One request per topic and core; a failing or slow shard only loses its own hits
+        requests = [self.search_core(core, query, [topic] if topic else [], k)
+                    for core in self.cores for topic in (topics or [None])]
+        results = await asyncio.gather(*requests, return_exceptions=True)
+
+        merged, seen = [], set()
+        for result in results:
+            if isinstance(result, Exception):
+                continue
+            for doc in result:
+                key = doc.get("id") or doc.get("url") or doc.get("title")
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(doc)
+        if results and all(isinstance(result, Exception) for result in results):
+            raise results[0]
+        merged.sort(key=lambda doc: doc.get("score", 0), reverse=True)
+        return merged[:k]
+
+    async def query_async(self, query: str, topics: list, k: int = 10) -> list:
+        # Awaitable from any event loop
+        return await self.loop_thread.run_async(self.search(query, topics, k))
+
+    def query_solr(self, query: str, topics: list, k: int = 10) -> list:
+        return self.loop_thread.run(self.search(query, topics, k))
+
+    def close(self):
+        if self.session is not None:
+            self.loop_thread.run(self.session.close())
@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import tempfile
+
+os.environ.setdefault("CHATBOT_PRELOAD", "0")
+
+import logging
+
+from answer_index import AnswerIndex, build_answer_index, replay
+from chatbot import WikipediaRetriever
+from classifier import load_classifier
+from fake_solr import FakeSolr
+from indexer import Indexer
+from wikiqa import load_wikiqa
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+
+# chatbot logs every Solr request at DEBUG
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def variant(question: str, rng: random.Random) -> str:
+    # The same question as users retype it: case, punctuation and spacing change
+    text = question.lower() if rng.random() < 0.3 else question
+    text = text.rstrip("?") if rng.random() < 0.3 else text
+    return text.replace(" ", "  ", 1) if rng.random() < 0.1 else text
+
+
+def synthetic_log(questions: list, messages: int, zipf: float, seed: int = 0) -> list:
+    # Question popularity follows a Zipf law, like most of our traffic
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** zipf for rank in range(len(questions))]
+    picks = rng.choices(questions, weights=weights, k=messages)
+    return [{"message": variant(question, rng), "topics": [], "answer": "retrieval"} for question in picks]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer index hit rate and latency saved on a synthetic query log")
+    parser.add_argument("--data", nargs="+", default=["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--solr-delay", type=float, default=0.005, help="Simulated latency of the fake Solr")
+    parser.add_argument("--limits", type=int, nargs="+", default=[100, 300, 1000])
+    args = parser.parse_args()
+
+    docs, questions = load_wikiqa(args.data)
+    fake = FakeSolr([{**doc, "id": doc["url"]} for doc in docs], FIELD_WEIGHTS, delay=args.solr_delay)
+    indexer = Indexer("IRF24P3", "127.0.0.1", ["title", "summary", "url"], FIELD_WEIGHTS, port=fake.start())
+    retriever = WikipediaRetriever(rerank_top_n=0, indexer=indexer)
+    classifier = load_classifier()
+
+    def answer(message, topics):
+        classifier.predict_proba([message])
+        return retriever.get_data(message, topics)
+
+    records = synthetic_log([question["question"] for question in questions], args.messages, args.zipf)
+    split = int(len(records) * 0.8)
+    print(f"{len(records)} logged messages over {len(questions)} distinct questions, zipf {args.zipf}")
+    with tempfile.TemporaryDirectory() as directory:
+        for limit in args.limits:
+            path = os.path.join(directory, str(limit))
+            entries = build_answer_index(records[:split], retriever, path, limit=limit)
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            report = replay(records[split:], AnswerIndex(path), answer)
+            print(f"top {limit:5d}: {len(entries):5d} entries {size / 1024:7.1f} KiB  hit rate {report['hit_rate']:.1%}  "
+                  f"lookup {report['lookup_ms'] * 1000:.1f}us vs {report['full_ms']:.1f}ms  "
+                  f"saved {report['saved_seconds']:.1f}s over {report['questions']} messages")
+    fake.stop()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import time
+
+from async_solr import AsyncSolrClient
+from bench_utils import Timer, summarize, print_summary
+from fake_solr import FakeSolr
+from indexer import Indexer
+from wikiqa import load_wikiqa
+
+TOPICS = ["Health", "Environment", "Technology", "Economy", "Sports"]
+
+
+def assign_topics(docs: list) -> list:
+    return [{**doc, "id": doc["url"], "topic": TOPICS[i % len(TOPICS)]} for i, doc in enumerate(docs)]
+
+
+def run_sync(indexer: Indexer, questions: list, topics: list) -> dict:
+    # One blocking request per topic, one after the other
+    latencies = []
+    with Timer() as total:
+        for question in questions:
+            start = time.perf_counter()
+            for topic in topics:
+                indexer.query_solr(question, [topic])
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies, total.elapsed)
+
+
+async def run_async(client: AsyncSolrClient, questions: list, topics: list, concurrency: int) -> dict:
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(question):
+        async with limit:
+            start = time.perf_counter()
+            await client.query_async(question, topics)
+            latencies.append(time.perf_counter() - start)
+
+    with Timer() as total:
+        await asyncio.gather(*(one(question) for question in questions))
+    return summarize(latencies, total.elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async fan-out Solr queries (fake Solr by default)")
+    parser.add_argument("--vm-ip", default=None, help="Query a real Solr instead of the local fake")
+    parser.add_argument("--delay", type=float, default=0.02, help="Simulated per-request latency of the fake")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    docs, questions = load_wikiqa(["data/WikiQA-dev.tsv"])
+    questions = [q["question"] for q in questions[:args.questions]]
+
+    fake = None
+    if args.vm_ip is None:
+        fake = FakeSolr(assign_topics(docs), delay=args.delay)
+        indexer = Indexer("IRF24P3", "127.0.0.1", ["title", "summary"], FakeSolr().field_weights, port=fake.start())
+    else:
+        indexer = Indexer("IRF24P3", args.vm_ip, ["title", "summary"], {"title": 1.0, "summary": 3.0})
+
+    client = AsyncSolrClient(indexer)
+    for count in (1, 3, len(TOPICS)):
+        topics = TOPICS[:count]
+        print_summary(f"sync, {count} topics", run_sync(indexer, questions, topics))
+        print_summary(f"async fan-out, {count} topics", asyncio.run(run_async(client, questions, topics, args.concurrency)))
+
+    client.close()
+    if fake is not None:
+        fake.stop()
@@ -0,0 +1,56 @@
+import argparse
+import time
+from collections import Counter
+
+import samples
+from bench_utils import summarize, print_summary
+from chat import BACKENDS, LATENCY_GENERATION, ChitChatAPI
+
+
+def token_f1(prediction: str, reference: str) -> float:
+    pred, ref = prediction.lower().split(), reference.lower().split()
+    common = sum((Counter(pred) & Counter(ref)).values())
+    if common == 0:
+        return 0.0
+    precision, recall = common / len(pred), common / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run(chatter: ChitChatAPI, messages: list) -> tuple:
+    replies, latencies = [], []
+    start_all = time.perf_counter()
+    for message in messages:
+        start = time.perf_counter()
+        replies.append(chatter.get_responses([message])[0])
+        latencies.append(time.perf_counter() - start)
+    return replies, summarize(latencies, time.perf_counter() - start_all)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and quality of chit-chat inference backends")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--cache-dir", default="model_cache")
+    args = parser.parse_args()
+
+    messages = samples.chats[:args.messages]
+
+    # The existing fp32 model with checkpoint generation defaults is the quality reference
+    reference_replies, reference = run(ChitChatAPI(), messages)
+    print_summary("torch / default generation", reference)
+
+    for backend in args.backends:
+        for setting, kwargs in [("default", {}), ("latency", LATENCY_GENERATION)]:
+            if backend == "torch" and setting == "default":
+                continue
+            try:
+                chatter = ChitChatAPI(backend=backend, generation_kwargs=kwargs, cache_dir=args.cache_dir)
+            except ImportError as e:
+                print(f"{backend}: skipped ({e})")
+                break
+            chatter.get_responses(messages[:1])  # warm up
+            replies, summary = run(chatter, messages)
+            f1 = sum(token_f1(r, ref) for r, ref in zip(replies, reference_replies)) / len(messages)
+            exact = sum(r == ref for r, ref in zip(replies, reference_replies)) / len(messages)
+            print_summary(f"{backend} / {setting} generation", summary)
+            print(f"  speedup x{reference['p50'] / summary['p50']:.2f}, token F1 vs fp32 {f1:.3f}, exact match {exact:.2f}")
@@ -0,0 +1,46 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import samples
+from bench_utils import Timer, summarize, print_summary
+from chat import ChitChatAPI
+
+
+def run_sequential(chatter: ChitChatAPI, messages: list) -> dict:
+    # The old path: one tokenize + generate per message
+    latencies = []
+    with Timer() as total:
+        for message in messages:
+            start = time.perf_counter()
+            chatter.get_responses([message])
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies, total.elapsed)
+
+
+def run_concurrent(chatter: ChitChatAPI, messages: list, clients: int) -> dict:
+    def timed(message):
+        start = time.perf_counter()
+        chatter.get_response(message)
+        return time.perf_counter() - start
+
+    with Timer() as total:
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            latencies = list(executor.map(timed, messages))
+    return summarize(latencies, total.elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare one-at-a-time and micro-batched chit-chat generation")
+    parser.add_argument("--messages", type=int, default=32)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch-window", type=float, default=0.01)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    messages = (samples.chats * (args.messages // len(samples.chats) + 1))[:args.messages]
+    chatter = ChitChatAPI(batch_window=args.batch_window, max_batch_size=args.max_batch_size)
+    chatter.get_responses(messages[:1])  # warm up
+
+    print_summary("sequential", run_sequential(chatter, messages))
+    print_summary(f"batched ({args.clients} clients)", run_concurrent(chatter, messages, args.clients))
@@ -0,0 +1,41 @@
+import argparse
+
+import numpy as np
+
+import samples
+from bench_utils import Timer
+from classifier import PromptClassifier, LinearPromptClassifier
+from wikiqa import load_wikiqa
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the sklearn classifier with the exported linear model")
+    parser.add_argument("--linear-path", default="classifier_linear")
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+
+    with Timer() as load:
+        sklearn_model = PromptClassifier()
+    print(f"sklearn load        {load.elapsed * 1000:10.2f}ms")
+    sklearn_model.export_linear(args.linear_path)
+    with Timer() as load:
+        linear_model = LinearPromptClassifier(args.linear_path)
+    print(f"linear load         {load.elapsed * 1000:10.2f}ms")
+
+    _, questions = load_wikiqa(['data/WikiQA-test.tsv', 'data/WikiQA-dev.tsv'])
+    texts = samples.queries + samples.chats + [question["question"] for question in questions]
+    messages = (texts * (args.messages // len(texts) + 1))[:args.messages]
+
+    expected = sklearn_model.predict(messages)
+    actual = linear_model.predict(messages)
+    print(f"identical predictions: {int(np.sum(expected == actual))} / {len(messages)}")
+    probabilities = sklearn_model.classifier.predict_proba(sklearn_model.vectorizer.transform(messages))
+    print(f"max probability difference: {np.abs(probabilities - linear_model.predict_proba(messages)).max():.2e}")
+
+    for name, model in [("sklearn", sklearn_model), ("linear", linear_model)]:
+        with Timer() as single:
+            for message in messages[:1000]:
+                model.predict([message])
+        with Timer() as batch:
+            model.predict(messages)
+        print(f"{name:8s} single {single.elapsed / 1000 * 1e6:8.1f}us/msg   "
+              f"batch {len(messages) / batch.elapsed / 1000:8.1f} msgs/ms")
@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from bench_utils import Timer
+from corpus import CorpusWriter, convert, iter_corpus
+
+
+def synthetic_docs(count: int):
+    for i in range(count):
+        yield {"title": f"Article {i}", "revision_id": 1000 + i, "topic": f"Topic {i % 10}",
+               "url": f"https://en.wikipedia.org/wiki/Article_{i}",
+               "summary": f"Article {i} is about subject {i % 97}. " * 20}
+
+
+def measure(name: str, read):
+    tracemalloc.start()
+    with Timer() as timer:
+        count = read()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:28s} {count:7d} docs {timer.elapsed:7.2f}s  peak {peak / 2 ** 20:8.1f} MiB")
+
+
+def count_docs(docs) -> int:
+    return sum(1 for _ in docs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak memory of reading a scraped corpus whole vs streamed")
+    parser.add_argument("--docs", type=int, default=50000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        legacy = os.path.join(root, "scraped_data.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump(list(synthetic_docs(args.docs)), f, ensure_ascii=False, indent=4)
+        jsonl = os.path.join(root, "scraped_data.jsonl")
+        with CorpusWriter(jsonl, append=False) as writer:
+            writer.write_many(synthetic_docs(args.docs))
+        compressed = os.path.join(root, "scraped_data.jsonl.gz")
+        convert(legacy, compressed)
+        for path in (legacy, jsonl, compressed):
+            print(f"{os.path.basename(path):28s} {os.path.getsize(path) / 2 ** 20:8.1f} MiB on disk")
+
+        def load_whole():
+            with open(legacy, "r", encoding="utf-8") as f:
+                return len(json.load(f))
+
+        measure("json.load (old)", load_whole)
+        measure("iter_corpus legacy .json", lambda: count_docs(iter_corpus(legacy)))
+        measure("iter_corpus .jsonl", lambda: count_docs(iter_corpus(jsonl)))
+        measure("iter_corpus .jsonl.gz", lambda: count_docs(iter_corpus(compressed)))
+        assert all(a == b for a, b in zip(iter_corpus(legacy), iter_corpus(compressed)))
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from crawler import Crawler, WikipediaAPI
+from fake_wikipedia import FakeWikipedia, generate_pages
+
+TOPICS = {f"Topic {i}": [f"Page {i * 10}", f"Page {i * 10 + 1}"] for i in range(5)}
+
+
+def crawl(port: int, workers: int, min_docs: int, checkpoint_dir: str, stop_after: int = None) -> dict:
+    crawler = Crawler(TOPICS, checkpoint_dir, min_docs, workers,
+                      WikipediaAPI(f"http://127.0.0.1:{port}/w/api.php", rate=0, backoff=0.01))
+    if stop_after is not None:
+        # Simulate an interrupted crawl
+        def watch():
+            while sum(crawler.counts.values()) < stop_after and not crawler.stopping.is_set():
+                crawler.stopping.wait(0.01)
+            crawler.stop()
+
+        threading.Thread(target=watch, daemon=True).start()
+    return crawler.run()
+
+
+def check_docs(checkpoint_dir: str) -> tuple:
+    with open(os.path.join(checkpoint_dir, "docs.jsonl"), "r", encoding="utf-8") as f:
+        ids = [(doc["topic"], doc["pageid"]) for doc in map(json.loads, f)]
+    return len(ids), len(set(ids))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawler throughput, retries and resume against a fake Wikipedia")
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--min-docs", type=int, default=60)
+    parser.add_argument("--delay", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    fake = FakeWikipedia(generate_pages(args.pages, redirects=args.pages // 10), delay=args.delay)
+    port = fake.start()
+    root = tempfile.mkdtemp()
+    try:
+        for workers in (1, len(TOPICS), args.workers):
+            stats = crawl(port, workers, args.min_docs, os.path.join(root, f"w{workers}"))
+            print(f"{workers:3d} workers: {stats['docs']} docs in {stats['seconds']:.2f}s "
+                  f"({stats['docs'] / stats['seconds']:.0f} docs/s), {stats.get('duplicates', 0)} duplicates skipped")
+
+        fake.error_rate = 0.2
+        stats = crawl(port, args.workers, args.min_docs, os.path.join(root, "errors"))
+        print(f"20% errors: {stats['docs']} docs, {stats.get('retries', 0)} retries, {stats.get('failed', 0)} failed")
+        fake.error_rate = 0.0
+
+        path = os.path.join(root, "resume")
+        first = crawl(port, args.workers, args.min_docs, path, stop_after=args.min_docs * len(TOPICS) // 2)
+        second = crawl(port, args.workers, args.min_docs, path)
+        total, unique = check_docs(path)
+        print(f"resume: {first['docs']} docs before the interruption, {second['docs']} after; "
+              f"{total} lines, {unique} unique (topic, page id) pairs")
+    finally:
+        fake.stop()
+        shutil.rmtree(root)
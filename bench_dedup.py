@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from bench_utils import Timer
+from corpus import CorpusWriter, iter_corpus
+from dedup import dedup_corpus
+from wikiqa import load_wikiqa
+
+TOPICS = ["Health", "Environment", "Technology", "Economy", "Sports"]
+
+
+def perturb(text: str, rng: random.Random, edits: int) -> str:
+    # A mirror or lightly edited copy: a few words dropped or replaced
+    words = text.split()
+    for _ in range(edits):
+        position = rng.randrange(len(words))
+        if rng.random() < 0.5:
+            del words[position]
+        else:
+            words[position] = "edited"
+    return " ".join(words)
+
+
+def build_corpus(path: str, docs: list, rate: float, seed: int = 0) -> set:
+    # Original docs plus injected exact copies (same url, other topic), near copies
+    # (new url, perturbed summary) and boilerplate stubs; returns the injected urls
+    rng = random.Random(seed)
+    injected = set()
+    with CorpusWriter(path, append=False) as writer:
+        for i, doc in enumerate(docs):
+            writer.write({**doc, "topic": TOPICS[i % len(TOPICS)]})
+            if rng.random() < rate:
+                writer.write({**doc, "topic": TOPICS[(i + 1) % len(TOPICS)]})
+            if rng.random() < rate and len(doc["summary"].split()) > 60:
+                url = doc["url"] + "-mirror"
+                writer.write({**doc, "url": url, "topic": TOPICS[i % len(TOPICS)],
+                              "summary": perturb(doc["summary"], rng, 2)})
+                injected.add(url)
+            if rng.random() < rate / 2:
+                writer.write({"title": doc["title"] + " (disambiguation)", "url": doc["url"] + "-disambiguation",
+                              "summary": f"{doc['title']} may refer to:", "topic": TOPICS[i % len(TOPICS)]})
+    return injected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate removal on WikiQA with injected copies")
+    parser.add_argument("--rate", type=float, default=0.1)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    docs, _ = load_wikiqa(["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    root = tempfile.mkdtemp()
+    try:
+        source, destination = os.path.join(root, "corpus.jsonl"), os.path.join(root, "dedup.jsonl")
+        injected = build_corpus(source, docs, args.rate)
+        with Timer() as timer:
+            report = dedup_corpus(source, destination, args.threshold)
+        print(report)
+        print(f"{report['documents'] / timer.elapsed:.0f} docs/s, saved {report['documents'] - report['kept']} docs "
+              f"and {report['bytes_saved'] / 1024:.0f} KiB of {report['bytes'] / 1024:.0f} KiB")
+
+        kept = {doc["url"] for doc in iter_corpus(destination)}
+        originals = {doc["url"] for doc in docs}
+        print(f"near copies removed: {len(injected - kept)} / {len(injected)}; "
+              f"originals lost: {len(originals - kept)} / {len(originals)}")
+    finally:
+        shutil.rmtree(root)
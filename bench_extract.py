@@ -0,0 +1,45 @@
+import argparse
+import csv
+import time
+
+from bench_utils import summarize, print_summary
+from extract import SentenceExtractor
+from wikiqa import load_wikiqa
+
+
+def load_answers(path: str) -> list:
+    # (question, document id, answer sentence) rows of WikiQASent.pos.ans.tsv
+    with open(path, "r", encoding="utf-8") as f:
+        return [(row["Question"], row["DocumentID"], row["Sentence"])
+                for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer-sentence extraction vs returning the summary on WikiQA")
+    parser.add_argument("--data", nargs="+", default=["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    parser.add_argument("--answers", default="data/WikiQASent.pos.ans.tsv")
+    parser.add_argument("--max-chars", type=int, nargs="+", default=[200, 400, 800])
+    args = parser.parse_args()
+
+    docs = {doc["url"]: doc for doc in load_wikiqa(args.data)[0]}
+    answers = [(question, docs[doc_id]["summary"], sentence) for question, doc_id, sentence in load_answers(args.answers)
+               if doc_id in docs]
+    full = sum(len(summary) for _, summary, _ in answers) / len(answers)
+    print(f"{len(answers)} answer sentences; full summaries average {full:.0f} chars")
+
+    for max_chars in args.max_chars:
+        extractor = SentenceExtractor(max_chars=max_chars)
+        hits = lead_hits = size = 0
+        latencies = []
+        start_all = time.perf_counter()
+        for question, summary, sentence in answers:
+            start = time.perf_counter()
+            text = extractor.extract(question, summary)
+            latencies.append(time.perf_counter() - start)
+            size += len(text)
+            hits += sentence in text
+            # What a plain cut of the summary at the same size would show
+            lead_hits += sentence in summary[:max_chars]
+        print_summary(f"extract <= {max_chars} chars", summarize(latencies, time.perf_counter() - start_all))
+        print(f"  answer sentence included: {hits / len(answers):.3f} (leading {max_chars} chars: "
+              f"{lead_hits / len(answers):.3f}), average {size / len(answers):.0f} chars")
@@ -0,0 +1,60 @@
+import argparse
+import math
+import time
+
+from bench_utils import summarize, print_summary
+from bm25 import BM25Index
+from rerank import CrossEncoderReranker, RERANK_MODEL
+from wikiqa import load_wikiqa
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+
+
+def rank_metrics(results: list, gold: str, k: int = 10) -> tuple:
+    # Reciprocal rank and nDCG@k with a single relevant document
+    for rank, result in enumerate(results[:k], start=1):
+        if result.get("url") == gold:
+            return 1.0 / rank, 1.0 / math.log2(rank + 1)
+    return 0.0, 0.0
+
+
+def evaluate(index: BM25Index, questions: list, reranker: CrossEncoderReranker = None, candidates: int = 10) -> dict:
+    mrr, ndcg, latencies = 0.0, 0.0, []
+    start_all = time.perf_counter()
+    for question in questions:
+        start = time.perf_counter()
+        results = index.query_solr(question["question"], [], max(10, candidates))
+        if reranker is not None:
+            results = reranker.rerank(question["question"], results)
+        latencies.append(time.perf_counter() - start)
+        rr, gain = rank_metrics(results, question["document_id"])
+        mrr += rr
+        ndcg += gain
+    return {"mrr": mrr / len(questions), "ndcg": ndcg / len(questions),
+            "latency": summarize(latencies, time.perf_counter() - start_all)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MRR/nDCG@10 on WikiQA: BM25 alone vs BM25 + cross-encoder rerank")
+    parser.add_argument("--data", nargs="+", default=["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    parser.add_argument("--model", default=RERANK_MODEL)
+    parser.add_argument("--top-n", type=int, nargs="+", default=[5, 10, 20, 50])
+    parser.add_argument("--budget", type=float, default=1.0, help="Latency budget per rerank pass in seconds")
+    parser.add_argument("--questions", type=int, default=None)
+    args = parser.parse_args()
+
+    docs, questions = load_wikiqa(args.data)
+    questions = questions[:args.questions]
+    index = BM25Index.build(docs, FIELD_WEIGHTS)
+    print(f"{len(docs)} documents, {len(questions)} questions")
+
+    result = evaluate(index, questions)
+    print_summary("bm25 only", result["latency"])
+    print(f"  MRR {result['mrr']:.3f}  nDCG@10 {result['ndcg']:.3f}")
+
+    scorer = CrossEncoderReranker(args.model).load().scorer
+    for top_n in args.top_n:
+        reranker = CrossEncoderReranker(args.model, top_n=top_n, budget=args.budget, scorer=scorer)
+        result = evaluate(index, questions, reranker, top_n)
+        print_summary(f"rerank top {top_n}", result["latency"])
+        print(f"  MRR {result['mrr']:.3f}  nDCG@10 {result['ndcg']:.3f}  fallbacks {dict(reranker.stats)}")
@@ -0,0 +1,77 @@
+import argparse
+import time
+
+from bench_utils import summarize, print_summary
+from bm25 import BM25Index
+from dense import DenseIndex, HybridRetriever
+from wikiqa import load_wikiqa
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+
+
+def evaluate(backend, questions: list, k: int) -> tuple:
+    # Recall@k of the gold WikiQA document plus per-query latency
+    hits, latencies = 0, []
+    start_all = time.perf_counter()
+    for question in questions:
+        start = time.perf_counter()
+        results = backend.query_solr(question["question"], ["WikiQA"], k)
+        latencies.append(time.perf_counter() - start)
+        hits += any(result.get("url") == question["document_id"] for result in results)
+    return hits / len(questions), summarize(latencies, time.perf_counter() - start_all)
+
+
+def evaluate_batched(backend: DenseIndex, questions: list, k: int, batch_size: int) -> tuple:
+    # Dense queries encoded and searched batch_size at a time
+    hits = 0
+    start = time.perf_counter()
+    for offset in range(0, len(questions), batch_size):
+        batch = questions[offset:offset + batch_size]
+        for question, results in zip(batch, backend.query_batch([q["question"] for q in batch], ["WikiQA"], k)):
+            hits += any(result.get("url") == question["document_id"] for result in results)
+    elapsed = time.perf_counter() - start
+    return hits / len(questions), len(questions) / elapsed
+
+
+def solr_backend(docs: list, core_name: str, vm_ip: str):
+    from indexer import Indexer
+
+    indexer = Indexer(core_name, vm_ip, ["title", "summary", "url"], FIELD_WEIGHTS)
+    indexer.do_initial_setup()
+    indexer.add_fields()
+    indexer.create_documents(docs)
+    return indexer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrieval latency and recall on WikiQA questions")
+    parser.add_argument("--data", nargs="+", default=["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    parser.add_argument("--backends", nargs="+", default=["bm25"], choices=["bm25", "solr", "dense", "hybrid"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--vector-dtype", default="float16", choices=["float16", "int8"])
+    parser.add_argument("--core", default="WikiQA")
+    parser.add_argument("--vm-ip", default="localhost")
+    args = parser.parse_args()
+
+    docs, questions = load_wikiqa(args.data)
+    print(f"{len(docs)} documents, {len(questions)} questions")
+
+    dense = None
+    for name in args.backends:
+        start = time.perf_counter()
+        if name == "bm25":
+            backend = BM25Index.build(docs, FIELD_WEIGHTS)
+        elif name == "solr":
+            backend = solr_backend(docs, args.core, args.vm_ip)
+        else:
+            dense = dense or DenseIndex.build(docs, dtype=args.vector_dtype)
+            backend = dense if name == "dense" else HybridRetriever(BM25Index.build(docs, FIELD_WEIGHTS), dense)
+        print(f"{name}: indexed in {time.perf_counter() - start:.2f}s")
+
+        recall, summary = evaluate(backend, questions, args.k)
+        print_summary(name, summary)
+        print(f"  recall@{args.k}: {recall:.3f}")
+        if name == "dense":
+            recall, throughput = evaluate_batched(backend, questions, args.k, args.batch_size)
+            print(f"  batched x{args.batch_size}: {throughput:.1f} queries/s, recall@{args.k}: {recall:.3f}")
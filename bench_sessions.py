@@ -0,0 +1,77 @@
+import argparse
+import time
+from collections import Counter
+
+import samples
+from bench_utils import percentile
+from chat import ChitChatAPI
+
+
+def run_conversation(chatter: ChitChatAPI, messages: list, session_id: str = None) -> list:
+    # Per-turn latency of one conversation; no session_id answers every turn on its own
+    latencies = []
+    for message in messages:
+        start = time.perf_counter()
+        if session_id is None:
+            chatter.get_responses([message])
+        else:
+            chatter.get_responses([(message, session_id)])
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def token_f1(reply: str, reference: str) -> float:
+    reply_tokens, reference_tokens = reply.lower().split(), reference.lower().split()
+    common = sum((Counter(reply_tokens) & Counter(reference_tokens)).values())
+    if not common:
+        return float(reply_tokens == reference_tokens)
+    precision, recall = common / len(reply_tokens), common / len(reference_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def compare_replies(chatter: ChitChatAPI, messages: list, session_id: str = "quality") -> dict:
+    # Replies from the cached per-turn encoder states against re-encoding the window,
+    # given the same history at every turn (the re-encoded reply is the one kept)
+    identical, scores = 0, []
+    for message in messages:
+        replies = []
+        for cache_encoder in (False, True):
+            chatter.cache_encoder = cache_encoder
+            inputs, windows = chatter.prepare_context([(message, session_id)])
+            reply_ids = chatter.model.generate(**inputs, **chatter.generation_kwargs)
+            replies.append(chatter.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)[0])
+        chatter.remember([(message, session_id)], windows, replies[:1])
+        identical += replies[0] == replies[1]
+        scores.append(token_f1(replies[1], replies[0]))
+    return {"identical": identical / len(messages), "token_f1": sum(scores) / len(scores)}
+
+
+def print_turns(name: str, latencies: list, group: int = 5):
+    # Latency should stay flat as the conversation grows, so compare early and late turns
+    groups = [latencies[start:start + group] for start in range(0, len(latencies), group)]
+    columns = "  ".join(f"{sum(turns) / len(turns) * 1000:7.1f}" for turns in groups)
+    print(f"{name:>10}: mean ms per {group} turns {columns}  p95={percentile(latencies, 95) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-turn chit-chat latency as a conversation grows")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--history-tokens", type=int, default=120)
+    parser.add_argument("--max-new-tokens", type=int, default=20, help="Fixed reply length so turns are comparable")
+    args = parser.parse_args()
+
+    messages = (samples.chats * (args.turns // len(samples.chats) + 1))[:args.turns]
+    generation_kwargs = {"max_new_tokens": args.max_new_tokens, "min_new_tokens": args.max_new_tokens}
+    chatter = ChitChatAPI(generation_kwargs=generation_kwargs, history_tokens=args.history_tokens)
+    chatter.get_responses(messages[:1])  # warm up
+
+    print_turns("stateless", run_conversation(chatter, messages))
+    chatter.cache_encoder = False
+    print_turns("re-encode", run_conversation(chatter, messages, "re-encode"))
+    chatter.cache_encoder = True
+    print_turns("cached", run_conversation(chatter, messages, "cached"))
+    print(f"sessions: {chatter.sessions.get_stats()}")
+
+    quality = compare_replies(chatter, messages)
+    print(f"cached vs re-encode replies: {quality['identical']:.1%} identical, "
+          f"token F1 {quality['token_f1']:.3f} over {len(messages)} turns")
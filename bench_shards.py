@@ -0,0 +1,67 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from bench_utils import Timer, summarize, print_summary
+from bm25 import BM25Index
+from corpus import CorpusWriter
+from shards import ShardedRetriever
+from wikiqa import load_wikiqa
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+TOPICS = ["Health", "Environment", "Technology", "Economy", "Entertainment",
+          "Sports", "Politics", "Education", "Travel", "Food"]
+
+
+def scaled_corpus(docs: list, copies: int) -> list:
+    # WikiQA documents repeated `copies` times with distinct urls, spread over the topics
+    return [{**doc, "url": f"{doc['url']}#{copy}", "topic": TOPICS[(i + copy) % len(TOPICS)]}
+            for copy in range(copies) for i, doc in enumerate(docs)]
+
+
+def run(backend, questions: list, topics: list) -> dict:
+    latencies = []
+    with Timer() as total:
+        for question in questions:
+            start = time.perf_counter()
+            backend.query_solr(question, topics, 10)
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies, total.elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single filtered BM25 index vs topic shards with parallel fan-out")
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    docs, questions = load_wikiqa(["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    questions = [question["question"] for question in questions[:args.questions]]
+    root = tempfile.mkdtemp()
+    try:
+        for copies in args.copies:
+            corpus = scaled_corpus(docs, copies)
+            path = os.path.join(root, f"corpus{copies}.jsonl")
+            with CorpusWriter(path, append=False) as writer:
+                writer.write_many(corpus)
+            single = BM25Index.build(corpus, FIELD_WEIGHTS)
+            with Timer() as build:
+                sharded = ShardedRetriever.build_or_load(path, os.path.join(root, f"shards{copies}"), FIELD_WEIGHTS)
+            print(f"\n{len(corpus)} documents, {len(sharded.shards)} shards built in {build.elapsed:.2f}s")
+
+            for count in (1, 3, len(TOPICS)):
+                topics = TOPICS[:count]
+                print_summary(f"single index, {count} topics", run(single, questions, topics))
+                print_summary(f"sharded, {count} topics", run(sharded, questions, topics))
+
+            overlap = sum(len({r["url"] for r in single.query_solr(q, TOPICS[:3], 10)}
+                              & {r["url"] for r in sharded.query_solr(q, TOPICS[:3], 10)}) for q in questions)
+            print(f"top-10 overlap with the single index: {overlap / (10 * len(questions)):.3f}")
+
+            with Timer() as rebuild:
+                sharded.rebuild_shard(TOPICS[0])
+            print(f"rebuilding one shard: {rebuild.elapsed:.2f}s")
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,36 @@
+import argparse
+import subprocess
+import sys
+import time
+
+MODULES = ["tracing", "metrics", "cache", "bm25", "indexer", "classifier", "chat", "chatbot"]
+
+
+def import_time(module: str) -> float:
+    # Fresh interpreter per module so earlier imports do not hide the cost
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if output.returncode != 0:
+        return float("nan")
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time per module and time-to-ready per component")
+    parser.add_argument("--modules", nargs="+", default=[m for m in MODULES if m != "chatbot"])
+    parser.add_argument("--skip-ready", action="store_true", help="Only measure imports")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        print(f"import {module:12s} {import_time(module) * 1000:8.1f}ms")
+
+    if not args.skip_ready:
+        # Importing chatbot creates the app and starts loading components in the background
+        start = time.perf_counter()
+        import chatbot
+
+        print(f"import chatbot      {(time.perf_counter() - start) * 1000:8.1f}ms (app ready to bind)")
+        chatbot.chat_system.wait_until_ready()
+        print(f"time to ready       {time.perf_counter() - start:8.2f}s")
+        for name, status in chatbot.chat_system.readiness()[1].items():
+            print(f"  {name:20s} {status['state']:8s} {status['seconds']:.2f}s")
@@ -0,0 +1,53 @@
+import argparse
+import time
+
+from tracing import tracer
+
+
+def stage(work: int):
+    # Stand-in for a pipeline stage: a small amount of pure-Python work
+    return sum(i * i for i in range(work))
+
+
+def run_plain(iterations: int, work: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for _ in range(3):
+            stage(work)
+    return (time.perf_counter() - start) / iterations
+
+
+def run_traced(iterations: int, work: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        tracer.start_trace()
+        with tracer.span("process_input"):
+            for name in ("classify", "retrieve", "format"):
+                with tracer.span(name):
+                    stage(work)
+        tracer.finish_trace()
+    return (time.perf_counter() - start) / iterations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-request overhead of the tracing hooks")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--work", type=int, default=2000, help="Loop size of each fake stage")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    tracer.exporter = None
+    results = {"no hooks": [], "tracing disabled": [], "tracing enabled": []}
+    run_plain(args.iterations // 10, args.work)  # warm up
+    # Interleave the variants and keep the best round of each to filter out noise
+    for _ in range(args.rounds):
+        results["no hooks"].append(run_plain(args.iterations, args.work))
+        tracer.configure(sample_rate=0.0)
+        results["tracing disabled"].append(run_traced(args.iterations, args.work))
+        tracer.configure(sample_rate=1.0)
+        results["tracing enabled"].append(run_traced(args.iterations, args.work))
+
+    baseline = min(results["no hooks"])
+    for name, timings in results.items():
+        best = min(timings)
+        print(f"{name:17s} {best * 1e6:8.1f}us per request ({(best / baseline - 1) * 100:+.2f}%)")
@@ -0,0 +1,98 @@
+import argparse
+import csv
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import samples
+from bench_utils import Timer
+from classifier import OnlinePromptClassifier, prepare_data
+
+SOURCES = ["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"]
+
+
+def legacy_prepare(chat_dataset, paths: list) -> pd.DataFrame:
+    # The old path: Python dicts per row and line.split on every TSV line
+    from sklearn.utils import shuffle
+
+    chat_df = pd.DataFrame([{"text": convo['messages'][0][0]['text'], 'label': "chit-chat"}
+                            for convo in chat_dataset.values()])
+    chat_df = chat_df[1:].drop_duplicates().reset_index(drop=True).iloc[1200:].reset_index(drop=True)
+    query_data = []
+    for path in paths:
+        with open(path, 'r') as file:
+            for line in file:
+                query_data.append({"text": line.split("\t")[1], 'label': "Query"})
+    query_df = pd.DataFrame(query_data)[1:].drop_duplicates().reset_index(drop=True)
+    combined_df = shuffle(pd.concat([query_df, chat_df], ignore_index=True)).reset_index(drop=True)
+    combined_df['label'] = combined_df['label'].map({'Query': 0, 'chit-chat': 1})
+    return combined_df
+
+
+def scaled_sources(directory: str, scale: int) -> tuple:
+    # `scale` distinct copies of the WikiQA rows and of the sample chats (numbered so
+    # deduplication keeps them), shaped like the real sources
+    paths = []
+    for path in SOURCES:
+        df = pd.read_csv(path, sep="\t", dtype=str, quoting=csv.QUOTE_NONE, keep_default_na=False)
+        copies = pd.concat([df.assign(Question=df["Question"] + f" {copy}") for copy in range(scale)])
+        paths.append(os.path.join(directory, f"{scale}-{os.path.basename(path)}"))
+        copies.to_csv(paths[-1], sep="\t", index=False, quoting=csv.QUOTE_NONE)
+    chats = [f"{text} {copy}" for copy in range(scale * 20) for text in samples.chats]
+    chat_dataset = {i: {"messages": [[{"text": text}]]} for i, text in enumerate(chats)}
+    return chat_dataset, paths
+
+
+def best_of(function, *args, repeats: int = 3) -> tuple:
+    # Fastest of a few runs (reading is sensitive to what the page cache holds)
+    timings = []
+    for _ in range(repeats):
+        with Timer() as timer:
+            result = function(*args)
+        timings.append(timer.elapsed)
+    return result, min(timings)
+
+
+def baseline_fit(df: pd.DataFrame):
+    # The full retrain the server used to need for every change
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    vectorizer = CountVectorizer()
+    return vectorizer, LogisticRegression().fit(vectorizer.fit_transform(df["text"]), df["label"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classifier data preparation and training cost by corpus size")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--fit-batch-size", type=int, default=4096, help="Mini-batch of the initial SGD training")
+    parser.add_argument("--batch-size", type=int, default=32, help="Feedback mini-batch for partial_fit")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'legacy prep':>12} {'prep':>8} {'full retrain':>13} {'sgd fit':>8} "
+          f"{'update':>9} {'retrain acc':>11} {'sgd acc':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        # Warm up imports so the first row is not charged for them
+        prepare_data(*scaled_sources(directory, 1))
+        baseline_fit(pd.DataFrame({"text": ["warm up", "up warm"], "label": [0, 1]}))
+        for scale in args.scales:
+            chat_dataset, paths = scaled_sources(directory, scale)
+            _, legacy = best_of(legacy_prepare, chat_dataset, paths)
+            df, prepare = best_of(prepare_data, chat_dataset, paths)
+
+            split = int(len(df) * 0.9)
+            train, test = df[:split], df[split:]
+            (vectorizer, reference), retrain = best_of(baseline_fit, train, repeats=1)
+            with Timer() as fit:
+                model = OnlinePromptClassifier().fit(train["text"], train["label"], args.epochs, args.fit_batch_size)
+            batch = test[:args.batch_size]
+            with Timer() as update:
+                model.partial_fit(batch["text"], batch["label"])
+
+            reference_accuracy = np.mean(reference.predict(vectorizer.transform(test["text"])) == test["label"])
+            print(f"{len(df):8d} {legacy:11.3f}s {prepare:7.3f}s {retrain:12.3f}s "
+                  f"{fit.elapsed:7.3f}s {update.elapsed * 1000:7.1f}ms {reference_accuracy:11.3f} "
+                  f"{model.evaluate(test['text'], test['label']):8.3f}")
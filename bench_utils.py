@@ -0,0 +1,34 @@
+import time
+
+
+def percentile(values: list, p: float) -> float:
+    # Nearest-rank percentile, good enough for benchmark reports
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def print_summary(name: str, summary: dict):
+    print(f"{name}: {summary['requests']} requests, {summary['throughput']:.2f} req/s, "
+          f"p50={summary['p50'] * 1000:.1f}ms p95={summary['p95'] * 1000:.1f}ms p99={summary['p99'] * 1000:.1f}ms")
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,275 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The benchmark builds its own Chatbot instances; skip loading the server's models on import
+os.environ.setdefault("CHATBOT_PRELOAD", "0")
+
+import numpy as np
+
+import samples
+from bench_utils import Timer, summarize, print_summary
+from chat import ChitChatAPI
+from chatbot import Chatbot, WikipediaRetriever
+from classifier import load_classifier
+from fake_solr import FakeSolr
+from indexer import Indexer
+from wikiqa import load_wikiqa
+
+# chatbot logs every Solr request at DEBUG
+logging.getLogger().setLevel(logging.WARNING)
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+BASELINE_PATH = "benchmark_baseline.json"
+SUITES = ["classifier", "retrieval", "pipeline"]
+# Metrics where a larger value is better; everything else (latency, memory) should not grow
+HIGHER_IS_BETTER = ("accuracy", "mrr", "recall", "throughput")
+# Quality metrics are deterministic and compared with an absolute tolerance, the
+# timing ones with a relative one
+QUALITY = ("accuracy", "mrr", "recall")
+# p99 over a thousand requests is too noisy to gate on; it is reported only
+GATED_PERCENTILES = ("p50", "p95")
+
+
+class StubChitChat:
+    # Stands in for ChitChatAPI: a fixed reply after `delay` seconds, no model
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+
+    def get_response(self, user_input, session_id=None, cancel=None):
+        # Like CancelCriteria, a set cancel event stops the "generation" early
+        if cancel is not None and cancel.wait(self.delay):
+            return None
+        if cancel is None:
+            time.sleep(self.delay)
+        return "That sounds nice, tell me more."
+
+    def get_responses(self, user_inputs: list) -> list:
+        time.sleep(self.delay)
+        return ["That sounds nice, tell me more."] * len(user_inputs)
+
+    def stream_response(self, user_input, session_id=None):
+        yield self.get_response(user_input, session_id)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def run_sequential(function, items: list) -> tuple:
+    outputs, latencies = [], []
+    with Timer() as total:
+        for item in items:
+            start = time.perf_counter()
+            outputs.append(function(item))
+            latencies.append(time.perf_counter() - start)
+    return outputs, summarize(latencies, total.elapsed)
+
+
+def run_parallel(function, items: list, workers: int) -> tuple:
+    def timed(item):
+        start = time.perf_counter()
+        output = function(item)
+        return output, time.perf_counter() - start
+
+    with Timer() as total:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outputs, latencies = zip(*executor.map(timed, items)) if items else ((), ())
+    return list(outputs), summarize(list(latencies), total.elapsed)
+
+
+def rank_metrics(results: list, gold: str, k: int = 10) -> tuple:
+    # Reciprocal rank and recall@k with a single relevant document
+    for rank, result in enumerate(results[:k], start=1):
+        if result.get("url") == gold:
+            return 1.0 / rank, 1.0
+    return 0.0, 0.0
+
+
+def labelled_messages(questions: list) -> tuple:
+    # 0 = Query, 1 = Chit-Chat, as predicted by the classifier
+    texts = samples.queries + [question["question"] for question in questions] + samples.chats
+    labels = [0] * (len(samples.queries) + len(questions)) + [1] * len(samples.chats)
+    return texts, np.array(labels)
+
+
+def bench_classifier(classifier, questions: list, workers: int) -> dict:
+    texts, labels = labelled_messages(questions)
+    with Timer() as batch:
+        predictions = classifier.predict(texts)
+    _, sequential = run_sequential(lambda text: classifier.predict([text])[0], texts)
+    _, parallel = run_parallel(lambda text: classifier.predict([text])[0], texts, workers)
+    return {
+        "accuracy": float(np.mean(predictions == labels)),
+        "query_accuracy": float(np.mean(predictions[labels == 0] == 0)),
+        "chat_accuracy": float(np.mean(predictions[labels == 1] == 1)),
+        "batch": {"throughput": len(texts) / batch.elapsed},
+        "sequential": sequential,
+        "parallel": parallel,
+    }
+
+
+def bench_retrieval(indexer: Indexer, questions: list, workers: int, k: int = 10) -> dict:
+    def search(question):
+        return list(indexer.query_solr(question["question"], [], k))
+
+    results, sequential = run_sequential(search, questions)
+    _, parallel = run_parallel(search, questions, workers)
+    scores = np.array([rank_metrics(docs, question["document_id"], k) for docs, question in zip(results, questions)])
+    return {"mrr": float(scores[:, 0].mean()), "recall": float(scores[:, 1].mean()),
+            "sequential": sequential, "parallel": parallel}
+
+
+def bench_pipeline(make_chatbot, questions: list, titles: dict, workers: int) -> dict:
+    # Full process_input: routing, then retrieval and/or generation. Accuracy is the
+    # share of messages answered the right way; a WikiQA question counts as answered
+    # when the gold document is the one returned.
+    texts, labels = labelled_messages(questions)
+    gold = {question["question"]: titles[question["document_id"]] for question in questions}
+
+    def answer_recall(responses):
+        hits = [f"- Title: {gold[text]}\n" in response for text, response in zip(texts, responses) if text in gold]
+        return float(np.mean(hits))
+
+    # A fresh Chatbot per run so the second one does not replay the first one's cache
+    chatbot = make_chatbot()
+    responses, sequential = run_sequential(lambda text: chatbot.process_input(text, []), texts)
+    # Whether each message got a generated reply rather than a retrieved answer
+    routes = np.array([not (response.startswith("- Title:") or response == "No results found.")
+                       for response in responses])
+    parallel_chatbot = make_chatbot()
+    parallel_responses, parallel = run_parallel(lambda text: parallel_chatbot.process_input(text, []), texts, workers)
+    return {
+        "accuracy": float(np.mean(routes == labels)),
+        "recall": answer_recall(responses),
+        "parallel_recall": answer_recall(parallel_responses),
+        "sequential": sequential,
+        "parallel": parallel,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif key != "requests":
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float, quality_tolerance: float,
+            min_latency_delta: float = 0.002) -> list:
+    # Returns (metric, baseline, current) for every metric that got worse than allowed.
+    # Latency changes below min_latency_delta seconds are timer noise, not regressions.
+    regressions = []
+    for metric, expected in flatten(baseline).items():
+        actual = flatten(current).get(metric)
+        if actual is None:
+            continue
+        name = metric.rsplit(".", 1)[-1]
+        higher = any(word in name for word in HIGHER_IS_BETTER)
+        if any(word in name for word in QUALITY):
+            worse = expected - actual > quality_tolerance
+        elif higher:
+            worse = actual < expected * (1 - tolerance)
+        else:
+            worse = actual > expected * (1 + tolerance)
+            if name.startswith("p") and name[1:].isdigit():
+                worse = worse and name in GATED_PERCENTILES and actual - expected > min_latency_delta
+        if worse:
+            regressions.append((metric, expected, actual))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy, retrieval quality and latency of the chatbot, "
+                                                 "compared against a saved baseline")
+    parser.add_argument("--suites", nargs="+", default=SUITES, choices=SUITES)
+    parser.add_argument("--data", nargs="+", default=["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"])
+    parser.add_argument("--questions", type=int, default=None, help="Replay only the first N WikiQA questions")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent callers in the parallel runs")
+    parser.add_argument("--vm-ip", default=None, help="Query a real Solr instead of the local fake")
+    parser.add_argument("--solr-delay", type=float, default=0.005, help="Simulated latency of the fake Solr")
+    parser.add_argument("--generator", action="store_true", help="Use BlenderBot instead of the stub generator")
+    parser.add_argument("--generator-delay", type=float, default=0.05, help="Latency of the stub generator")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative latency/throughput change")
+    parser.add_argument("--quality-tolerance", type=float, default=0.01, help="Allowed absolute accuracy/MRR drop")
+    parser.add_argument("--output", default=None, help="Also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    docs, questions = load_wikiqa(args.data)
+    questions = questions[:args.questions]
+    titles = {doc["url"]: doc["title"] for doc in docs}
+    print(f"{len(docs)} documents, {len(questions)} questions, "
+          f"{len(samples.queries)} sample queries, {len(samples.chats)} sample chats")
+
+    fake = None
+    if args.vm_ip is None:
+        fake = FakeSolr([{**doc, "id": doc["url"]} for doc in docs], FIELD_WEIGHTS, delay=args.solr_delay)
+        indexer = Indexer("IRF24P3", "127.0.0.1", ["title", "summary", "url"], FIELD_WEIGHTS, port=fake.start())
+    else:
+        indexer = Indexer("IRF24P3", args.vm_ip, ["title", "summary", "url"], FIELD_WEIGHTS)
+
+    results = {}
+    try:
+        classifier = load_classifier()
+        if "classifier" in args.suites:
+            results["classifier"] = bench_classifier(classifier, questions, args.workers)
+            results["classifier"]["peak_rss_mb"] = peak_rss_mb()
+        if "retrieval" in args.suites:
+            results["retrieval"] = bench_retrieval(indexer, questions, args.workers)
+            results["retrieval"]["peak_rss_mb"] = peak_rss_mb()
+        if "pipeline" in args.suites:
+            chit_chat_api = ChitChatAPI() if args.generator else StubChitChat(args.generator_delay)
+            retriever = WikipediaRetriever(rerank_top_n=0, indexer=indexer)
+            results["pipeline"] = bench_pipeline(
+                lambda: Chatbot(classifier=classifier, chit_chat_api=chit_chat_api, wikipedia_retriever=retriever,
+                                background=False),
+                questions, titles, args.workers)
+            results["pipeline"]["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        if fake is not None:
+            fake.stop()
+
+    for suite, suite_results in results.items():
+        print(f"\n[{suite}]")
+        for run in ("batch", "sequential", "parallel"):
+            if "p50" in suite_results.get(run, {}):
+                print_summary(f"  {run}", suite_results[run])
+        scalars = {key: value for key, value in suite_results.items() if not isinstance(value, dict)}
+        print("  " + "  ".join(f"{key} {value:.3f}" for key, value in scalars.items()))
+        if "batch" in suite_results:
+            print(f"  batch throughput {suite_results['batch']['throughput']:.1f} msgs/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    if args.save or not baseline:
+        # Suites not run this time keep their previous baseline
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        sys.exit(0)
+
+    regressions = compare(results, baseline, args.tolerance, args.quality_tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for metric, expected, actual in regressions:
+            print(f"  {metric}: {expected:.4g} -> {actual:.4g}")
+        sys.exit(1)
+    print(f"\nNo regressions against {args.baseline}")
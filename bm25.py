@@ -0,0 +1,246 @@
+import json
+import math
+import mmap
+import os
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Lucene's default English stop set, as used by Solr's text_en
+STOP_WORDS = frozenset("a an and are as at be but by for if in into is it no not of on or such "
+                       "that the their then there these they this to was will with".split())
+
+
+def tokenize(text: str) -> list:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class FieldPostings:
+    # CSR postings for one field: documents containing term t are doc_ids[offsets[t]:offsets[t + 1]]
+    def __init__(self, offsets, doc_ids, tfs, lengths):
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def from_postings(cls, postings: dict, num_terms: int, lengths: list):
+        offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        for term_id, entries in postings.items():
+            offsets[term_id + 1] = len(entries)
+        offsets = np.cumsum(offsets)
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.float32)
+        for term_id, entries in postings.items():
+            start, end = offsets[term_id], offsets[term_id + 1]
+            doc_ids[start:end] = [doc_id for doc_id, _ in entries]
+            tfs[start:end] = [tf for _, tf in entries]
+        return cls(offsets, doc_ids, tfs, np.asarray(lengths, dtype=np.float32))
+
+    def save(self, path: str, field: str):
+        for name in ("offsets", "doc_ids", "tfs", "lengths"):
+            np.save(os.path.join(path, f"{field}.{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, path: str, field: str):
+        # np.asarray drops the np.memmap subclass (whose slicing is several times slower)
+        # while still reading from the mapped file
+        arrays = [np.asarray(np.load(os.path.join(path, f"{field}.{name}.npy"), mmap_mode="r"))
+                  for name in ("offsets", "doc_ids", "tfs", "lengths")]
+        return cls(*arrays)
+
+
+class DocumentStore:
+    # Stored fields for search results, either in memory or as an mmapped JSONL file
+    # with a byte offset per document
+    def __init__(self, docs: list = None, path: str = None):
+        self.docs = docs
+        self.path = path
+        self.offsets = None
+        self.file = None
+        if path is not None:
+            self.offsets = np.load(path + ".offsets.npy", mmap_mode="r")
+            with open(path, "rb") as f:
+                self.file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.docs) if self.docs is not None else len(self.offsets) - 1
+
+    def __getitem__(self, doc_id: int) -> dict:
+        if self.docs is not None:
+            return self.docs[doc_id]
+        return json.loads(self.file[self.offsets[doc_id]:self.offsets[doc_id + 1]])
+
+    def save(self, path: str):
+        if self.path is not None and os.path.abspath(self.path) == os.path.abspath(path):
+            # Already written there by a DocumentWriter
+            return
+        writer = DocumentWriter(path)
+        for doc_id in range(len(self)):
+            writer.write(self[doc_id])
+        writer.close()
+
+
+class DocumentWriter:
+    # Streams documents into the DocumentStore file format, so an index build does not
+    # have to hold the corpus in memory
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.offsets = [0]
+
+    def write(self, doc: dict):
+        self.offsets.append(self.offsets[-1] + self.file.write(json.dumps(doc).encode("utf-8") + b"\n"))
+
+    def close(self) -> DocumentStore:
+        self.file.close()
+        np.save(self.path + ".offsets.npy", np.asarray(self.offsets, dtype=np.int64))
+        return DocumentStore(path=self.path)
+
+
+def topic_bitmask(docs, topic_names: list) -> list:
+    # One bit per topic name, so multi-topic documents and filters are a single AND
+    bits = []
+    for doc in docs:
+        doc_bits = 0
+        topics = doc.get("topic") or []
+        for topic in [topics] if isinstance(topics, str) else topics:
+            if topic not in topic_names:
+                if len(topic_names) == 63:
+                    raise ValueError("At most 63 topics are supported")
+                topic_names.append(topic)
+            doc_bits |= 1 << topic_names.index(topic)
+        bits.append(doc_bits)
+    return bits
+
+
+def topic_mask(topic_bits, topic_names: list, topics: list):
+    selected = 0
+    for topic in topics:
+        if topic in topic_names:
+            selected |= 1 << topic_names.index(topic)
+    return (topic_bits & selected) != 0
+
+
+class BM25Index:
+    # In-process replacement for Indexer.query_solr: BM25 per field, combined like
+    # edismax with tie=0 (each query term takes its best weighted field score).
+    FIELDS = ("title", "summary")
+
+    def __init__(self, vocab: dict, fields: dict, topic_names: list, topic_bits, field_weights: dict,
+                 docs: DocumentStore, k1: float = 1.2, b: float = 0.75):
+        self.vocab = vocab
+        self.fields = fields
+        self.topic_names = topic_names
+        self.topic_bits = topic_bits
+        self.weights = field_weights
+        self.num_docs = len(topic_bits)
+        self.k1 = k1
+        self.b = b
+        self.docs = docs
+
+    @classmethod
+    def build(cls, docs, field_weights: dict, k1: float = 1.2, b: float = 0.75):
+        vocab = {}
+        postings = {field: defaultdict(list) for field in cls.FIELDS}
+        lengths = {field: [] for field in cls.FIELDS}
+        stored = []
+
+        for doc_id, doc in enumerate(docs):
+            for field in cls.FIELDS:
+                tokens = tokenize(doc.get(field) or "")
+                lengths[field].append(len(tokens))
+                for term, tf in Counter(tokens).items():
+                    term_id = vocab.setdefault(term, len(vocab))
+                    postings[field][term_id].append((doc_id, tf))
+            stored.append(doc)
+
+        topic_names = []
+        topic_bits = np.asarray(topic_bitmask(stored, topic_names), dtype=np.int64)
+        fields = {field: FieldPostings.from_postings(postings[field], len(vocab), lengths[field])
+                  for field in cls.FIELDS}
+        return cls(vocab, fields, topic_names, topic_bits, field_weights, DocumentStore(stored), k1=k1, b=b)
+
+    def save(self, path: str, fingerprint: dict = None):
+        os.makedirs(path, exist_ok=True)
+        for field, postings in self.fields.items():
+            postings.save(path, field)
+        np.save(os.path.join(path, "topics.npy"), self.topic_bits)
+        self.docs.save(os.path.join(path, "docs.jsonl"))
+
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"k1": self.k1, "b": self.b, "topics": self.topic_names, "vocab": self.vocab,
+                       "corpus": fingerprint}, f)
+
+    @classmethod
+    def load(cls, path: str, field_weights: dict):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        fields = {field: FieldPostings.load(path, field) for field in cls.FIELDS}
+        index = cls(meta["vocab"], fields, meta["topics"], np.load(os.path.join(path, "topics.npy"), mmap_mode="r"),
+                    field_weights, DocumentStore(path=os.path.join(path, "docs.jsonl")), k1=meta["k1"], b=meta["b"])
+        index.fingerprint = meta.get("corpus")
+        return index
+
+    @classmethod
+    def build_or_load(cls, data_path: str, index_path: str, field_weights: dict):
+        # Reuses the on-disk index unless the corpus file changed since it was built
+        from corpus import iter_corpus
+
+        stat = os.stat(data_path)
+        fingerprint = {"path": os.path.abspath(data_path), "size": stat.st_size, "mtime": stat.st_mtime}
+        if os.path.isfile(os.path.join(index_path, "meta.json")):
+            index = cls.load(index_path, field_weights)
+            if index.fingerprint == fingerprint:
+                return index
+        cls.build(iter_corpus(data_path), field_weights).save(index_path, fingerprint)
+        return cls.load(index_path, field_weights)
+
+    def score(self, query: str, stats: tuple = None):
+        # stats = (num_docs, document_frequencies) of a larger collection replaces this
+        # index's own IDF, so scores from several shards are comparable
+        num_docs = stats[0] if stats else self.num_docs
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            term_scores = {}
+            for field, weight in self.weights.items():
+                postings = self.fields[field]
+                start, end = postings.offsets[term_id], postings.offsets[term_id + 1]
+                if start == end:
+                    continue
+                ids = postings.doc_ids[start:end]
+                tf = postings.tfs[start:end]
+                df = stats[1].get((field, term), len(ids)) if stats else len(ids)
+                idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * postings.lengths[ids] / postings.avg_length)
+                term_scores[field] = (ids, weight * idf * tf * (self.k1 + 1) / (tf + norm))
+            if len(term_scores) == 1:
+                ids, values = next(iter(term_scores.values()))
+                scores[ids] += values
+            elif term_scores:
+                best = np.zeros(self.num_docs, dtype=np.float32)
+                for ids, values in term_scores.values():
+                    best[ids] = np.maximum(best[ids], values)
+                scores += best
+        return scores
+
+    def top_k(self, query: str, topics: list, k: int = 10, stats: tuple = None) -> tuple:
+        # Ids and scores of the k best matches, best first; documents are not decoded
+        scores = self.score(query, stats)
+        if topics:
+            scores[~topic_mask(self.topic_bits, self.topic_names, topics)] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates, scores[candidates]
+
+    def query_solr(self, query: str, topics: list, k: int = 10, stats: tuple = None) -> list:
+        ids, scores = self.top_k(query, topics, k, stats)
+        return [{**self.docs[doc_id], "score": float(score)} for doc_id, score in zip(ids, scores)]
@@ -0,0 +1,133 @@
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+def cache_key(text: str, topics=()) -> str:
+    # Case, whitespace and trailing punctuation do not change the answer
+    normalized = re.sub(r"\s+", " ", text.lower()).strip().rstrip("?!. ")
+    return normalized + "|" + ",".join(sorted(topics))
+
+
+class LocalBackend:
+    # In-process stand-in for a shared backend (same get/set/ttl contract as RedisBackend)
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            value, expires = self.entries.get(key, (None, 0))
+            if expires and expires < time.time():
+                del self.entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self.lock:
+            self.entries[key] = (value, time.time() + ttl)
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        value = self.client.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: float):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+
+def make_backend(url: str):
+    if not url:
+        return None
+    if url == "local":
+        return LocalBackend()
+    return RedisBackend(url)
+
+
+class ResponseCache:
+    # LRU cache with per-entry TTL and an approximate memory budget. An optional
+    # shared backend sits behind the local store so several workers share results.
+    def __init__(self, name: str, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600, shared=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def entry_size(key: str, value) -> int:
+        return sys.getsizeof(key) + sys.getsizeof(value)
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires, size = entry
+                if expires >= time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self.entries[key]
+                self.size -= size
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(f"{self.name}:{key}")
+            except Exception as e:
+                logging.warning(f"Shared cache lookup failed: {e}")
+                value = None
+            if value is not None:
+                value = json.loads(value)
+                self.put_local(key, value)
+                with self.lock:
+                    self.stats["shared_hits"] += 1
+                return value
+
+        with self.lock:
+            self.stats["misses"] += 1
+        return MISSING
+
+    def put_local(self, key: str, value):
+        size = self.entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self.entries[key] = (value, time.monotonic() + self.ttl, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.stats["evictions"] += 1
+
+    def set(self, key: str, value):
+        self.put_local(key, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(f"{self.name}:{key}", json.dumps(value), self.ttl)
+            except Exception as e:
+                logging.warning(f"Shared cache write failed: {e}")
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["shared_hits"] + self.stats["misses"]
+            hits = self.stats["hits"] + self.stats["shared_hits"]
+            return {**self.stats, "entries": len(self.entries), "bytes": self.size,
+                    "hit_rate": hits / lookups if lookups else 0.0}
@@ -1,15 +1,384 @@
-from transformers import BlenderbotTokenizer, BlenderbotForConditionalGeneration
+from collections import OrderedDict
+from concurrent.futures import Future
+from tracing import tracer
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+
+
+class GenerationBatcher:
+    # Collects single requests for up to `batch_window` seconds (or until
+    # `max_batch_size` is reached) and runs them through `batch_fn` together.
+    def __init__(self, batch_fn, batch_window: float = 0.01, max_batch_size: int = 8):
+        self.batch_fn = batch_fn
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.worker_pid = None
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self.requests.put((item, future, contextvars.copy_context()))
+        return future
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so a forked server process gets its own worker
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive() or self.worker_pid != os.getpid():
+                self.requests = queue.Queue()
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker_pid = os.getpid()
+                self.worker.start()
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            try:
+                # Spans recorded by the batch go to the first caller's trace
+                results = batch[0][2].run(self.batch_fn, items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+
+class Turn:
+    # One utterance of a conversation; `states` caches its encoder output once computed
+    __slots__ = ("text", "from_user", "input_ids", "states")
+
+    def __init__(self, text: str, from_user: bool, input_ids: list):
+        self.text = text
+        self.from_user = from_user
+        self.input_ids = input_ids
+        self.states = None
+
+    def size(self) -> int:
+        states = self.states.numel() * self.states.element_size() if self.states is not None else 0
+        return len(self.text) + 8 * len(self.input_ids) + states
+
+
+class SessionStore:
+    # Conversation histories by session id, least recently used first. Bounded by
+    # both the number of sessions and the approximate bytes held (text, token ids and
+    # cached encoder states).
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.sessions = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, session_id: str) -> list:
+        with self.lock:
+            turns = self.sessions.get(session_id)
+            if turns is None:
+                return []
+            self.sessions.move_to_end(session_id)
+            return list(turns)
+
+    def put(self, session_id: str, turns: list):
+        self.update(session_id, lambda _: turns)
+
+    def update(self, session_id: str, update):
+        # Replaces a session's turns with update(current turns) in one step, so two
+        # concurrent writers to a session both land instead of the last one winning
+        with self.lock:
+            turns = update(list(self.sessions.get(session_id, [])))
+            size = sum(turn.size() for turn in turns)
+            self.size -= self.sizes.pop(session_id, 0)
+            self.sessions.pop(session_id, None)
+            if size > self.max_bytes:
+                return
+            self.sessions[session_id] = turns
+            self.sizes[session_id] = size
+            self.size += size
+            while len(self.sessions) > self.max_sessions or self.size > self.max_bytes:
+                evicted, _ = self.sessions.popitem(last=False)
+                self.size -= self.sizes.pop(evicted)
+                self.evictions += 1
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {"sessions": len(self.sessions), "bytes": self.size, "evictions": self.evictions}
+
+
+class CancelCriteria:
+    # generate() stopping criterion: ends generation at the next token once `event` is set
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+MODEL_NAME = "facebook/blenderbot-400M-distill"
+BACKENDS = ["torch", "int8", "onnx"]
+
+# Greedy decoding with a short reply cap; the checkpoint default is 10-beam search
+LATENCY_GENERATION = {"num_beams": 1, "do_sample": False, "max_new_tokens": 40}
+# Named generation settings, selectable by the server (CHATBOT_GENERATION)
+GENERATION_SETTINGS = {"default": {}, "latency": LATENCY_GENERATION}
+
+
+def load_model(backend: str = "torch", cache_dir: str = "model_cache"):
+    # transformers is imported here rather than at module level so importing chat stays cheap
+    from transformers import BlenderbotForConditionalGeneration
+
+    if backend == "torch":
+        return BlenderbotForConditionalGeneration.from_pretrained(MODEL_NAME)
+
+    if backend == "int8":
+        import torch
+
+        path = os.path.join(cache_dir, "blenderbot-400M-distill-int8.pt")
+        if os.path.isfile(path):
+            return torch.load(path, weights_only=False)
+        logging.info("Quantizing chit-chat model to int8, caching in %s", path)
+        model = BlenderbotForConditionalGeneration.from_pretrained(MODEL_NAME)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        os.makedirs(cache_dir, exist_ok=True)
+        torch.save(model, path)
+        return model
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        path = os.path.join(cache_dir, "blenderbot-400M-distill-onnx")
+        if os.path.isdir(path):
+            return ORTModelForSeq2SeqLM.from_pretrained(path)
+        logging.info("Exporting chit-chat model to ONNX, caching in %s", path)
+        model = ORTModelForSeq2SeqLM.from_pretrained(MODEL_NAME, export=True)
+        model.save_pretrained(path)
+        return model
+
+    raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
 
 class ChitChatAPI:
-    def __init__(self):
-        self.tokenizer = BlenderbotTokenizer.from_pretrained("facebook/blenderbot-400M-distill")
-        self.model = BlenderbotForConditionalGeneration.from_pretrained("facebook/blenderbot-400M-distill")
+    def __init__(self, backend: str = "torch", generation_kwargs: dict = None, cache_dir: str = "model_cache",
+                 batch_window: float = 0.01, max_batch_size: int = 8, history_tokens: int = 120,
+                 max_sessions: int = 1000, session_bytes: int = 256 * 1024 * 1024, cache_encoder: bool = True):
+        from transformers import BlenderbotTokenizer
+
+        self.tokenizer = BlenderbotTokenizer.from_pretrained(MODEL_NAME)
+        self.model = load_model(backend, cache_dir)
+        self.backend = backend
+        self.generation_kwargs = generation_kwargs or {}
+        self.batcher = GenerationBatcher(self.get_responses, batch_window, max_batch_size)
+
+        # Multi-turn conversations: the most recent turns that fit in history_tokens are
+        # the context (the model has 128 positions). Without cache_encoder the window is
+        # re-encoded as one text every turn. With it each turn is encoded once, on its
+        # own, and its encoder output is reused on later turns, so a turn only pays for
+        # encoding the new text. That is an approximation, not the same context: every
+        # turn's positions start at 0 and turns do not attend to each other in the
+        # encoder. bench_sessions.py measures how far the replies drift.
+        self.history_tokens = history_tokens
+        self.sessions = SessionStore(max_sessions, session_bytes)
+        self.cache_encoder = cache_encoder and backend != "onnx"
+
+    def get_response(self, user_input, session_id: str = None, cancel: threading.Event = None):
+        # Concurrent callers are grouped into one generate call by the batcher. With a
+        # cancel event the message is generated on its own so it can be stopped early;
+        # a cancelled generation returns None.
+        if cancel is not None:
+            return self.generate_cancellable(user_input, session_id, cancel)
+        with tracer.span("chat.batched"):
+            return self.batcher.submit((user_input, session_id) if session_id else user_input).result()
+
+    def get_responses(self, items: list) -> list:
+        # Plain strings are answered without history, (text, session_id) pairs continue
+        # that session's conversation
+        replies = [None] * len(items)
+        stateless = [i for i, item in enumerate(items) if isinstance(item, str)]
+        sessions = [i for i, item in enumerate(items) if not isinstance(item, str)]
+        if stateless:
+            for i, reply in zip(stateless, self.generate_stateless([items[i] for i in stateless])):
+                replies[i] = reply
+        if sessions:
+            pairs = [items[i] for i in sessions]
+            with tracer.span("chat.context") as span:
+                span.tag("batch_size", len(pairs))
+                inputs, windows = self.prepare_context(pairs)
+            with tracer.span("chat.generate"):
+                reply_ids = self.model.generate(**inputs, **self.generation_kwargs)
+            with tracer.span("chat.decode"):
+                session_replies = self.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)
+            self.remember(pairs, windows, session_replies)
+            for i, reply in zip(sessions, session_replies):
+                replies[i] = reply
+        return replies
+
+    def generate_stateless(self, user_inputs: list) -> list:
+        with tracer.span("chat.tokenize") as span:
+            span.tag("batch_size", len(user_inputs))
+            inputs = self.tokenizer(user_inputs, return_tensors="pt", padding=True, truncation=True)
+        with tracer.span("chat.generate"):
+            reply_ids = self.model.generate(**inputs, **self.generation_kwargs)
+        with tracer.span("chat.decode"):
+            return self.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)
+
+    def generate_cancellable(self, user_input, session_id: str, cancel: threading.Event):
+        from transformers import StoppingCriteriaList
+
+        if session_id:
+            with tracer.span("chat.context"):
+                inputs, windows = self.prepare_context([(user_input, session_id)])
+        else:
+            with tracer.span("chat.tokenize"):
+                inputs = self.tokenizer([user_input], return_tensors="pt", truncation=True)
+        with tracer.span("chat.generate") as span:
+            span.tag("cancellable", True)
+            reply_ids = self.model.generate(**inputs, **self.generation_kwargs,
+                                            stopping_criteria=StoppingCriteriaList([CancelCriteria(cancel)]))
+        if cancel.is_set():
+            return None
+        with tracer.span("chat.decode"):
+            reply = self.tokenizer.batch_decode(reply_ids, skip_special_tokens=True)[0]
+        if session_id:
+            self.remember([(user_input, session_id)], windows, [reply])
+        return reply
+
+    def make_turn(self, text: str, from_user: bool) -> Turn:
+        # BlenderBot's conversation format prefixes user turns with a space
+        input_ids = self.tokenizer((" " + text) if from_user else text)["input_ids"]
+        return Turn(text, from_user, input_ids[-self.history_tokens:])
+
+    def window(self, turns: list) -> list:
+        # The newest turns whose tokens fit in the budget (always including the last one)
+        window, used = [], 0
+        for turn in reversed(turns):
+            if window and used + len(turn.input_ids) > self.history_tokens:
+                break
+            window.append(turn)
+            used += len(turn.input_ids)
+        return window[::-1]
+
+    def prepare_context(self, pairs: list) -> tuple:
+        # Builds generate() inputs for each (text, session_id) and returns the turn
+        # windows used, so the replies can be appended afterwards. With cache_encoder the
+        # inputs are the per-turn encoder states side by side (see __init__).
+        windows = [self.window(self.sessions.get(session_id) + [self.make_turn(text, True)])
+                   for text, session_id in pairs]
+        if not self.cache_encoder:
+            texts = ["  ".join((" " + turn.text) if turn.from_user else turn.text for turn in window)
+                     for window in windows]
+            return self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True), windows
+
+        import torch
+        from transformers.modeling_outputs import BaseModelOutput
+
+        # Encode every turn that has no cached states yet (new user turns and the
+        # previous replies) in one padded batch
+        pending = [turn for window in windows for turn in window if turn.states is None]
+        if pending:
+            batch = self.tokenizer.pad({"input_ids": [turn.input_ids for turn in pending]}, return_tensors="pt")
+            with torch.no_grad():
+                states = self.model.get_encoder()(**batch).last_hidden_state
+            for turn, row, length in zip(pending, states, batch["attention_mask"].sum(dim=1).tolist()):
+                # float16 halves the session memory; cast back when used
+                turn.states = row[:length].to(torch.float16)
+
+        contexts = [torch.cat([turn.states for turn in window]).float() for window in windows]
+        longest = max(len(context) for context in contexts)
+        hidden = torch.zeros(len(contexts), longest, contexts[0].shape[-1])
+        attention_mask = torch.zeros(len(contexts), longest, dtype=torch.long)
+        for row, context in enumerate(contexts):
+            hidden[row, :len(context)] = context
+            attention_mask[row, :len(context)] = 1
+        return {"encoder_outputs": BaseModelOutput(last_hidden_state=hidden), "attention_mask": attention_mask}, windows
+
+    def remember(self, pairs: list, windows: list, replies: list):
+        # The user turn (the last of its window) and the reply are appended to the
+        # session's current history, which may already hold a turn answered
+        # concurrently, rather than to the history the reply was generated from
+        for (_, session_id), window, reply in zip(pairs, windows, replies):
+            turns = [window[-1], self.make_turn(reply, False)]
+            self.sessions.update(session_id, lambda history: self.window(history + turns))
+
+    def remember_reply(self, user_input, session_id: str, reply: str):
+        # Adds a turn that was answered without the model (from the reply cache)
+        self.remember([(user_input, session_id)], [[self.make_turn(user_input, True)]], [reply])
+
+    def stream_response(self, user_input, session_id: str = None, cancel: threading.Event = None,
+                        timeout: float = 30.0):
+        # Yields decoded text pieces while generate runs in a background thread. An
+        # error in generate is raised here once the stream ends, and a TimeoutError if
+        # no piece arrives within `timeout` seconds. Setting `cancel`, or closing the
+        # generator early, stops generate at its next token; either way this returns
+        # only once generate has exited, and a cancelled reply is not remembered.
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+        if session_id:
+            with tracer.span("chat.context"):
+                inputs, windows = self.prepare_context([(user_input, session_id)])
+        else:
+            with tracer.span("chat.tokenize"):
+                inputs = self.tokenizer([user_input], return_tensors="pt", truncation=True)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+        # Streamers only work with a single beam
+        cancel = cancel or threading.Event()
+        kwargs = {**inputs, **self.generation_kwargs, "num_beams": 1, "streamer": streamer,
+                  "stopping_criteria": StoppingCriteriaList([CancelCriteria(cancel)])}
+        errors = []
+
+        def run():
+            try:
+                self.model.generate(**kwargs)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                # Without this a failed generate leaves the loop below waiting for more text
+                streamer.end()
 
-    def get_response(self, user_input):
-        inputs = self.tokenizer([user_input], return_tensors="pt")
-        reply_ids = self.model.generate(**inputs)
-        response = self.tokenizer.decode(reply_ids[0], skip_special_tokens=True)
-        return response
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        pieces = []
+        finished = False
+        try:
+            for text in streamer:
+                if text:
+                    pieces.append(text)
+                    yield text
+            finished = True
+        except queue.Empty:
+            raise TimeoutError(f"No output from generate for {timeout}s")
+        finally:
+            if not finished:
+                cancel.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+        if cancel.is_set():
+            return
+        if session_id:
+            self.remember([(user_input, session_id)], windows, ["".join(pieces)])
 
 if __name__ == "__main__":
     chatter = ChitChatAPI()
@@ -19,5 +388,5 @@ if __name__ == "__main__":
         if user_input.lower() == "exit":
             print("Goodbye!")
             break
-        response = chatter.get_response(user_input)
+        response = chatter.get_response(user_input, session_id="cli")
         print(f"Bot: {response}")
@@ -1,49 +1,123 @@
-from classifier import PromptClassifier
-from chat import ChitChatAPI
-from transformers import BlenderbotTokenizer
-from transformers import BlenderbotForConditionalGeneration
-from flask import Flask, request, jsonify
+from classifier import (ONLINE_MODEL_PATH, LinearPromptClassifier, OnlinePromptClassifier, linear_version,
+                        load_classifier, load_online_classifier, training_lock)
+from chat import BACKENDS, GENERATION_SETTINGS, ChitChatAPI
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from indexer import Indexer
+from bm25 import BM25Index
+from dense import DenseIndex, HybridRetriever
+from shards import ShardedRetriever
+from rerank import CrossEncoderReranker
+from extract import SentenceExtractor
+from cache import MISSING, ResponseCache, cache_key, make_backend
+from pool import InferencePool, PoolFullError
+from async_solr import AsyncSolrClient
+from metrics import MetricsRegistry
+from tracing import TRACE_HEADER, tracer
+from corpus import find_corpus
+from components import LazyComponent, NotReadyError
+from router import CHITCHAT, QUERY, UNCERTAIN, ConfidenceRouter
+from answer_index import AnswerIndex, QueryLog
+from crawler import TOPICS
+from functools import partial
+from collections import deque
+import asyncio
+import hmac
 import json
 import logging
+import os
+import threading
 import time
-from collections import defaultdict
 
 
+CHITCHAT_LABEL = "Chit-Chat"
+RETRIEVER_BACKENDS = ["solr", "bm25", "dense", "hybrid", "sharded"]
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Topics come from the request body; any outside the crawled set share one metric
+# label so counters, histograms and the timeline stay bounded
+METRIC_TOPICS = set(TOPICS) | {"General"}
+
+
+def metric_topic(topic):
+    return topic if isinstance(topic, str) and topic in METRIC_TOPICS else "other"
+
+
+def topic_label(topics):
+    # Metric label for a query over several topics
+    return metric_topic(topics[0]) if len(topics) == 1 else ("General" if not topics else "Multiple")
+
+
 class WikipediaRetriever:
-    def __init__(self):
+    def __init__(self, backend="solr", rerank_top_n=None, rerank_budget=None, indexer=None, answer_index=None):
+        if backend not in RETRIEVER_BACKENDS:
+            raise ValueError(f"Unknown retriever backend '{backend}', expected one of {RETRIEVER_BACKENDS}")
         self.CORE_NAME = "IRF24P3"
         self.VM_IP = "localhost"
-        self.query_fields = ["summary", "title"]
+        # url and revision_id identify the answering document for the answer index
+        self.query_fields = ["summary", "title", "url", "revision_id"]
         self.field_weights = {"title": 1.0, "summary": 3.0}
+        self.async_client = None
+
+        # Optional cross-encoder pass over the top lexical candidates (0 disables it)
+        rerank_top_n = int(os.environ.get("CHATBOT_RERANK_TOP_N", 0)) if rerank_top_n is None else rerank_top_n
+        rerank_budget = float(os.environ.get("CHATBOT_RERANK_BUDGET", 0.15)) if rerank_budget is None else rerank_budget
+        self.reranker = CrossEncoderReranker(top_n=rerank_top_n, budget=rerank_budget).load() if rerank_top_n else None
+        self.k = max(10, rerank_top_n)
+        # Only the sentences answering the query are returned, within this many characters (0 = whole summary)
+        self.extractor = SentenceExtractor(max_chars=int(os.environ.get("CHATBOT_MAX_ANSWER_CHARS", 400)))
+        # scraped_data.jsonl(.gz), or a legacy scraped_data.json array; both are streamed
+        self.data_path = find_corpus()
+
+        self.load_index(backend, indexer)
+        if answer_index is not None:
+            # Precomputed answers from documents that changed in this re-index are dropped
+            dropped = answer_index.refresh(self.data_path)
+            if dropped:
+                logging.info(f"Invalidated {dropped} precomputed answers")
+
+    def load_index(self, backend, indexer):
+        if indexer is not None:
+            # A ready backend (e.g. an Indexer pointed at a stub Solr): nothing to load or sync
+            self.indexer = indexer
+            if isinstance(indexer, Indexer):
+                self.async_client = AsyncSolrClient(indexer)
+            return
+
+        if backend == "sharded":
+            # One BM25 index per topic, queried in parallel
+            logging.info("Loading topic shards...")
+            self.indexer = ShardedRetriever.build_or_load(self.data_path, "shards", self.field_weights)
+            return
+
+        if backend in ("bm25", "dense", "hybrid"):
+            # In-process indexes, rebuilt only when the corpus changes
+            logging.info(f"Loading local {backend} index...")
+            if backend == "bm25":
+                self.indexer = BM25Index.build_or_load(self.data_path, "bm25_index", self.field_weights)
+            elif backend == "dense":
+                self.indexer = DenseIndex.build_or_load(self.data_path, "dense_index")
+            else:
+                self.indexer = HybridRetriever(
+                    BM25Index.build_or_load(self.data_path, "bm25_index", self.field_weights),
+                    DenseIndex.build_or_load(self.data_path, "dense_index"))
+            return
 
         logging.info("Initializing Indexer...")
         self.indexer = Indexer(self.CORE_NAME, self.VM_IP, self.query_fields, self.field_weights)
+        self.async_client = AsyncSolrClient(self.indexer)
 
-        # Perform initial setup and add fields
-        try:
-            logging.info("Performing initial setup for Solr indexer...")
-            self.indexer.do_initial_setup()
-            self.indexer.add_fields()
-            logging.info("Fields added successfully.")
-        except Exception as e:
-            logging.error(f"Error during Solr setup: {e}")
-
-        # Load and index data
+        # Sync the core with the corpus; only changed documents are re-sent to Solr
         try:
-            logging.info("Loading and indexing data from scraped_data.json...")
-            with open("scraped_data.json", "r") as f:
-                data = json.load(f)
-            self.indexer.create_documents(data)  # Add documents to the index
-            logging.info("Data indexed successfully.")
+            logging.info(f"Syncing Solr index with {self.data_path}...")
+            stats = self.indexer.sync_documents(self.data_path)
+            logging.info(f"Index synced: {stats}")
         except Exception as e:
-            logging.error(f"Error loading or indexing data: {e}")
+            logging.error(f"Error syncing the Solr index: {e}")
 
-    def get_data(self, query, topic):
+    def get_data(self, query, topics):
         # logging.debug(f"Querying Solr with query='{query}' and topic='{topic}'...")
         # try:
         #     results = self.indexer.query_solr(query, topic)
@@ -68,91 +142,513 @@ class WikipediaRetriever:
         #     return "An error occurred while retrieving data."
 
     # Query Solr using the Indexer instance
-        results = self.indexer.query_solr(query, topic)
-
+        results = self.search(query, topics)
+        with tracer.span("retriever.format"):
+            return self.format_results(results, query)
+
+    def search(self, query, topics):
+        # Ranked result documents, best first
+        with tracer.span("retriever.query") as span:
+            span.tag("topics", ",".join(topics))
+            results = list(self.indexer.query_solr(query, topics, self.k))
+        if self.reranker is not None:
+            results = self.reranker.rerank(query, results)
+        return results
+
+    async def aget_data(self, query, topics):
+        # Non-blocking variant: fans out one Solr request per topic over a pooled session
+        with tracer.span("retriever.query"):
+            if self.async_client is not None:
+                results = await self.async_client.query_async(query, topics, self.k)
+            else:
+                results = list(await asyncio.to_thread(self.indexer.query_solr, query, topics, self.k))
+        if self.reranker is not None:
+            results = await asyncio.to_thread(self.reranker.rerank, query, results)
+        with tracer.span("retriever.format"):
+            return self.format_results(results, query)
+
+    def format_results(self, results, query=""):
         if not results:
             return "No results found."
 
-        # Find the result with the highest score
-        highest_scored_result = max(results, key=lambda x: x.get("score", 0))
+        # Results arrive best first (by score, or by the reranker)
+        highest_scored_result = results[0]
 
         # Extract and format the result
         title = highest_scored_result.get("title", "[No Title]")
-        summary = highest_scored_result.get("summary", "[No Summary]")
+        summary = self.extractor.extract(query, highest_scored_result.get("summary") or "[No Summary]")
 
-        formatted_output = f"- Title: {title}\n  Summary: {summary}...\n"  # Truncate summary for readability
+        formatted_output = f"- Title: {title}\n  Summary: {summary}\n"
 
         return formatted_output
 
+    @staticmethod
+    def answer_summary(response):
+        # The summary text of a format_results response ("" when nothing was found)
+        _, found, summary = response.partition("\n  Summary: ")
+        return summary.rstrip("\n") if found else ""
+
 
 class Chatbot:
-    def __init__(self):
-        self.classifier = PromptClassifier()
-        self.chit_chat_api = ChitChatAPI()
-        self.wikipedia_retriever = WikipediaRetriever()
-
-        # Visualization Metrics
-        self.metrics = {
-            "total_queries": 0,
-            "chitchat_count": 0,
-            "queries_by_topic": defaultdict(int),
-            "response_times": defaultdict(list),
-            "topic_timeline": [],
-            "min_response_time": float('inf'),
-            "max_response_time": float('-inf')
+    def __init__(self, cache_url=None, cache_bytes=32 * 1024 * 1024, cache_ttl=3600, metrics_dir=None,
+                 background=True, ready_timeout=0.0, classifier=None, chit_chat_api=None, wikipedia_retriever=None,
+                 feedback_batch_size=32, max_pending_feedback=1024, linear_path="classifier_linear",
+                 online_model_path=ONLINE_MODEL_PATH, router=None,
+                 answer_index_path="answer_index", query_log=None, retriever_backend="solr", chat_backend="torch",
+                 generation="default"):
+        # Models and the index load in background threads (or on first use when
+        # background=False) so the server can bind right away. Requests that need a
+        # component still loading wait up to ready_timeout seconds, then get a 503.
+        # Passing an instance (e.g. a stub) skips loading that component.
+        # retriever_backend is one of RETRIEVER_BACKENDS, chat_backend one of chat.BACKENDS
+        # and generation a name in chat.GENERATION_SETTINGS; they are checked here so a
+        # typo fails at startup rather than in a loader thread.
+        if retriever_backend not in RETRIEVER_BACKENDS:
+            raise ValueError(f"Unknown retriever backend '{retriever_backend}', expected one of {RETRIEVER_BACKENDS}")
+        if chat_backend not in BACKENDS:
+            raise ValueError(f"Unknown chat backend '{chat_backend}', expected one of {BACKENDS}")
+        if generation not in GENERATION_SETTINGS:
+            raise ValueError(f"Unknown generation setting '{generation}', expected one of {list(GENERATION_SETTINGS)}")
+        self.ready_timeout = ready_timeout
+        # Frequent questions answered ahead of time (answer_index.py), checked before
+        # any model or Solr call; query_log records traffic for the next build
+        self.answer_index = AnswerIndex(answer_index_path)
+        self.query_log = QueryLog(query_log) if query_log else None
+        self.components = {
+            name: LazyComponent.ready(name, instance) if instance is not None else LazyComponent(name, factory)
+            for name, factory, instance in [
+                ("classifier", load_classifier, classifier),
+                ("chit_chat_api", partial(ChitChatAPI, chat_backend, dict(GENERATION_SETTINGS[generation])),
+                 chit_chat_api),
+                ("wikipedia_retriever", partial(WikipediaRetriever, retriever_backend, answer_index=self.answer_index),
+                 wikipedia_retriever),
+            ]
         }
-
-    def process_input(self, user_input, topics):
+        if background:
+            for component in self.components.values():
+                component.start()
+
+        # Repeated questions skip Solr / generation; cache_url ("redis://..." or "local")
+        # adds a backend shared between workers
+        shared = make_backend(cache_url)
+        self.retrieval_cache = ResponseCache("retrieval", cache_bytes, cache_ttl, shared)
+        self.reply_cache = ResponseCache("replies", cache_bytes, cache_ttl, shared)
+
+        # Visualization Metrics: bounded histograms and timeline; metrics_dir merges
+        # the numbers of all pre-forked workers
+        self.metrics = MetricsRegistry(metrics_dir)
+
+        # Confidence-gated routing (thresholds from tune_router.py when available);
+        # uncertain messages generate speculatively on the inference pool
+        self.router = router or ConfidenceRouter.load()
+
+        # Labelled messages from /feedback are learned feedback_batch_size at a time by
+        # the SGD classifier (loaded or trained on first use), which is then exported and
+        # swapped in as the serving classifier. A failed load is retried with backoff;
+        # meanwhile at most max_pending_feedback messages wait, the oldest dropped first.
+        # Pre-forked workers share the model on disk (see update_classifier) and pick up
+        # each other's exports through refresh_classifier.
+        self.online_classifier = LazyComponent("online_classifier",
+                                               partial(load_online_classifier, online_model_path, linear_path),
+                                               retry_backoff=30.0)
+        self.feedback_batch_size = feedback_batch_size
+        self.linear_path = linear_path
+        self.online_model_path = online_model_path
+        self.classifier_version = linear_version(linear_path)
+        self.next_classifier_check = 0.0
+        self.feedback = deque(maxlen=max_pending_feedback)
+        self.feedback_lock = threading.Lock()
+        self.update_lock = threading.Lock()
+
+    @property
+    def classifier(self):
+        return self.components["classifier"].get(self.ready_timeout)
+
+    @property
+    def chit_chat_api(self):
+        return self.components["chit_chat_api"].get(self.ready_timeout)
+
+    @property
+    def wikipedia_retriever(self):
+        return self.components["wikipedia_retriever"].get(self.ready_timeout)
+
+    def wait_until_ready(self, timeout=None):
+        for component in self.components.values():
+            component.get(timeout)
+
+    def readiness(self):
+        statuses = {name: component.status() for name, component in self.components.items()}
+        return all(status["state"] == "ready" for status in statuses.values()), statuses
+
+    def add_feedback(self, message, label):
+        # Returns the number of labelled messages still waiting for the next update.
+        # Raises NotReadyError while the online classifier cannot be loaded.
+        with self.feedback_lock:
+            if len(self.feedback) == self.feedback.maxlen:
+                self.metrics.inc("feedback_dropped")
+            self.feedback.append((message, label))
+            if len(self.feedback) < self.feedback_batch_size:
+                return len(self.feedback)
+        try:
+            self.update_classifier()
+        except NotReadyError as e:
+            if self.online_classifier.state == "failed":
+                raise
+            # The batch stays queued until the online classifier has loaded
+            logging.info(f"Classifier update postponed: {e}")
+        return len(self.feedback)
+
+    def update_classifier(self):
+        # Makes sure the online model exists before taking the batch
+        self.online_classifier.get(self.ready_timeout)
+        with self.update_lock, training_lock(self.online_model_path):
+            with self.feedback_lock:
+                batch = list(self.feedback)
+                self.feedback.clear()
+            if not batch:
+                return
+            messages, labels = zip(*batch)
+            with self.metrics.time("classifier_update"):
+                # Other workers may have updated the model since this one last did
+                model = OnlinePromptClassifier.load(self.online_model_path)
+                model.partial_fit(list(messages), list(labels))
+                model.save(self.online_model_path)
+                model.export_linear(self.linear_path)
+                self.online_classifier.set(model)
+                self.swap_classifier()
+            self.metrics.inc("classifier_updates")
+            self.metrics.inc("feedback", value=len(batch))
+
+    def swap_classifier(self):
+        # Requests already holding the old classifier finish with it
+        classifier = LinearPromptClassifier(self.linear_path)
+        self.classifier_version = classifier.version
+        self.components["classifier"].set(classifier)
+
+    def refresh_classifier(self):
+        # Picks up an artifact re-exported by another worker, checking at most once a second
+        now = time.monotonic()
+        if now < self.next_classifier_check:
+            return
+        self.next_classifier_check = now + 1.0
+        if not isinstance(self.components["classifier"].value, LinearPromptClassifier):
+            return
+        if linear_version(self.linear_path) != self.classifier_version:
+            with self.update_lock:
+                self.swap_classifier()
+
+    def count_query(self, topics):
+        # A query counts once for every topic it searched
+        for topic in map(metric_topic, topics or ["General"]):
+            self.metrics.inc("queries", topic)
+            self.metrics.event(topic)
+
+    def process_input(self, user_input, topics, session_id=None):
+        start_time = time.time()
+        with tracer.span("process_input", profile=True):
+            try:
+                response = self.lookup_answer(user_input, topics)
+                if response is not None:
+                    self.record_answer(user_input, topics, "index", start_time)
+                    return response
+
+                probability = self.chitchat_probability(user_input)
+                route = self.route(probability)
+
+                if route == UNCERTAIN:
+                    response, is_chat = self.speculate(user_input, topics, session_id, probability)
+                elif route == CHITCHAT:
+                    response, is_chat = self.generate(user_input, session_id), True
+                else:
+                    response, is_chat = self.retrieve(user_input, topics), False
+
+                self.record_answer(user_input, topics, "generation" if is_chat else "retrieval", start_time)
+                return response
+            except NotReadyError:
+                raise
+            except Exception as e:
+                logging.error(f"Error processing input: {e}")
+                return "An error occurred while processing your request."
+
+    def stream_input(self, user_input, topics, session_id=None, cancel=None):
+        # Same routing as process_input, but yields events as soon as they are available.
+        # An uncertain message is retrieved first and only streamed from the generator
+        # if retrieval did not answer it (a stream cannot be started speculatively).
+        # Setting `cancel` stops the generation.
         start_time = time.time()
         try:
-            input_type = self.classifier.predict([user_input])[0]  # 0 = Query, 1 = Chit-Chat
-
-            if input_type == 1:  # Chit-chat
-                self.metrics["chitchat_count"] += 1
-                response = self.chit_chat_api.get_response(user_input)
-            else:  # Query
-                topic = topics[0] if topics else "General"
-                self.metrics["queries_by_topic"][topic] += 1
-                self.metrics["total_queries"] += 1
-                response = self.wikipedia_retriever.get_data(user_input, topic)
-
-                # Record response time
-                elapsed_time = time.time() - start_time
-                self.metrics["response_times"][topic].append(elapsed_time)
-                self.metrics["min_response_time"] = min(self.metrics["min_response_time"], elapsed_time)
-                self.metrics["max_response_time"] = max(self.metrics["max_response_time"], elapsed_time)
-                self.metrics["topic_timeline"].append({"timestamp": time.time(), "topic": topic})
+            response = self.lookup_answer(user_input, topics)
+            if response is not None:
+                yield {"type": "result", "text": response}
+                self.record_answer(user_input, topics, "index", start_time)
+                yield {"type": "done"}
+                return
+
+            probability = self.chitchat_probability(user_input)
+            route = self.route(probability)
+
+            if route != CHITCHAT:
+                response = self.retrieve(user_input, topics)
+                if route == QUERY or self.accept_retrieval(user_input, response, probability):
+                    yield {"type": "result", "text": response}
+                    self.record_answer(user_input, topics, "retrieval", start_time)
+                    yield {"type": "done"}
+                    return
+
+            key = cache_key(user_input)
+            cacheable = self.reply_cacheable(session_id)
+            response = self.reply_cache.get(key) if cacheable else MISSING
+            if response is not MISSING:
+                if session_id is not None:
+                    self.chit_chat_api.remember_reply(user_input, session_id, response)
+                yield {"type": "token", "text": response}
+            else:
+                pieces = []
+                with self.metrics.time("generate"):
+                    for text in self.chit_chat_api.stream_response(user_input, session_id, cancel):
+                        pieces.append(text)
+                        yield {"type": "token", "text": text}
+                if cacheable and not (cancel and cancel.is_set()):
+                    self.reply_cache.set(key, "".join(pieces))
+            self.record_answer(user_input, topics, "generation", start_time)
+        except NotReadyError as e:
+            yield {"type": "error", "text": f"The chatbot is still starting up ({e}), please try again shortly."}
+        except Exception as e:
+            logging.error(f"Error streaming input: {e}")
+            yield {"type": "error", "text": "An error occurred while processing your request."}
+        yield {"type": "done"}
 
+    async def aprocess_input(self, user_input, topics, session_id=None):
+        # Used by the async /chat handler: retrieval awaits Solr instead of holding a
+        # thread, generation still runs on the bounded inference pool
+        start_time = time.time()
+        try:
+            response = self.lookup_answer(user_input, topics)
+            if response is not None:
+                self.record_answer(user_input, topics, "index", start_time)
+                return response
+
+            probability = self.chitchat_probability(user_input)
+            route = self.route(probability)
+
+            if route == CHITCHAT:
+                response = await asyncio.wrap_future(inference_pool.submit(self.generate, user_input, session_id))
+                is_chat = True
+            elif route == QUERY:
+                response, is_chat = await self.aretrieve(user_input, topics), False
+            else:
+                cancel = threading.Event()
+                try:
+                    generation = asyncio.wrap_future(
+                        inference_pool.submit(self.generate, user_input, session_id, cancel))
+                    # Cancelled or failed speculative generations are not awaited
+                    generation.add_done_callback(lambda future: future.cancelled() or future.exception())
+                except PoolFullError:
+                    # No room to speculate; generate after retrieval if it is still needed
+                    generation = None
+                try:
+                    response = await self.aretrieve(user_input, topics)
+                except BaseException:
+                    cancel.set()
+                    raise
+                is_chat = not self.accept_retrieval(user_input, response, probability)
+                if not is_chat:
+                    cancel.set()
+                else:
+                    if generation is None:
+                        generation = asyncio.wrap_future(inference_pool.submit(self.generate, user_input, session_id))
+                    with self.metrics.time("speculation_wait"):
+                        response = await generation
+
+            self.record_answer(user_input, topics, "generation" if is_chat else "retrieval", start_time)
             return response
+        except (PoolFullError, NotReadyError):
+            raise
         except Exception as e:
             logging.error(f"Error processing input: {e}")
             return "An error occurred while processing your request."
 
-    def get_metrics(self):
-        avg_response_times = {
-            topic: sum(times) / len(times) if times else 0
-            for topic, times in self.metrics["response_times"].items()
-        }
-        most_popular_topic = max(
-            self.metrics["queries_by_topic"], key=self.metrics["queries_by_topic"].get, default="None"
-        )
-
-        return {
-            "total_queries": self.metrics["total_queries"],
-            "chitchat_count": self.metrics["chitchat_count"],
-            "queries_by_topic": self.metrics["queries_by_topic"],
-            "avg_response_times": avg_response_times,
-            "most_popular_topic": most_popular_topic,
-            "topic_timeline": self.metrics["topic_timeline"],
-            "min_response_time": self.metrics["min_response_time"],
-            "max_response_time": self.metrics["max_response_time"],
+    def chitchat_probability(self, user_input):
+        self.refresh_classifier()
+        with self.metrics.time("classify"), tracer.span("classify"):
+            return float(self.classifier.predict_proba([user_input])[0, 1])
+
+    def route(self, probability):
+        route = self.router.decide(probability)
+        self.metrics.inc("routing", route)
+        return route
+
+    def accept_retrieval(self, user_input, response, probability):
+        # Settles an uncertain message after retrieval; counts the cases a hard 0.5
+        # cut on the classifier would have sent the other way
+        accepted = self.router.accept_retrieval(user_input, WikipediaRetriever.answer_summary(response))
+        self.metrics.inc("routing", "speculative_retrieval" if accepted else "speculative_generation")
+        if accepted and probability > 0.5:
+            # Generation skipped
+            self.metrics.inc("routing_overrides", "to_retrieval")
+        elif not accepted and probability <= 0.5:
+            self.metrics.inc("routing_overrides", "to_generation")
+        return accepted
+
+    def speculate(self, user_input, topics, session_id, probability):
+        # The classifier is unsure: retrieval runs here while generation starts on the
+        # inference pool. A retrieved answer that covers the query wins and cancels the
+        # generation; otherwise the generated reply is used. Returns (response, is_chat).
+        cancel = threading.Event()
+        try:
+            generation = inference_pool.submit(self.generate, user_input, session_id, cancel)
+        except PoolFullError:
+            # No room to speculate; generate after retrieval if it is still needed
+            generation = None
+        with tracer.span("speculate"):
+            try:
+                response = self.retrieve(user_input, topics)
+            except BaseException:
+                cancel.set()
+                raise
+            if self.accept_retrieval(user_input, response, probability):
+                cancel.set()
+                if generation is not None:
+                    generation.cancel()
+                return response, False
+            with self.metrics.time("speculation_wait"):
+                # A generation still queued runs here instead: this thread is usually a
+                # pool worker itself, and waiting on the queue could deadlock the pool
+                if generation is None or generation.cancel():
+                    return self.generate(user_input, session_id), True
+                return generation.result(), True
+
+    def reply_cacheable(self, session_id):
+        # Replies within a conversation depend on its history. The first message of a
+        # session has none, like a stateless one, so both share the reply cache (the UI
+        # always sends a session id, so this is most of the cacheable traffic).
+        return session_id is None or not self.chit_chat_api.sessions.get(session_id)
+
+    def generate(self, user_input, session_id=None, cancel=None):
+        # Returns None if `cancel` was set before the reply was finished
+        key = cache_key(user_input)
+        cacheable = self.reply_cacheable(session_id)
+        response = self.reply_cache.get(key) if cacheable else MISSING
+        if response is not MISSING:
+            if session_id is not None:
+                self.chit_chat_api.remember_reply(user_input, session_id, response)
+            return response
+        if cancel is not None and cancel.is_set():
+            return None
+        start = time.perf_counter()
+        response = self.chit_chat_api.get_response(user_input, session_id, cancel=cancel)
+        if response is None:
+            self.metrics.inc("speculation_cancelled")
+            return None
+        self.metrics.observe("generate", time.perf_counter() - start)
+        if cacheable:
+            self.reply_cache.set(key, response)
+        return response
+
+    def lookup_answer(self, user_input, topics):
+        with tracer.span("answer_index"):
+            response = self.answer_index.lookup(user_input, topics)
+        self.metrics.inc("answer_index", "miss" if response is None else "hit")
+        return response
+
+    def record_answer(self, user_input, topics, answer, start_time):
+        # answer is how the message was answered: "generation", "retrieval" or "index"
+        if answer == "generation":
+            self.metrics.inc("chitchat")
+            self.record_response_time(CHITCHAT_LABEL, start_time)
+        else:
+            self.count_query(topics)
+            self.record_response_time(topics, start_time)
+        if self.query_log is not None:
+            self.query_log.record(user_input, topics, answer)
+
+    async def aretrieve(self, user_input, topics):
+        key = cache_key(user_input, topics)
+        response = self.retrieval_cache.get(key)
+        if response is MISSING:
+            retrieve_start = time.perf_counter()
+            response = await self.wikipedia_retriever.aget_data(user_input, topics)
+            self.metrics.observe("retrieve", time.perf_counter() - retrieve_start, topic_label(topics))
+            self.retrieval_cache.set(key, response)
+        return response
+
+    def retrieve(self, user_input, topics):
+        # Searches every selected topic at once (no topics searches them all)
+        key = cache_key(user_input, topics)
+        response = self.retrieval_cache.get(key)
+        if response is MISSING:
+            with self.metrics.time("retrieve", topic_label(topics)):
+                response = self.wikipedia_retriever.get_data(user_input, topics)
+            self.retrieval_cache.set(key, response)
+        return response
+
+    def record_response_time(self, labels, start_time):
+        elapsed = time.time() - start_time
+        for label in [labels] if isinstance(labels, str) else map(metric_topic, labels or ["General"]):
+            self.metrics.observe("response", elapsed, label)
+
+    def get_metrics(self, since=0):
+        metrics = self.metrics.dashboard(since)
+        metrics["cache"] = {
+            "retrieval": self.retrieval_cache.get_stats(),
+            "replies": self.reply_cache.get_stats(),
         }
+        metrics["answer_index"] = {**self.answer_index.stats, "entries": len(self.answer_index)}
+        sessions = getattr(self.components["chit_chat_api"].value, "sessions", None)
+        if sessions is not None:
+            metrics["sessions"] = sessions.get_stats()
+        return metrics
+
+    def get_prometheus_metrics(self):
+        lines = [self.metrics.prometheus()]
+        for name, cache in (("retrieval", self.retrieval_cache), ("replies", self.reply_cache)):
+            stats = cache.get_stats()
+            for stat in ("hits", "shared_hits", "misses", "evictions"):
+                lines.append(f'chatbot_cache_{stat}_total{{cache="{name}"}} {stats[stat]}\n')
+            lines.append(f'chatbot_cache_bytes{{cache="{name}"}} {stats["bytes"]}\n')
+        return "".join(lines)
 
 
 # Flask app
 app = Flask(__name__)
 CORS(app)
-chat_system = Chatbot()
+chat_system = Chatbot(cache_url=os.environ.get("CHATBOT_CACHE_URL"),
+                      metrics_dir=os.environ.get("CHATBOT_METRICS_DIR"),
+                      # A spawned helper process (e.g. the shard build) re-imports this module
+                      # as __mp_main__ when it was run as a script; it must not load models
+                      background=os.environ.get("CHATBOT_PRELOAD", "1") != "0" and __name__ != "__mp_main__",
+                      query_log=os.environ.get("CHATBOT_QUERY_LOG"),
+                      retriever_backend=os.environ.get("CHATBOT_RETRIEVER_BACKEND", "solr"),
+                      chat_backend=os.environ.get("CHATBOT_CHAT_BACKEND", "torch"),
+                      generation=os.environ.get("CHATBOT_GENERATION", "default"))
+inference_pool = InferencePool(int(os.environ.get("CHATBOT_POOL_WORKERS", 2)),
+                               int(os.environ.get("CHATBOT_POOL_QUEUE", 8)))
+DEBUG_ENDPOINTS = os.environ.get("CHATBOT_DEBUG_ENDPOINTS", "0") == "1"
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
+# /feedback trains the serving classifier, so remote clients must send this as a bearer token
+FEEDBACK_TOKEN = os.environ.get("CHATBOT_FEEDBACK_TOKEN")
+
+
+@app.before_request
+def start_trace():
+    request.trace_id = tracer.start_trace(request.headers.get(TRACE_HEADER))
+
+
+@app.after_request
+def finish_trace(response):
+    response.headers[TRACE_HEADER] = request.trace_id
+    # Streaming responses finish their trace when the stream ends
+    if not response.is_streamed:
+        tracer.finish_trace()
+    return response
+
+
+def busy_response():
+    return jsonify({'error': 'Server is busy, please retry.'}), 503, {'Retry-After': '1'}
+
+
+def not_ready_response(error):
+    return jsonify({'error': f'Still starting up: {error}'}), 503, {'Retry-After': '5'}
 
 
 @app.route('/chat', methods=['POST'])
@@ -161,26 +657,168 @@ def chat():
         data = request.json
         topics = data.get('topics', [])
         user_input = data.get('message', '')
+        session_id = data.get('session_id')
 
         if user_input.lower() == "exit":
             return jsonify({'response': "Goodbye!"})
 
-        bot_response = chat_system.process_input(user_input, topics)
-        return jsonify({'response': bot_response})
+        bot_response = inference_pool.submit(chat_system.process_input, user_input, topics, session_id).result()
+        with tracer.span("serialize"):
+            return jsonify({'response': bot_response})
+    except PoolFullError:
+        return busy_response()
+    except NotReadyError as e:
+        return not_ready_response(e)
     except Exception as e:
         logging.error(f"Error in chat endpoint: {e}")
         return jsonify({'error': 'An error occurred during processing.'}), 500
 
 
+@app.route('/chat/async', methods=['POST'])
+async def chat_async():
+    try:
+        data = request.json
+        topics = data.get('topics', [])
+        user_input = data.get('message', '')
+        session_id = data.get('session_id')
+
+        if user_input.lower() == "exit":
+            return jsonify({'response': "Goodbye!"})
+
+        with tracer.span("process_input"):
+            bot_response = await chat_system.aprocess_input(user_input, topics, session_id)
+        with tracer.span("serialize"):
+            return jsonify({'response': bot_response})
+    except PoolFullError:
+        return busy_response()
+    except NotReadyError as e:
+        return not_ready_response(e)
+    except Exception as e:
+        logging.error(f"Error in async chat endpoint: {e}")
+        return jsonify({'error': 'An error occurred during processing.'}), 500
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    try:
+        data = request.json
+        topics = data.get('topics', [])
+        user_input = data.get('message', '')
+        session_id = data.get('session_id')
+    except Exception as e:
+        logging.error(f"Error in stream endpoint: {e}")
+        return jsonify({'error': 'An error occurred during processing.'}), 500
+
+    if user_input.lower() == "exit":
+        stream = iter([{"type": "result", "text": "Goodbye!"}, {"type": "done"}])
+    else:
+        # Hold a pool slot for the whole stream so streaming and /chat share one budget
+        try:
+            inference_pool.acquire()
+        except PoolFullError:
+            return busy_response()
+        cancel = threading.Event()
+        stream = chat_system.stream_input(user_input, topics, session_id, cancel)
+
+    trace = tracer.current_trace()
+
+    def events():
+        with tracer.span("stream"):
+            for event in stream:
+                yield f"data: {json.dumps(event)}\n\n"
+
+    def close():
+        # Runs when the server closes the response, including a client that went away
+        # before the first event, where a finally inside events() would never run. The
+        # generation is cancelled and waited for before its slot is freed, so clients
+        # that drop and reconnect cannot run more generations than the pool allows.
+        if user_input.lower() != "exit":
+            cancel.set()
+            try:
+                stream.close()
+            finally:
+                inference_pool.release()
+        tracer.finish_trace(trace)
+
+    # Server-Sent Events over a chunked response; disable proxy buffering so tokens flush immediately
+    response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(close)
+    return response
+
+
+@app.route('/feedback', methods=['POST'])
+def feedback():
+    # POST {"message": "...", "label": 0 | 1} (0 = Query, 1 = Chit-Chat) to correct the classifier.
+    # Only local clients may use it unless CHATBOT_FEEDBACK_TOKEN is set and sent as
+    # "Authorization: Bearer <token>".
+    authorization = request.headers.get('Authorization', '').encode()
+    if request.remote_addr not in LOOPBACK_ADDRESSES and not (
+            FEEDBACK_TOKEN and hmac.compare_digest(authorization, f"Bearer {FEEDBACK_TOKEN}".encode())):
+        return jsonify({'error': 'Feedback requires a local client or a valid token.'}), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    message, label = data.get('message', ''), data.get('label')
+    if not message or label not in (0, 1):
+        return jsonify({'error': 'Expected a message and a label of 0 (query) or 1 (chit-chat).'}), 400
+    try:
+        pending = chat_system.add_feedback(message, label)
+    except NotReadyError as e:
+        return not_ready_response(e)
+    except Exception as e:
+        logging.error(f"Error in feedback endpoint: {e}")
+        return jsonify({'error': 'An error occurred while updating the classifier.'}), 500
+    return jsonify({'pending': pending})
+
+
 @app.route('/metrics', methods=['GET'])
 def metrics():
     try:
-        return jsonify(chat_system.get_metrics())
+        # ?since=<unix time> only returns timeline buckets from that point on
+        return jsonify(chat_system.get_metrics(request.args.get('since', 0, type=float)))
     except Exception as e:
         logging.error(f"Error in metrics endpoint: {e}")
         return jsonify({'error': 'An error occurred while retrieving metrics.'}), 500
 
 
+@app.route('/metrics/prometheus', methods=['GET'])
+def prometheus_metrics():
+    return Response(chat_system.get_prometheus_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # The process is up and serving; components may still be loading
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    ready, components = chat_system.readiness()
+    return jsonify({'ready': ready, 'components': components}), 200 if ready else 503
+
+
+@app.route('/debug/tracing', methods=['GET', 'POST'])
+def tracing_settings():
+    # POST {"sample_rate": 0.1, "profile_rate": 0.01} to change at runtime. Only local
+    # clients may use it unless CHATBOT_DEBUG_ENDPOINTS=1; the export target is startup
+    # config only (CHATBOT_TRACE_EXPORT).
+    if not DEBUG_ENDPOINTS and request.remote_addr not in LOOPBACK_ADDRESSES:
+        return jsonify({'error': 'Debug endpoints are only available locally.'}), 403
+    if request.method == 'POST':
+        data = request.json or {}
+        try:
+            rates = [None if data.get(key) is None else float(data[key]) for key in ('sample_rate', 'profile_rate')]
+        except (TypeError, ValueError):
+            rates = [-1.0]
+        if any(rate is not None and not 0 <= rate <= 1 for rate in rates):
+            return jsonify({'error': 'Expected sample_rate and profile_rate between 0 and 1.'}), 400
+        tracer.configure(*rates)
+    return jsonify(tracer.settings())
+
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    # The reloader would load every model a second time; use serve.py for production
+    app.run(debug=True, use_reloader=False)
 
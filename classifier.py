@@ -1,66 +1,181 @@
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.utils import shuffle
-import chitchat_dataset as chat_data
 import numpy as np
 # import torch
-import joblib
+import csv
+import hashlib
+import json
 import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import samples
+from tracing import tracer
+
+# Same tokens as CountVectorizer's defaults (lowercased, 2+ word characters)
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+QA_DATA_PATHS = ['data/WikiQA-train.tsv', 'data/WikiQA-test.tsv', 'data/WikiQA-dev.tsv']
+ONLINE_MODEL_PATH = "classifier_online.joblib"
+CLASSES = np.array([0, 1])  # 0 = Query, 1 = Chit-Chat
+
+
+def hash_token(token: str) -> int:
+    # Stable 64-bit token hash (crc32 and adler32 side by side), so the featurizer
+    # needs no vocabulary dict
+    data = token.encode("utf-8")
+    return zlib.crc32(data) << 32 | zlib.adler32(data)
+
+
+def hash_tokens(texts: list) -> tuple:
+    # Flattened token hashes and the index of the text each one came from
+    hashes, rows = [], []
+    for row, text in enumerate(texts):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        hashes.extend(map(hash_token, tokens))
+        rows.extend([row] * len(tokens))
+    return np.array(hashes, dtype=np.uint64), np.array(rows, dtype=np.int64)
+
+
+def hash_buckets(hashes: np.ndarray, buckets: int) -> np.ndarray:
+    # Feature column of each token hash in a hashed model. Taken from the crc32 half:
+    # the low bits of adler32 barely vary over short words, and folding on them made
+    # common tokens share buckets.
+    return ((hashes >> np.uint64(32)) % np.uint64(buckets)).astype(np.int64)
+
+
+def read_questions(paths: list):
+    # Parses only the Question column of each WikiQA TSV (the header is consumed by
+    # read_csv), reading the files in parallel
+    import pandas as pd
+
+    def read(path):
+        try:
+            return pd.read_csv(path, sep="\t", usecols=["Question"], dtype=str, quoting=csv.QUOTE_NONE,
+                               keep_default_na=False)["Question"]
+        except Exception as e:
+            print(f"An error occurred while reading {path}: {e}")
+            return pd.Series([], dtype=object)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(paths))) as executor:
+        return pd.concat(list(executor.map(read, paths)), ignore_index=True)
+
+
+def read_chats(chat_dataset):
+    # Opening message of every conversation
+    import pandas as pd
+
+    return pd.Series([convo['messages'][0][0]['text'] for convo in chat_dataset.values()], dtype=object)
+
+
+def prepare_data(chat_dataset, QAdata_paths):
+    # Deduplicated, shuffled (text, label) frame; 0 = Query, 1 = Chit-Chat
+    import pandas as pd
+
+    # The first 1200 conversations (after the first one) are left out of training
+    chats = read_chats(chat_dataset).iloc[1:].drop_duplicates().iloc[1200:]
+    queries = read_questions(QAdata_paths).drop_duplicates()
+    df = pd.DataFrame({
+        "text": pd.concat([queries, chats], ignore_index=True),
+        "label": np.repeat([0, 1], [len(queries), len(chats)]),
+    })
+    return df.sample(frac=1).reset_index(drop=True)
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_linear(path: str, weights: np.ndarray, classes: np.ndarray, keys: np.ndarray = None, buckets: int = 0,
+                source: str = None):
+    # Every export is written to a new directory beside `path`, and `path` is a symlink
+    # swapped to it with one rename. A reader that resolves the link once therefore
+    # never pairs the arrays of two exports (say old keys with new weights). The
+    # previous export stays for readers still opening it; older ones are removed.
+    # `source` is the digest of the model file the export was made from.
+    parent, name = os.path.split(os.path.abspath(path))
+    version = tempfile.mkdtemp(dir=parent, prefix=f".{name}-")
+    arrays = {"weights.npy": weights.astype(np.float64), "classes.npy": classes}
+    if keys is not None:
+        arrays["keys.npy"] = keys
+    for file_name, array in arrays.items():
+        with open(os.path.join(version, file_name), "wb") as f:
+            np.save(f, array)
+    with open(os.path.join(version, "meta.json"), "w") as f:
+        json.dump({"buckets": buckets, "source": source}, f)
+
+    link = version + ".link"
+    os.symlink(os.path.basename(version), link)
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A plain directory written before exports were versioned
+        shutil.rmtree(path)
+    os.replace(link, path)
+    for entry in os.listdir(parent):
+        old = os.path.join(parent, entry)
+        # Exports from the last minute may belong to a concurrent writer
+        if (entry.startswith(f".{name}-") and os.path.isdir(old) and old not in (version, previous)
+                and time.time() - os.path.getmtime(old) > 60):
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def linear_version(path: str = "classifier_linear"):
+    # Changes whenever save_linear swaps in a new export
+    if os.path.islink(path):
+        return os.path.realpath(path)
+    if os.path.isfile(os.path.join(path, "weights.npy")):
+        return os.stat(os.path.join(path, "weights.npy")).st_mtime_ns
+    return None
+
+
+@contextmanager
+def training_lock(model_path: str = ONLINE_MODEL_PATH):
+    # Serializes online training across pre-forked workers: the model on disk is the
+    # single copy, and each update reads it, learns the batch and writes it back under
+    # this lock
+    import fcntl
+
+    with open(model_path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 
 class PromptClassifier:
     def __init__(self, model_path= 'classifier_model.pth'):
-        self.vectorizer = CountVectorizer()
-        self.classifier = LogisticRegression()
         self.model_path = model_path
 
         if os.path.isfile(self.model_path):
             self.load_model() 
             print("Model loaded")
         else:
+            # Training-only dependencies are imported here so loading a saved model stays cheap
+            import chitchat_dataset as chat_data
+            from sklearn.feature_extraction.text import CountVectorizer
+            from sklearn.linear_model import LogisticRegression
+
+            self.vectorizer = CountVectorizer()
+            self.classifier = LogisticRegression()
             chat_dataset = chat_data.Dataset()
-            QAdata_paths = ['data/WikiQA-train.tsv', 'data/WikiQA-test.tsv', 'data/WikiQA-dev.tsv']
-            df = self.prepare_data(chat_dataset, QAdata_paths)
+            df = self.prepare_data(chat_dataset, QA_DATA_PATHS)
             self.train(df)
             self.save_model()
             print("model trained and saved")
 
-    def clean_data(self, df, text_column="text", label_column="label"):
-        df = df[1:]
-        df = df.drop_duplicates(subset=[text_column, label_column]).reset_index(drop=True)
-        return df
-
     def prepare_data(self, chat_dataset, QAdata_paths):
-        # Prepare chat data
-        chat_data = []
-        for convo_id, convo in chat_dataset.items():
-            chat_data.append({"text": convo['messages'][0][0]['text'], 'label': "chit-chat"})
-        chat_df = self.clean_data(pd.DataFrame(chat_data))
-        chat_df = chat_df.iloc[1200:].reset_index(drop=True)
-
-        # Prepare query data
-        query_data = []
-        for path in QAdata_paths:
-            try:
-                with open(path, 'r') as file:
-                    for line in file:
-                        query_data.append({"text": line.split("\t")[1], 'label': "Query"})
-            except Exception as e:
-                print(f"An error occurred while reading {path}: {e}")
-        query_df = self.clean_data(pd.DataFrame(query_data))
-
-        # Combine and shuffle datasets
-        combined_df = pd.concat([query_df, chat_df], ignore_index=True)
-        combined_df = shuffle(combined_df).reset_index(drop=True)
-
-        # Map labels
-        combined_df['label'] = combined_df['label'].map({'Query': 0, 'chit-chat': 1})
-
-        return combined_df
+        return prepare_data(chat_dataset, QAdata_paths)
 
     def train(self, df):
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+
         X = self.vectorizer.fit_transform(df['text'])
         y = df['label']
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.1, random_state=42)
@@ -70,9 +185,10 @@ class PromptClassifier:
         print(f"Training Accuracy: {accuracy:.4f}")
 
     def predict(self, samples):
-        print("sample in classifier class", samples)
-        X_samples = self.vectorizer.transform(samples)
-        return self.classifier.predict(X_samples)
+        with tracer.span("classifier.vectorize"):
+            X_samples = self.vectorizer.transform(samples)
+        with tracer.span("classifier.predict"):
+            return self.classifier.predict(X_samples)
 
     def evaluate(self, samples, GT):
         predictions = self.predict(samples)
@@ -82,233 +198,267 @@ class PromptClassifier:
         return correct_predictions
     
     def save_model(self):
+        import joblib
+
         # torch.save(self.classifier.state_dict(), self.model_path)
         joblib.dump({"classifier": self.classifier, "vectorizer": self.vectorizer}, self.model_path)
 
     def load_model(self):
+        import joblib
+
         data = joblib.load(self.model_path)
         self.classifier = data["classifier"]
         self.vectorizer = data["vectorizer"]
-    
+
+    def export_linear(self, path: str = "classifier_linear"):
+        # Writes the fitted model as sorted token hashes plus one weight per token
+        # (intercept last), which LinearPromptClassifier scores without sklearn
+        vocabulary = self.vectorizer.vocabulary_
+        tokens = sorted(vocabulary, key=vocabulary.get)
+        keys = np.array([hash_token(token) for token in tokens], dtype=np.uint64)
+        order = np.argsort(keys)
+        keys = keys[order]
+        if len(np.unique(keys)) != len(keys):
+            raise ValueError("Token hash collision in vocabulary, cannot export linear model")
+        weights = np.append(self.classifier.coef_[0][order], self.classifier.intercept_[0])
+        source = file_digest(self.model_path) if os.path.isfile(self.model_path) else None
+        save_linear(path, weights, self.classifier.classes_, keys=keys, source=source)
+
+
+class OnlinePromptClassifier:
+    # Logistic regression trained by SGD over hashed token counts (the tokens and
+    # hashes LinearPromptClassifier uses, folded into `buckets` features). New labelled
+    # messages are learned a mini-batch at a time with partial_fit, no full retrain.
+    def __init__(self, buckets: int = 2 ** 18, alpha: float = 1e-5, seed: int = 0):
+        from sklearn.linear_model import SGDClassifier
+
+        self.buckets = buckets
+        self.classifier = SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)
+        self.updates = 0
+
+    @classmethod
+    def from_prompt_classifier(cls, prompt_classifier: "PromptClassifier", buckets: int = 2 ** 18,
+                               alpha: float = 1e-5, steps: float = 1e6):
+        # Starts from the shipped LogisticRegression weights, folded into the hash
+        # buckets, so the swapped-in model keeps the probabilities the router thresholds
+        # were tuned on. `steps` sets how far along SGD's learning-rate schedule the
+        # model starts (eta ~ 1 / (alpha * steps)), so feedback moves the weights gradually.
+        model = cls(buckets, alpha)
+        vocabulary = prompt_classifier.vectorizer.vocabulary_
+        tokens = sorted(vocabulary, key=vocabulary.get)
+        columns = hash_buckets(np.array([hash_token(token) for token in tokens], dtype=np.uint64), buckets)
+        coef = np.bincount(columns, weights=prompt_classifier.classifier.coef_[0], minlength=buckets)
+        model.classifier.coef_ = coef.reshape(1, -1)
+        model.classifier.intercept_ = np.array(prompt_classifier.classifier.intercept_, dtype=np.float64)
+        model.classifier.classes_ = CLASSES
+        model.classifier.t_ = float(steps)
+        return model
+
+    def features(self, texts):
+        from scipy.sparse import csr_matrix
+
+        # Repeated (row, bucket) entries are summed, giving token counts
+        hashes, rows = hash_tokens(list(texts))
+        columns = hash_buckets(hashes, self.buckets)
+        return csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(texts), self.buckets))
+
+    def partial_fit(self, texts, labels):
+        self.classifier.partial_fit(self.features(texts), np.asarray(labels), classes=CLASSES)
+        self.updates += len(texts)
+        return self
+
+    def fit(self, texts, labels, epochs: int = 5, batch_size: int = 4096, seed: int = 0):
+        # Featurizes once, then streams shuffled mini-batches through partial_fit
+        X, y = self.features(texts), np.asarray(labels)
+        rng = np.random.RandomState(seed)
+        for _ in range(epochs):
+            order = rng.permutation(len(y))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                self.classifier.partial_fit(X[batch], y[batch], classes=CLASSES)
+        self.updates += len(y)
+        return self
+
+    def predict(self, samples):
+        return self.classifier.predict(self.features(samples))
+
+    def predict_proba(self, samples) -> np.ndarray:
+        return self.classifier.predict_proba(self.features(samples))
+
+    def evaluate(self, samples, labels) -> float:
+        return float(np.mean(self.predict(samples) == np.asarray(labels)))
+
+    def save(self, path: str = ONLINE_MODEL_PATH):
+        import joblib
+
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(self, f)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    @staticmethod
+    def load(path: str = ONLINE_MODEL_PATH):
+        import joblib
+
+        return joblib.load(path)
+
+    def export_linear(self, path: str = "classifier_linear"):
+        weights = np.append(self.classifier.coef_[0], self.classifier.intercept_[0])
+        save_linear(path, weights, self.classifier.classes_, buckets=self.buckets)
+
+
+def train_online_classifier(model_path: str = ONLINE_MODEL_PATH, linear_path: str = "classifier_linear",
+                            epochs: int = 5, chat_dataset=None) -> tuple:
+    # Full training run of the online classifier; returns the model and the seconds
+    # spent in each stage
+    import time
+
+    if chat_dataset is None:
+        import chitchat_dataset as chat_data
+
+        chat_dataset = chat_data.Dataset()
+    timings = {}
+    start = time.perf_counter()
+    df = prepare_data(chat_dataset, QA_DATA_PATHS)
+    timings["prepare"] = time.perf_counter() - start
+
+    split = int(len(df) * 0.9)
+    start = time.perf_counter()
+    model = OnlinePromptClassifier().fit(df["text"][:split], df["label"][:split], epochs)
+    timings["train"] = time.perf_counter() - start
+    print(f"Training Accuracy: {model.evaluate(df['text'][split:], df['label'][split:]):.4f}")
+
+    start = time.perf_counter()
+    model.save(model_path)
+    model.export_linear(linear_path)
+    timings["save"] = time.perf_counter() - start
+    return model, timings
+
+
+def init_online_classifier(model_path: str = ONLINE_MODEL_PATH, prompt_model_path: str = 'classifier_model.pth'):
+    # The online model as a copy of the shipped classifier (see from_prompt_classifier)
+    model = OnlinePromptClassifier.from_prompt_classifier(PromptClassifier(prompt_model_path))
+    model.save(model_path)
+    return model
+
+
+def load_online_classifier(model_path: str = ONLINE_MODEL_PATH, linear_path: str = "classifier_linear"):
+    # Under the training lock, so only one worker creates a missing model. A missing
+    # model starts from the shipped one rather than a fresh training run, whose
+    # probabilities router.json was not tuned on.
+    with training_lock(model_path):
+        if os.path.isfile(model_path):
+            return OnlinePromptClassifier.load(model_path)
+        return init_online_classifier(model_path)
+
+
+class LinearPromptClassifier:
+    # Inference-only classifier over the artifact written by PromptClassifier.export_linear
+    # or OnlinePromptClassifier.export_linear. The arrays are memory-mapped, and a batch
+    # is scored with one searchsorted (or modulo, for hashed models) and one bincount,
+    # giving the same predictions as the sklearn model.
+    def __init__(self, path: str = "classifier_linear", attempts: int = 3):
+        self.path = path
+        # Every file is read from the export the link pointed to when loading started
+        for attempt in range(attempts):
+            directory = os.path.realpath(path)
+            self.version = directory if os.path.islink(path) else linear_version(path)
+            try:
+                self.load(directory)
+                return
+            except FileNotFoundError:
+                # That export was removed in the meantime
+                if attempt == attempts - 1:
+                    raise
+
+    def load(self, directory: str):
+        self.meta = {"buckets": 0}
+        if os.path.isfile(os.path.join(directory, "meta.json")):
+            with open(os.path.join(directory, "meta.json"), "r") as f:
+                self.meta = json.load(f)
+        self.buckets = self.meta["buckets"]
+        self.keys = None if self.buckets else np.load(os.path.join(directory, "keys.npy"), mmap_mode="r")
+        weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode="r")
+        self.weights = weights[:-1]
+        self.intercept = float(weights[-1])
+        self.classes = np.load(os.path.join(directory, "classes.npy"))
+
+    def decision_function(self, samples) -> np.ndarray:
+        with tracer.span("classifier.vectorize"):
+            hashes, rows = hash_tokens(samples)
+        with tracer.span("classifier.predict"):
+            scores = np.full(len(samples), self.intercept)
+            if self.buckets:
+                columns = hash_buckets(hashes, self.buckets)
+                scores += np.bincount(rows, weights=self.weights[columns], minlength=len(samples))
+            elif len(hashes) and len(self.keys):
+                positions = np.minimum(np.searchsorted(self.keys, hashes), len(self.keys) - 1)
+                known = self.keys[positions] == hashes
+                scores += np.bincount(rows[known], weights=self.weights[positions[known]], minlength=len(samples))
+            return scores
+
+    def predict(self, samples):
+        return self.classes[(self.decision_function(samples) > 0).astype(np.int64)]
+
+    def predict_proba(self, samples) -> np.ndarray:
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(samples)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def evaluate(self, samples, GT):
+        predictions = self.predict(samples)
+        correct_predictions = np.sum(predictions == GT)
+        print(f"Correct Predictions: {correct_predictions} out of {len(samples)}")
+        return correct_predictions
+
+
+def load_classifier(model_path: str = 'classifier_model.pth', linear_path: str = 'classifier_linear'):
+    # Serves the exported linear model, training and/or exporting it on first use, and
+    # re-exporting when the model file's content differs from the one exported. An
+    # export of the online classifier (hashed, buckets > 0) holds what /feedback taught
+    # it and is never replaced from the shipped model.
+    if os.path.isfile(os.path.join(linear_path, "weights.npy")):
+        classifier = LinearPromptClassifier(linear_path)
+        if classifier.buckets or not os.path.isfile(model_path):
+            return classifier
+        if classifier.meta.get("source") == file_digest(model_path):
+            return classifier
+    PromptClassifier(model_path).export_linear(linear_path)
+    return LinearPromptClassifier(linear_path)
+
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the prompt classifier")
+    parser.add_argument("--online", action="store_true",
+                        help="Create the SGD classifier that learns from /feedback from the shipped model")
+    parser.add_argument("--retrain", action="store_true",
+                        help="With --online, train it from scratch and export it for serving instead "
+                             "(changes its probabilities; re-run tune_router.py afterwards)")
+    args = parser.parse_args()
+    if args.online and args.retrain:
+        _, timings = train_online_classifier()
+        print("  ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+        raise SystemExit
+    if args.online:
+        model = init_online_classifier()
+        shipped = load_classifier()
+        texts = samples.queries + samples.chats
+        probabilities = model.predict_proba(texts)[:, 1]
+        print(f"Online model written to {ONLINE_MODEL_PATH}: predictions agree with the shipped model on "
+              f"{np.mean(model.predict(texts) == shipped.predict(texts)):.1%} of the samples, max probability "
+              f"difference {np.max(np.abs(probabilities - shipped.predict_proba(texts)[:, 1])):.4f}")
+        raise SystemExit
+
     classifier = PromptClassifier()
 
-    queries = [
-    # Health
-    "What are the most common diseases worldwide?",
-    "What is the leading cause of death globally?",
-    "How can mental health awareness be improved?",
-    "What are the global health statistics for 2024?",
-    "How does stress impact physical health?",
-    "What are the symptoms of diabetes?",
-    "How is cardiovascular disease prevented?",
-    "What are the latest advancements in cancer research?",
-    "What is the role of vaccines in public health?",
-    "How do lifestyle choices affect mental health?",
-
-    # Environment
-    "What is the primary cause of global warming?",
-    "How does deforestation affect biodiversity?",
-    "What are endangered species and why are they at risk?",
-    "What are the current rates of deforestation globally?",
-    "How does climate change impact agriculture?",
-    "What are the main sources of renewable energy?",
-    "How do coral reefs contribute to the ecosystem?",
-    "What are the effects of air pollution on human health?",
-    "How can we reduce plastic waste in oceans?",
-    "What is the Paris Agreement?",
-
-    # Technology
-    "What are the latest emerging technologies of 2024?",
-    "How does artificial intelligence impact the job market?",
-    "What is blockchain technology and how does it work?",
-    "How are quantum computers different from classical computers?",
-    "What are the ethical concerns surrounding AI advancements?",
-    "What is the role of 5G in modern communication?",
-    "How is robotics transforming the healthcare industry?",
-    "What are the applications of augmented reality in gaming?",
-    "How does the Internet of Things (IoT) improve daily life?",
-    "What is the future of autonomous vehicles?",
-
-    # Economy
-    "What factors influence stock market performance?",
-    "How does cryptocurrency impact global economies?",
-    "What is the current state of the global job market?",
-    "How do interest rates affect economic growth?",
-    "What are the top-performing sectors in 2024's economy?",
-    "How is inflation measured in an economy?",
-    "What are the risks of investing in cryptocurrencies?",
-    "How does unemployment affect a country’s GDP?",
-    "What is the role of the World Bank in global development?",
-    "How do trade agreements impact international markets?",
-
-    # Entertainment
-    "What are the top music streaming platforms in 2024?",
-    "How does social media influence popular culture?",
-    "What are the highest-grossing movies of all time?",
-    "What are the trends in the music industry this year?",
-    "How do awards shows impact entertainment careers?",
-    "What are the most-watched TV series on streaming platforms?",
-    "How has digital media transformed entertainment?",
-    "What is the history of the Grammy Awards?",
-    "How do video games impact mental health?",
-    "What are the effects of reality TV on society?",
-
-    # Sports
-    "What are the major sporting events of 2024?",
-    "How does data analytics improve sports performance?",
-    "What is the history of the Olympic Games?",
-    "How does sports psychology benefit athletes?",
-    "What are the current rankings in international football?",
-    "How do injuries affect professional athletes?",
-    "What are the top sports leagues in the world?",
-    "How does sponsorship impact sports organizations?",
-    "What is the role of technology in modern sports?",
-    "How does nutrition affect athletic performance?",
-
-    # Politics
-    "What are the key issues in the upcoming elections?",
-    "How does public policy analysis shape governance?",
-    "What are the impacts of international relations on trade?",
-    "How does voter turnout affect election results?",
-    "What is the role of lobbying in policymaking?",
-    "How do political ideologies influence lawmaking?",
-    "What is the history of the United Nations?",
-    "How do protests influence political decisions?",
-    "What are the effects of sanctions on international relations?",
-    "How does media influence public opinion during elections?",
-
-    # Education
-    "What are the global literacy rates in 2024?",
-    "How does online education impact traditional learning?",
-    "What are the challenges of student loan debt?",
-    "How does education influence economic development?",
-    "What are the benefits of early childhood education?",
-    "How do education policies affect access to learning?",
-    "What are the trends in e-learning platforms?",
-    "How does technology improve classroom engagement?",
-    "What are the global rankings of universities in 2024?",
-    "How do scholarships help students from low-income families?",
-
-    # Travel
-    "What are the top tourist destinations in the world?",
-    "How has the airline industry recovered post-pandemic?",
-    "What are the trends in sustainable travel?",
-    "How do travel apps improve trip planning?",
-    "What are the most popular travel destinations in Europe?",
-    "How does tourism impact local economies?",
-    "What are the best destinations for adventure travel?",
-    "How do airlines handle baggage claims?",
-    "What are the most popular budget travel tips?",
-    "What are the benefits of solo travel?",
-
-    # Food
-    "What are the global crop yield statistics in 2024?",
-    "How does climate change affect food production?",
-    "What are the main causes of global hunger?",
-    "How does food security impact global stability?",
-    "What are the benefits of sustainable farming practices?",
-    "What are the most popular superfoods of 2024?",
-    "How do dietary trends affect food consumption?",
-    "What are the environmental impacts of food waste?",
-    "What are the healthiest cuisines in the world?",
-    "How does agriculture impact water usage?"
-]
-    chats = [
-    "Hey, how are you?",
-    "What’s up with the global warming stuff?",
-    "Tell me a joke about AI!",
-    "Good morning! Did you hear about the latest tech news?",
-    "Do you like pizza or are you more into healthy food?",
-    "Hi, what’s your favorite movie about sports?",
-    "Can you recommend a good book about mental health?",
-    "Let’s talk about something fun, like traveling to Paris.",
-    "Do you like streaming platforms? What's your favorite show?",
-    "What’s your favorite way to relax after work?",
-    "Do you enjoy hiking? I heard it’s great for mental health.",
-    "How’s the job market looking for data analysts?",
-    "Can we chat about AI and how it’s changing the world?",
-    "Do you believe in aliens or black holes?",
-    "Why do people love traveling so much?",
-    "What's your favorite movie genre?",
-    "What’s a fun thing to do on weekends other than watching sports?",
-    "Did you know the Olympic Games are starting soon?",
-    "Do you prefer road trips or flying?",
-    "Have you tried a plant-based diet? It’s trending a lot now.",
-    "What's your favorite memory of a sporting event?",
-    "How do you spend rainy days? I usually read about history.",
-    "What’s the most interesting tourist spot you’ve visited?",
-    "Do you think cryptocurrencies will replace traditional money?",
-    "Have you ever been on a cruise? I heard they’re amazing.",
-    "Do you like rainy weather? It makes me think about global warming.",
-    "What’s your favorite destination to travel to in winter?",
-    "Have you ever wondered how rockets work?",
-    "What’s your go-to comfort food?",
-    "I’m thinking of learning about blockchain technology. Thoughts?",
-    "Do you like sci-fi movies? They often talk about space exploration.",
-    "What’s your favorite workout for staying healthy?",
-    "Do you enjoy watching debates about elections?",
-    "Have you ever been to a live concert? It’s so thrilling.",
-    "How do you think public opinion shapes political decisions?",
-    "What’s the most exciting tech you’ve seen this year?",
-    "Do you think self-driving cars are safe?",
-    "What’s the weirdest fact you know about the ocean?",
-    "Have you ever visited a coral reef? They’re beautiful.",
-    "What’s your favorite dish to cook for family dinners?",
-    "What’s the funniest meme you’ve seen about AI?",
-    "Do you think sports analytics really help athletes perform better?",
-    "Can we chat about what makes a good teacher?",
-    "What’s your dream destination for a vacation?",
-    "Do you believe in climate change? It’s all over the news.",
-    "What’s your favorite way to celebrate holidays?",
-    "Do you think streaming platforms will replace traditional TV?",
-    "What’s the best app you’ve used for planning travel?",
-    "Can you guess what my favorite sport is?",
-    "What’s your favorite way to spend time outdoors?",
-    "Have you ever been to an endangered species sanctuary?",
-    "What’s your go-to playlist for relaxing?",
-    "Do you like board games? They’re so nostalgic.",
-    "Do you think quantum computing will change everything?",
-    "What’s the best story you’ve read about AI in education?",
-    "Do you enjoy learning about global food security?",
-    "What’s your favorite way to stay updated on technology?",
-    "Do you like stargazing? It’s so calming.",
-    "What’s your favorite thing to watch during the Olympics?",
-    "What’s the weirdest thing you’ve heard about climate change?",
-    "Do you enjoy cooking with exotic ingredients?",
-    "What’s the coolest gadget you’ve used recently?",
-    "Do you think renewable energy will solve our problems?",
-    "Have you ever watched a documentary on deforestation?",
-    "What’s your favorite coffee spot in the city?",
-    "Do you think social media affects mental health?",
-    "What’s your favorite place to watch the sunset?",
-    "Do you enjoy trivia games about history and politics?",
-    "What’s your favorite type of art to look at?",
-    "Do you like long walks in nature? They’re so peaceful.",
-    "Have you ever thought about the importance of water conservation?",
-    "What’s the most interesting recipe you’ve tried?",
-    "What’s your favorite thing about science fiction movies?",
-    "What’s your go-to podcast about current events?",
-    "Have you ever played a sports video game? They’re so fun.",
-    "Do you enjoy reading about elections in other countries?",
-    "What’s the best way to spend a quiet afternoon?",
-    "Do you believe AI will really take over jobs?",
-    "What’s your favorite way to stay active during the day?",
-    "Have you ever thought about the effects of space travel on astronauts?",
-    "What’s your favorite activity when it’s snowing?",
-    "Do you like trying new fitness routines? It’s refreshing.",
-    "What’s your favorite app for learning new skills?",
-    "Do you enjoy solving riddles about economics?",
-    "What’s your favorite memory from a cultural festival?",
-    "What’s your favorite TV show about politics?",
-    "Do you think mental health should be taught in schools?",
-    "What’s the funniest thing you’ve seen about renewable energy?",
-    "Do you think augmented reality will be big in gaming?",
-    "What’s your favorite book about history?",
-    "Do you like traveling to remote destinations?",
-    "What’s your favorite dish from international cuisine?"
-]
-   
+    queries = samples.queries
+    chats = samples.chats
+
     t= ['kk']
     print(classifier)
     print(classifier.predict(t)[0])
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+
+
+class NotReadyError(Exception):
+    pass
+
+
+MAX_RETRY_BACKOFF = 600.0
+
+
+class LazyComponent:
+    # Builds a heavy component (model, index) once, either in a background thread or on
+    # first use, and records how long it took for the readiness endpoint. With
+    # retry_backoff set, a failed load is retried by the next get() after that many
+    # seconds, doubling with every consecutive failure (up to MAX_RETRY_BACKOFF).
+    def __init__(self, name: str, factory, retry_backoff: float = None):
+        self.name = name
+        self.factory = factory
+        self.value = None
+        self.error = None
+        self.state = "pending"
+        self.seconds = None
+        self.retry_backoff = retry_backoff
+        self.failures = 0
+        self.retry_at = None
+        self.loaded = threading.Event()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def ready(cls, name: str, value):
+        component = cls(name, None)
+        component.set(value)
+        component.seconds = 0.0
+        return component
+
+    def load(self):
+        with self.lock:
+            if self.state != "pending":
+                return
+            self.state = "loading"
+        start = time.perf_counter()
+        try:
+            self.value = self.factory()
+            self.failures = 0
+            self.state = "ready"
+        except Exception as e:
+            self.error = repr(e)
+            self.failures += 1
+            if self.retry_backoff:
+                self.retry_at = time.monotonic() + min(self.retry_backoff * 2 ** (self.failures - 1),
+                                                       MAX_RETRY_BACKOFF)
+            self.state = "failed"
+            logging.error(f"Failed to load {self.name}: {e}")
+        finally:
+            self.seconds = time.perf_counter() - start
+            logging.info(f"{self.name} {self.state} after {self.seconds:.2f}s")
+            self.loaded.set()
+
+    def start(self):
+        threading.Thread(target=self.load, name=f"load-{self.name}", daemon=True).start()
+
+    def retry(self):
+        with self.lock:
+            if self.state != "failed":
+                return
+            self.state = "pending"
+            self.retry_at = None
+            self.loaded.clear()
+        self.start()
+
+    def get(self, timeout: float = None):
+        if self.state == "failed" and self.retry_at is not None and time.monotonic() >= self.retry_at:
+            self.retry()
+        if self.state == "pending":
+            self.start()
+        if not self.loaded.wait(timeout):
+            raise NotReadyError(f"{self.name} is still loading")
+        if self.state == "failed":
+            raise NotReadyError(f"{self.name} failed to load: {self.error}")
+        return self.value
+
+    def set(self, value):
+        # Swaps in a new instance; readers pick it up on their next get()
+        self.value = value
+        self.state = "ready"
+        self.loaded.set()
+
+    def status(self) -> dict:
+        return {"state": self.state, "seconds": self.seconds, "error": self.error}
@@ -0,0 +1,121 @@
+import gzip
+import json
+import os
+
+# Scraped documents, one JSON object per line (optionally gzip-compressed)
+CORPUS_PATH = "scraped_data.jsonl"
+LEGACY_CORPUS_PATH = "scraped_data.json"
+
+
+def open_text(path: str, mode: str = "r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith(".jsonl") or path.endswith(".jsonl.gz")
+
+
+class CorpusWriter:
+    # Appends documents to a JSON Lines corpus as they arrive, so nothing is held in
+    # memory and a crash loses at most the unflushed tail
+    def __init__(self, path: str, append: bool = True):
+        self.path = path
+        self.file = open_text(path, "a" if append else "w")
+        self.count = 0
+
+    def write(self, doc: dict):
+        self.file.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def write_many(self, docs) -> int:
+        for doc in docs:
+            self.write(doc)
+        return self.count
+
+    def flush(self, sync: bool = False):
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def iter_json_array(f, chunk_size: int = 1 << 16):
+    # Yields the elements of a top-level JSON array without loading the whole file,
+    # decoding one element at a time out of a sliding buffer
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Skip whitespace and the array punctuation between elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+            if buffer[position] == "[":
+                started = True
+            position += 1
+        if position < len(buffer) and started:
+            try:
+                doc, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield doc
+                position = end
+                continue
+        if eof:
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_corpus(path: str):
+    # Streams documents from a JSON Lines corpus, or from a legacy JSON array file
+    with open_text(path, "r") as f:
+        if is_jsonl(path):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+def convert(source: str, destination: str) -> int:
+    # Rewrites any readable corpus (e.g. a legacy scraped_data.json) as JSON Lines
+    # The temporary name keeps the .gz suffix so it is written with the same compression
+    directory, name = os.path.split(destination)
+    temporary = os.path.join(directory, ".tmp-" + name)
+    with CorpusWriter(temporary, append=False) as writer:
+        writer.write_many(iter_corpus(source))
+    os.replace(temporary, destination)
+    return writer.count
+
+
+def find_corpus(candidates: tuple = (CORPUS_PATH, CORPUS_PATH + ".gz", LEGACY_CORPUS_PATH)) -> str:
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    return candidates[0]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a scraped corpus to JSON Lines (.jsonl or .jsonl.gz)")
+    parser.add_argument("source", nargs="?", default=LEGACY_CORPUS_PATH)
+    parser.add_argument("destination", nargs="?", default=CORPUS_PATH)
+    args = parser.parse_args()
+    print(f"Wrote {convert(args.source, args.destination)} documents to {args.destination}")
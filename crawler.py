@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+
+from corpus import CorpusWriter
+
+WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
+
+TOPICS = {
+    "Health": ["Common diseases", "lifestyle diseases", "common medicines", "global health statistics"],
+    "Environment": ["Global warming", "endangered species", "deforestation rates"],
+    "Technology": ["Emerging technologies", "AI advancements",  "green energy", "robotics"],
+    "Economy": ["Stock market performance", "job markets", "cryptocurrency trends"],
+    "Entertainment": ["Music industry", "popular cultural events", "streaming platforms", "video games"],
+    "Sports": ["Major sporting events", "sports analytics", "NFL", "Soccer"],
+    "Politics": ["Elections", "public policy analysis", "international relations"],
+    "Education": ["Literacy rates", "online education trends", "student loan data", "Professional degrees"],
+    "Travel": ["Top tourist destinations", "airline industry data", "travel trends", "united states roadways"],
+    "Food": ["Crop yield statistics", "global hunger and food security", "modern foods", "junk foods"]
+}
+
+
+def clean_summary(summary: str) -> str:
+    # Sentence punctuation is kept so answers can be extracted sentence by sentence
+    return re.sub(r"[^a-zA-Z0-9\s.?!]", "", summary)
+
+
+class RateLimiter:
+    # Token bucket shared by all crawler threads: `rate` requests per second on
+    # average with bursts of up to `burst`
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class WikipediaAPI:
+    # The two MediaWiki API calls the crawler needs (search and page info), with a
+    # shared rate limit and retry with exponential backoff on errors, 429 and 5xx
+    def __init__(self, base_url: str = WIKIPEDIA_API, rate: float = 10.0, burst: int = 5, retries: int = 4,
+                 backoff: float = 0.5, timeout: float = 10.0, pool_size: int = 32):
+        self.base_url = base_url
+        self.limiter = RateLimiter(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=pool_size))
+        self.session.headers["User-Agent"] = "IR-chatbot crawler"
+        self.stats = defaultdict(int)
+
+    def get(self, params: dict) -> dict:
+        params = {**params, "format": "json", "formatversion": 2}
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            self.stats["requests"] += 1
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    delay = float(response.headers.get("Retry-After", delay))
+                    raise requests.HTTPError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.retries:
+                    raise
+                self.stats["retries"] += 1
+                logging.debug(f"Retrying {params.get('titles') or params.get('srsearch')} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def search(self, keywords: str) -> str:
+        results = self.get({"action": "query", "list": "search", "srsearch": keywords, "srlimit": 1})
+        hits = results.get("query", {}).get("search", [])
+        return hits[0]["title"] if hits else None
+
+    def page(self, title: str) -> dict:
+        # Intro text, revision, URL and article links of one page (following redirects).
+        # Returns None for missing pages and disambiguation pages.
+        params = {"action": "query", "titles": title, "redirects": 1, "prop": "extracts|info|revisions|links|pageprops",
+                  "exintro": 1, "explaintext": 1, "inprop": "url", "rvprop": "ids", "plnamespace": 0,
+                  "pllimit": "max", "ppprop": "disambiguation"}
+        page, links = None, []
+        while True:
+            result = self.get(params)
+            pages = result.get("query", {}).get("pages", [])
+            if not pages or pages[0].get("missing") or pages[0].get("invalid"):
+                return None
+            page = page or pages[0]
+            links.extend(link["title"] for link in pages[0].get("links", []))
+            # Long link lists come back in several parts
+            if "continue" not in result:
+                break
+            params = {**params, **result["continue"]}
+        if "disambiguation" in page.get("pageprops", {}):
+            return None
+        return {
+            "pageid": page["pageid"],
+            "title": page["title"],
+            "revision_id": page.get("revisions", [{}])[0].get("revid") or page.get("lastrevid"),
+            "summary": page.get("extract", ""),
+            "url": page.get("fullurl"),
+            "links": links,
+        }
+
+
+class Crawler:
+    # Breadth-first crawl of several topics through one work queue served by `workers`
+    # threads, so a slow topic does not hold up the others. Each topic stops expanding
+    # once it has `min_docs` documents. Documents are appended to docs.jsonl as they
+    # arrive, newly seen titles are appended to seen.jsonl and the frontier is
+    # checkpointed to state.json, so an interrupted crawl resumes where it stopped. Pages are deduplicated by page ID
+    # within a topic, which also catches redirects; a page reached from several topics
+    # is kept once per topic and dedup.py later merges the copies into one document.
+    def __init__(self, topics: dict, checkpoint_dir: str = "crawl", min_docs: int = 500, workers: int = 8,
+                 api: WikipediaAPI = None, checkpoint_interval: float = 5.0):
+        self.topics = topics
+        self.checkpoint_dir = checkpoint_dir
+        self.min_docs = min_docs
+        self.workers = workers
+        self.api = api or WikipediaAPI()
+        self.checkpoint_interval = checkpoint_interval
+        self.docs_path = os.path.join(checkpoint_dir, "docs.jsonl")
+        self.state_path = os.path.join(checkpoint_dir, "state.json")
+        self.seen_path = os.path.join(checkpoint_dir, "seen.jsonl")
+
+        self.frontier = deque()
+        self.in_flight = {}
+        self.seen_titles = set()
+        # Titles seen since the last checkpoint, and how many seen.jsonl lines it covers
+        self.new_titles = []
+        self.seen_count = 0
+        self.seen_ids = set()
+        self.counts = defaultdict(int)
+        self.seeded = False
+        self.condition = threading.Condition()
+        self.stopping = threading.Event()
+        self.checkpoint_lock = threading.Lock()
+        self.last_checkpoint = time.monotonic()
+        self.stats = defaultdict(int)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.load_checkpoint()
+        self.writer = CorpusWriter(self.docs_path)
+
+    def load_checkpoint(self):
+        if os.path.isfile(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.frontier.extend(tuple(item) for item in state["frontier"])
+            self.seeded = state["seeded"]
+            if "seen_titles" in state:
+                # Older checkpoints kept the whole seen set in state.json; it moves
+                # to seen.jsonl at the next checkpoint
+                self.new_titles = [tuple(item) for item in state["seen_titles"]]
+                self.seen_titles.update(self.new_titles)
+            else:
+                self.seen_count = state["seen_count"]
+
+        # Lines past the count in state.json were appended by a checkpoint that did
+        # not complete, so their frontier entries were never saved; drop them
+        if os.path.isfile(self.seen_path):
+            valid = 0
+            with open(self.seen_path, "rb") as f:
+                for line, _ in zip(f, range(self.seen_count)):
+                    self.seen_titles.add(tuple(json.loads(line)))
+                    valid += len(line)
+            with open(self.seen_path, "r+b") as f:
+                f.truncate(valid)
+
+        # docs.jsonl is the source of truth for what was collected; a partial last
+        # line from a crash is cut off
+        if os.path.isfile(self.docs_path):
+            valid = 0
+            with open(self.docs_path, "rb") as f:
+                for line in f:
+                    try:
+                        doc = json.loads(line)
+                    except ValueError:
+                        break
+                    valid += len(line)
+                    self.seen_ids.add((doc["topic"], doc["pageid"]))
+                    self.counts[doc["topic"]] += 1
+            with open(self.docs_path, "r+b") as f:
+                f.truncate(valid)
+
+    def save_checkpoint(self, due: bool = False):
+        # With due=True this is the periodic checkpoint a worker writes once the interval
+        # has passed. It is skipped if another worker is writing one or has just done so,
+        # so the workers past the interval do not each write one in turn.
+        if not self.checkpoint_lock.acquire(blocking=not due):
+            return
+        try:
+            if due and time.monotonic() - self.last_checkpoint < self.checkpoint_interval:
+                return
+            # Only the snapshot is taken under the condition; workers keep going while
+            # it is written out. Items still being fetched go back into the saved
+            # frontier so nothing is lost
+            with self.condition:
+                frontier = list(self.in_flight.values()) + list(self.frontier)
+                new_titles, self.new_titles = self.new_titles, []
+                seeded = self.seeded
+                self.writer.flush()
+            os.fsync(self.writer.file.fileno())
+            with open(self.seen_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in new_titles)
+                f.flush()
+                os.fsync(f.fileno())
+            self.seen_count += len(new_titles)
+            state = {"frontier": frontier, "seen_count": self.seen_count, "seeded": seeded}
+            with open(self.state_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(self.state_path + ".tmp", self.state_path)
+            self.last_checkpoint = time.monotonic()
+        finally:
+            self.checkpoint_lock.release()
+
+    def seed(self):
+        for topic, keywords in self.topics.items():
+            for keyword in keywords:
+                title = self.api.search(keyword)
+                if title and (topic, title) not in self.seen_titles:
+                    self.seen_titles.add((topic, title))
+                    self.new_titles.append((topic, title))
+                    self.frontier.append((topic, title))
+        self.seeded = True
+
+    def topic_done(self, topic: str) -> bool:
+        return self.counts[topic] >= self.min_docs
+
+    def next_item(self, worker: int):
+        with self.condition:
+            while not self.stopping.is_set():
+                while self.frontier and self.topic_done(self.frontier[0][0]):
+                    self.frontier.popleft()
+                if self.frontier:
+                    item = self.frontier.popleft()
+                    self.in_flight[worker] = item
+                    return item
+                if not self.in_flight:
+                    # Nothing queued and nobody left who could queue more
+                    self.condition.notify_all()
+                    return None
+                self.condition.wait()
+            return None
+
+    def record(self, worker: int, topic: str, page: dict):
+        with self.condition:
+            self.in_flight.pop(worker, None)
+            if page is not None and not self.topic_done(topic):
+                if (topic, page["pageid"]) in self.seen_ids:
+                    self.stats["duplicates"] += 1
+                else:
+                    self.seen_ids.add((topic, page["pageid"]))
+                    self.counts[topic] += 1
+                    self.writer.write({"pageid": page["pageid"], "title": page["title"],
+                                       "revision_id": page["revision_id"], "summary": clean_summary(page["summary"]),
+                                       "url": page["url"], "topic": topic})
+                if not self.topic_done(topic):
+                    for title in page["links"]:
+                        if (topic, title) not in self.seen_titles:
+                            self.seen_titles.add((topic, title))
+                            self.new_titles.append((topic, title))
+                            self.frontier.append((topic, title))
+            self.condition.notify_all()
+        if time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+            self.save_checkpoint(due=True)
+
+    def work(self, worker: int):
+        while True:
+            item = self.next_item(worker)
+            if item is None:
+                return
+            topic, title = item
+            try:
+                page = self.api.page(title)
+            except Exception as e:
+                # Retries are exhausted or the response was malformed
+                logging.warning(f"Giving up on {title}: {e}")
+                self.stats["failed"] += 1
+                page = None
+            self.record(worker, topic, page)
+
+    def stop(self):
+        # Workers finish their current page and exit; run() then writes a checkpoint
+        self.stopping.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    def run(self) -> dict:
+        start = time.perf_counter()
+        if not self.seeded:
+            self.seed()
+            self.save_checkpoint()
+        threads = [threading.Thread(target=self.work, args=(worker,), daemon=True) for worker in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        self.save_checkpoint()
+        self.writer.close()
+        return {**self.stats, **self.api.stats, "docs": sum(self.counts.values()), "by_topic": dict(self.counts),
+                "seconds": time.perf_counter() - start}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crawl Wikipedia pages for each topic (resumes from --checkpoint-dir)")
+    parser.add_argument("--checkpoint-dir", default="crawl")
+    parser.add_argument("--min-docs", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="Requests per second across all workers")
+    parser.add_argument("--api", default=WIKIPEDIA_API, help="MediaWiki API endpoint (e.g. a fake_wikipedia server)")
+    args = parser.parse_args()
+
+    crawler = Crawler(TOPICS, args.checkpoint_dir, args.min_docs, args.workers, WikipediaAPI(args.api, args.rate))
+    print(json.dumps(crawler.run(), indent=2))
@@ -0,0 +1,171 @@
+import json
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from corpus import CorpusWriter, iter_corpus
+
+MERSENNE_PRIME = (1 << 31) - 1
+BOILERPLATE = re.compile(r"\b(may refer to|may also refer to|is a disambiguation)\b", re.IGNORECASE)
+
+
+def shingles(text: str, size: int = 3) -> np.ndarray:
+    # Hashed word n-grams; near-identical texts share most of them
+    words = re.findall(r"\w+", text.lower())
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) % MERSENNE_PRIME for gram in grams), dtype=np.uint64,
+                       count=len(grams))
+
+
+def optimal_bands(threshold: float, num_perm: int) -> tuple:
+    # Picks (bands, rows) so the LSH candidate curve 1 - (1 - s^rows)^bands best
+    # separates similarities below and above the threshold
+    below = np.linspace(0, threshold, 100)
+    above = np.linspace(threshold, 1, 100)
+    best, best_error = None, float('inf')
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positives = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+            false_negatives = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+            if false_positives + false_negatives < best_error:
+                best, best_error = (bands, rows), false_positives + false_negatives
+    return best
+
+
+def is_boilerplate(doc: dict, min_words: int = 5) -> bool:
+    # Empty or stub summaries and disambiguation text carry nothing worth retrieving
+    summary = doc.get("summary") or ""
+    return len(summary.split()) < min_words or bool(BOILERPLATE.search(summary))
+
+
+class NearDuplicateDetector:
+    # Streaming MinHash/LSH: add() returns the id of an earlier document whose estimated
+    # Jaccard similarity is at least `threshold`, or None (and remembers the document)
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+        self.signatures = []
+        self.ids = []
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = shingles(text, self.shingle_size)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint32)
+        # (a * x + b) mod p for every permutation and shingle at once; x, a < 2^31 so
+        # the product fits in 64 bits
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> list:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def query(self, signature: np.ndarray):
+        candidates = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            candidates.update(self.buckets[band].get(key, ()))
+        best, best_similarity = None, self.threshold
+        for candidate in sorted(candidates):
+            similarity = float(np.mean(self.signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def insert(self, doc_id, signature: np.ndarray):
+        position = len(self.signatures)
+        self.signatures.append(signature)
+        self.ids.append(doc_id)
+        for band, key in enumerate(self.band_keys(signature)):
+            self.buckets[band][key].append(position)
+
+    def add(self, doc_id, text: str):
+        signature = self.signature(text)
+        match = self.query(signature)
+        if match is not None:
+            return self.ids[match]
+        self.insert(doc_id, signature)
+        return None
+
+
+def document_text(doc: dict) -> str:
+    return doc.get("summary") or doc.get("title") or ""
+
+
+def document_topics(doc: dict) -> list:
+    topics = doc.get("topic") or []
+    return [topics] if isinstance(topics, str) else list(topics)
+
+
+def dedup_corpus(source: str, destination: str, threshold: float = 0.8, num_perm: int = 128,
+                 drop_boilerplate: bool = True) -> dict:
+    # Two streaming passes over the corpus. The first decides which document each
+    # exact or near duplicate collapses into (the first one seen) and gathers the
+    # topics of every copy; the second writes the survivors with merged topics.
+    detector = NearDuplicateDetector(threshold, num_perm)
+    canonical = []
+    topics = defaultdict(list)
+    seen_urls = {}
+    report = {"documents": 0, "kept": 0, "exact_duplicates": 0, "near_duplicates": 0, "boilerplate": 0,
+              "merged_topics": 0, "bytes": 0, "bytes_saved": 0}
+
+    for position, doc in enumerate(iter_corpus(source)):
+        url = doc.get("url") or doc.get("title")
+        if drop_boilerplate and is_boilerplate(doc):
+            canonical.append(-1)
+            report["boilerplate"] += 1
+            continue
+        if url in seen_urls:
+            target = seen_urls[url]
+            report["exact_duplicates"] += 1
+        else:
+            target = detector.add(position, document_text(doc))
+            if target is None:
+                target = position
+                seen_urls[url] = position
+            else:
+                report["near_duplicates"] += 1
+        canonical.append(target)
+        for topic in document_topics(doc):
+            if topic not in topics[target]:
+                topics[target].append(topic)
+
+    with CorpusWriter(destination, append=False) as writer:
+        for position, doc in enumerate(iter_corpus(source)):
+            size = len(json.dumps(doc, ensure_ascii=False).encode("utf-8")) + 1
+            report["documents"] += 1
+            report["bytes"] += size
+            if canonical[position] != position:
+                report["bytes_saved"] += size
+                continue
+            merged = topics[position]
+            if len(merged) > 1:
+                doc = {**doc, "topic": merged}
+                report["merged_topics"] += 1
+            writer.write(doc)
+            report["kept"] += 1
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from corpus import CORPUS_PATH
+
+    parser = argparse.ArgumentParser(description="Drop exact/near-duplicate and boilerplate documents from a corpus")
+    parser.add_argument("source", nargs="?", default=CORPUS_PATH)
+    parser.add_argument("destination", nargs="?", default="scraped_data.dedup.jsonl")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Jaccard similarity counted as duplicate")
+    parser.add_argument("--num-perm", type=int, default=128)
+    parser.add_argument("--keep-boilerplate", action="store_true")
+    args = parser.parse_args()
+
+    report = dedup_corpus(args.source, args.destination, args.threshold, args.num_perm, not args.keep_boilerplate)
+    print(json.dumps(report, indent=2))
+    print(f"Saved {report['documents'] - report['kept']} documents and {report['bytes_saved'] / 2 ** 20:.1f} MiB")
@@ -0,0 +1,217 @@
+import json
+import os
+from itertools import islice
+
+import numpy as np
+
+from bm25 import DocumentStore, DocumentWriter, topic_bitmask, topic_mask
+
+ENCODER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class DenseIndex:
+    # Embedding retrieval over document summaries. Vectors are stored as a float16 or
+    # int8 (+ per-row scale) matrix that is memory-mapped on load; an HNSW graph is
+    # used for unfiltered or broad queries when hnswlib is installed.
+    def __init__(self, vectors, scales, topic_names: list, topic_bits, docs: DocumentStore,
+                 encoder_name: str = ENCODER_NAME, ann=None, exact_threshold: int = 20000):
+        self.vectors = vectors
+        self.scales = scales
+        self.topic_names = topic_names
+        self.topic_bits = topic_bits
+        self.docs = docs
+        self.encoder_name = encoder_name
+        self.encoder = None
+        self.ann = ann
+        # Topic-filtered queries over at most this many documents use an exact scan
+        self.exact_threshold = exact_threshold
+
+    def encode(self, texts: list, batch_size: int = 64):
+        if self.encoder is None:
+            from sentence_transformers import SentenceTransformer
+
+            self.encoder = SentenceTransformer(self.encoder_name, device="cpu")
+        return self.encoder.encode(texts, batch_size=batch_size, normalize_embeddings=True,
+                                   convert_to_numpy=True).astype(np.float32)
+
+    @staticmethod
+    def quantize(vectors, dtype: str) -> tuple:
+        if dtype == "float16":
+            return vectors.astype(np.float16), None
+        if dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        raise ValueError(f"Unsupported vector dtype '{dtype}'")
+
+    @classmethod
+    def build(cls, docs, encoder_name: str = ENCODER_NAME, batch_size: int = 256, dtype: str = "float16",
+              use_ann: bool = True, path: str = None):
+        # Streams `docs` in batch_size chunks, so the float32 working set stays small.
+        # With `path`, stored documents go straight to path/docs.jsonl instead of memory.
+        index = cls(None, None, [], None, None, encoder_name)
+        writer = None
+        stored = []
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            writer = DocumentWriter(os.path.join(path, "docs.jsonl"))
+        topic_bits, chunks = [], []
+        docs = iter(docs)
+        for batch in iter(lambda: list(islice(docs, batch_size)), []):
+            topic_bits.extend(topic_bitmask(batch, index.topic_names))
+            if writer is not None:
+                for doc in batch:
+                    writer.write(doc)
+            else:
+                stored.extend(batch)
+            texts = [doc.get("summary") or doc.get("title") or "" for doc in batch]
+            chunks.append(cls.quantize(index.encode(texts, batch_size), dtype))
+
+        index.docs = writer.close() if writer is not None else DocumentStore(stored)
+        index.topic_bits = np.asarray(topic_bits, dtype=np.int64)
+        index.vectors = np.concatenate([vectors for vectors, _ in chunks])
+        index.scales = None if dtype == "float16" else np.concatenate([scales for _, scales in chunks])
+
+        if use_ann:
+            index.ann = index.build_ann()
+        return index
+
+    def build_ann(self, m: int = 16, ef_construction: int = 200):
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        ann = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+        ann.init_index(max_elements=len(self.vectors), M=m, ef_construction=ef_construction)
+        for start in range(0, len(self.vectors), 10000):
+            rows = np.arange(start, min(start + 10000, len(self.vectors)))
+            ann.add_items(self.dequantize(rows), rows)
+        ann.set_ef(64)
+        return ann
+
+    def dequantize(self, rows):
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[rows][:, None]
+        return vectors
+
+    def save(self, path: str, fingerprint: dict = None):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        if self.scales is not None:
+            np.save(os.path.join(path, "scales.npy"), self.scales)
+        np.save(os.path.join(path, "topics.npy"), self.topic_bits)
+        self.docs.save(os.path.join(path, "docs.jsonl"))
+        if self.ann is not None:
+            self.ann.save_index(os.path.join(path, "hnsw.bin"))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"encoder": self.encoder_name, "topics": self.topic_names, "corpus": fingerprint}, f)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        scales_path = os.path.join(path, "scales.npy")
+        scales = np.load(scales_path) if os.path.isfile(scales_path) else None
+        index = cls(vectors, scales, meta["topics"], np.load(os.path.join(path, "topics.npy"), mmap_mode="r"),
+                    DocumentStore(path=os.path.join(path, "docs.jsonl")), meta["encoder"])
+        ann_path = os.path.join(path, "hnsw.bin")
+        if os.path.isfile(ann_path):
+            import hnswlib
+
+            index.ann = hnswlib.Index(space="ip", dim=vectors.shape[1])
+            index.ann.load_index(ann_path, max_elements=len(vectors))
+            index.ann.set_ef(64)
+        index.fingerprint = meta.get("corpus")
+        return index
+
+    @classmethod
+    def build_or_load(cls, data_path: str, index_path: str, **build_kwargs):
+        from corpus import iter_corpus
+
+        stat = os.stat(data_path)
+        fingerprint = {"path": os.path.abspath(data_path), "size": stat.st_size, "mtime": stat.st_mtime}
+        if os.path.isfile(os.path.join(index_path, "meta.json")):
+            index = cls.load(index_path)
+            if index.fingerprint == fingerprint:
+                return index
+        cls.build(iter_corpus(data_path), path=index_path, **build_kwargs).save(index_path, fingerprint)
+        return cls.load(index_path)
+
+    def exact_search(self, query_vectors, rows, k: int, chunk_rows: int = 8192) -> tuple:
+        # Scores query_vectors against the given document rows a chunk at a time, so
+        # only chunk_rows rows are dequantized to float32 at once; each chunk's top k
+        # is merged with the running top k
+        rows = np.asarray(rows)
+        k = min(k, len(rows))
+        best_rows = np.zeros((len(query_vectors), 0), dtype=np.int64)
+        best_scores = np.zeros((len(query_vectors), 0), dtype=np.float32)
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            scores = np.concatenate([best_scores, query_vectors @ self.dequantize(chunk).T], axis=1)
+            candidates = np.concatenate([best_rows, np.broadcast_to(chunk, (len(query_vectors), len(chunk)))],
+                                        axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(candidates, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def search(self, query_vectors, topics: list, k: int = 10) -> tuple:
+        if topics:
+            rows = np.flatnonzero(topic_mask(self.topic_bits, self.topic_names, topics))
+        else:
+            rows = np.arange(len(self.vectors))
+        if len(rows) == 0:
+            return np.zeros((len(query_vectors), 0), dtype=np.int64), np.zeros((len(query_vectors), 0), dtype=np.float32)
+
+        if self.ann is None or len(rows) <= self.exact_threshold:
+            return self.exact_search(query_vectors, rows, k)
+
+        k = min(k, len(rows))
+        if len(rows) == len(self.vectors):
+            labels, distances = self.ann.knn_query(query_vectors, k=k)
+        else:
+            allowed = set(rows.tolist())
+            labels, distances = self.ann.knn_query(query_vectors, k=k, filter=lambda label: label in allowed)
+        # hnswlib's "ip" space returns 1 - inner product
+        return labels.astype(np.int64), 1.0 - distances
+
+    def query_batch(self, queries: list, topics: list, k: int = 10) -> list:
+        ids, scores = self.search(self.encode(queries), topics, k)
+        return [[{**self.docs[doc_id], "score": float(score)} for doc_id, score in zip(row_ids, row_scores)]
+                for row_ids, row_scores in zip(ids, scores)]
+
+    def query_solr(self, query: str, topics: list, k: int = 10) -> list:
+        return self.query_batch([query], topics, k)[0]
+
+
+class HybridRetriever:
+    # Fuses lexical and dense results after min-max normalising each list;
+    # alpha is the weight of the dense score
+    def __init__(self, lexical, dense: DenseIndex, alpha: float = 0.5, candidates: int = 50):
+        self.lexical = lexical
+        self.dense = dense
+        self.alpha = alpha
+        self.candidates = candidates
+
+    @staticmethod
+    def normalize(results: list) -> dict:
+        if not results:
+            return {}
+        scores = [result["score"] for result in results]
+        low, high = min(scores), max(scores)
+        span = (high - low) or 1.0
+        return {result.get("url") or result["title"]: (result, (result["score"] - low) / span) for result in results}
+
+    def query_solr(self, query: str, topics: list, k: int = 10) -> list:
+        lexical = self.normalize(list(self.lexical.query_solr(query, topics, self.candidates)))
+        dense = self.normalize(self.dense.query_solr(query, topics, self.candidates))
+        fused = []
+        for key in lexical.keys() | dense.keys():
+            doc = (lexical.get(key) or dense.get(key))[0]
+            score = (1 - self.alpha) * lexical.get(key, (None, 0.0))[1] + self.alpha * dense.get(key, (None, 0.0))[1]
+            fused.append({**doc, "score": score})
+        fused.sort(key=lambda result: result["score"], reverse=True)
+        return fused[:k]
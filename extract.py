@@ -0,0 +1,78 @@
+import re
+
+import numpy as np
+
+from bm25 import tokenize
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str, window: int = 40) -> list:
+    sentences = [sentence for sentence in SENTENCE_BOUNDARY.split(text.strip()) if sentence]
+    if len(sentences) == 1:
+        # Summaries scraped before punctuation was kept have no boundaries; use word windows
+        words = sentences[0].split()
+        if len(words) > window * 3 // 2:
+            sentences = [" ".join(words[start:start + window]) for start in range(0, len(words), window)]
+    return sentences
+
+
+class SentenceExtractor:
+    # Picks the sentences of a document that best match the query: BM25 over the
+    # document's sentences, computed as one (sentences x query terms) matrix, plus a
+    # prior for early sentences (Wikipedia leads usually state the answer). The lead
+    # sentence is always kept, the best of the rest fill up max_chars, and the chosen
+    # sentences are returned in document order.
+    def __init__(self, max_chars: int = 400, max_sentences: int = None, lead_weight: float = 8.0, k1: float = 1.2,
+                 b: float = 0.75):
+        self.max_chars = max_chars
+        self.max_sentences = max_sentences
+        self.lead_weight = lead_weight
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, sentences: list) -> np.ndarray:
+        columns = {term: column for column, term in enumerate(dict.fromkeys(tokenize(query)))}
+        tokens = [tokenize(sentence) for sentence in sentences]
+        lengths = np.array([len(sentence_tokens) for sentence_tokens in tokens], dtype=np.float32)
+        lead = self.lead_weight / (1 + np.arange(len(sentences), dtype=np.float32))
+        if not columns:
+            return lead
+
+        rows = np.repeat(np.arange(len(sentences)), lengths.astype(np.int64))
+        terms = np.array([columns.get(token, -1) for sentence_tokens in tokens for token in sentence_tokens],
+                         dtype=np.int64)
+        matched = terms >= 0
+        tf = np.zeros((len(sentences), len(columns)), dtype=np.float32)
+        np.add.at(tf, (rows[matched], terms[matched]), 1)
+
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(sentences) - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        return (idf * tf * (self.k1 + 1) / (tf + norm[:, None])).sum(axis=1) + lead
+
+    def select(self, query: str, sentences: list) -> list:
+        # Indices of the chosen sentences, in document order: the lead, then the best
+        # ones that still fit in max_chars (at most max_sentences in all, if set)
+        scores = self.score(query, sentences)
+        order = [0] + [int(index) for index in np.lexsort((np.arange(len(sentences)), -scores)) if index != 0]
+        chosen, size = [], 0
+        for index in order:
+            if len(chosen) == self.max_sentences:
+                break
+            length = len(sentences[index]) + (1 if chosen else 0)
+            if chosen and size + length > self.max_chars:
+                continue
+            chosen.append(int(index))
+            size += length
+        return sorted(chosen)
+
+    def extract(self, query: str, text: str) -> str:
+        if not text or not self.max_chars or len(text) <= self.max_chars:
+            return text
+        sentences = split_sentences(text)
+        answer = " ".join(sentences[index] for index in self.select(query, sentences))
+        if len(answer) > self.max_chars:
+            # A single sentence longer than the cap is cut at a word boundary
+            answer = answer[:self.max_chars].rsplit(" ", 1)[0] + " …"
+        return answer
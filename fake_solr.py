@@ -0,0 +1,99 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from bm25 import BM25Index
+
+TOPIC_FILTER = re.compile(r'topic:"([^"]+)"')
+
+
+class FakeSolr:
+    # Minimal stand-in for the Solr endpoints this repo uses (select, update, schema,
+    # core status), ranking with BM25Index. `delay` simulates network/query latency;
+    # setting error_status makes select fail with that HTTP status, like an overloaded
+    # or broken Solr.
+    def __init__(self, docs: list = None, field_weights: dict = None, delay: float = 0.0):
+        self.field_weights = field_weights or {"title": 1.0, "summary": 3.0}
+        self.delay = delay
+        self.error_status = None
+        self.cores = {}
+        self.lock = threading.Lock()
+        self.server = None
+        if docs is not None:
+            self.add("IRF24P3", docs)
+
+    def add(self, core: str, docs: list):
+        with self.lock:
+            self.cores.setdefault(core, {}).update({doc.get("id") or doc.get("url") or doc["title"]: doc for doc in docs})
+            self.cores[core + "/index"] = BM25Index.build(list(self.cores[core].values()), self.field_weights)
+
+    def select(self, core: str, params: dict) -> dict:
+        index = self.cores.get(core + "/index")
+        topics = TOPIC_FILTER.findall(params.get("fq", [""])[0])
+        rows = int(params.get("rows", ["10"])[0])
+        docs = index.query_solr(params.get("q", [""])[0], topics, rows) if index else []
+        fields = params.get("fl", [""])[0].split(",")
+        if fields != [""]:
+            docs = [{field: doc[field] for field in fields if field in doc} for doc in docs]
+        return {"responseHeader": {"status": 0}, "response": {"numFound": len(docs), "start": 0, "docs": docs}}
+
+    def start(self, port: int = 0) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                parts = url.path.strip("/").split("/")
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if parts[1:3] == ["admin", "cores"]:
+                    core = params.get("core", [""])[0]
+                    return self.reply({"status": {core: {"name": core} if core in fake.cores else {}}})
+                if len(parts) == 3 and parts[2] == "select":
+                    if fake.error_status:
+                        return self.reply({"responseHeader": {"status": fake.error_status},
+                                           "error": {"msg": "Simulated failure", "code": fake.error_status}},
+                                          fake.error_status)
+                    return self.reply(fake.select(parts[1], params))
+                self.reply({"error": "not found"}, 404)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+                if len(parts) >= 3 and parts[2] == "update" and body:
+                    payload = json.loads(body)
+                    if isinstance(payload, list):
+                        fake.add(parts[1], payload)
+                return self.reply({"responseHeader": {"status": 0}})
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 128
+
+        self.server = Server(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
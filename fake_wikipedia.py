@@ -0,0 +1,114 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def generate_pages(count: int, links_per_page: int = 20, redirects: int = 0, seed: int = 0) -> dict:
+    # A synthetic link graph: title -> page. Redirect pages point at an existing page
+    # so crawlers can be checked for page-ID deduplication.
+    rng = random.Random(seed)
+    titles = [f"Page {i}" for i in range(count)]
+    pages = {
+        title: {"pageid": i + 1, "title": title, "revid": 1000 + i,
+                "extract": f"{title} is a synthetic article about subject {i % 97}.",
+                "links": rng.sample(titles, min(links_per_page, count))}
+        for i, title in enumerate(titles)
+    }
+    for i in range(redirects):
+        target = titles[rng.randrange(count)]
+        pages[f"Redirect {i}"] = {"redirect": target}
+        pages[rng.choice(titles)]["links"].append(f"Redirect {i}")
+    return pages
+
+
+class FakeWikipedia:
+    # Serves the MediaWiki API calls used by crawler.WikipediaAPI (search and page
+    # query with link continuation). `delay` simulates latency and `error_rate` makes
+    # that fraction of requests fail with 503 to exercise retries.
+    def __init__(self, pages: dict, delay: float = 0.0, error_rate: float = 0.0, links_per_response: int = 10,
+                 seed: int = 0):
+        self.pages = pages
+        self.delay = delay
+        self.error_rate = error_rate
+        self.links_per_response = links_per_response
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.server = None
+
+    def search(self, params: dict) -> dict:
+        words = params.get("srsearch", [""])[0].lower().split()
+        hits = [title for title, page in self.pages.items()
+                if "redirect" not in page and all(word in page["extract"].lower().split() for word in words)]
+        return {"query": {"search": [{"title": title} for title in hits[:int(params.get("srlimit", ["10"])[0])]]}}
+
+    def query(self, params: dict) -> dict:
+        title = params.get("titles", [""])[0]
+        page = self.pages.get(title)
+        if page is not None and "redirect" in page:
+            title, page = page["redirect"], self.pages.get(page["redirect"])
+        if page is None:
+            return {"query": {"pages": [{"title": title, "missing": True}]}}
+
+        start = int(params.get("plcontinue", ["0"])[0])
+        end = start + self.links_per_response
+        result = {"query": {"pages": [{
+            "pageid": page["pageid"], "title": page["title"], "lastrevid": page["revid"],
+            "revisions": [{"revid": page["revid"]}], "extract": page["extract"],
+            "fullurl": "https://en.wikipedia.org/wiki/" + page["title"].replace(" ", "_"),
+            "links": [{"ns": 0, "title": link} for link in page["links"][start:end]],
+        }]}}
+        if end < len(page["links"]):
+            result["continue"] = {"plcontinue": str(end), "continue": "||"}
+        return result
+
+    def start(self, port: int = 0) -> int:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, payload: dict, status: int = 200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 503:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                with fake.lock:
+                    fake.requests += 1
+                    fail = fake.rng.random() < fake.error_rate
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if fail:
+                    return self.reply({"error": "unavailable"}, 503)
+                if params.get("list") == ["search"]:
+                    return self.reply(fake.search(params))
+                if "titles" in params:
+                    return self.reply(fake.query(params))
+                self.reply({"error": "unsupported"}, 400)
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 128
+
+        self.server = Server(("127.0.0.1", port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
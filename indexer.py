@@ -1,18 +1,29 @@
 import json
 import os
+import threading
+import time
 import pysolr
 import requests
-import pandas as pd
-import requests
+from corpus import find_corpus, iter_corpus
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+# Bumped when add_fields changes, so existing cores are rebuilt on the next sync
+SCHEMA_VERSION = 2
 
 
 class Indexer:
-    def __init__(self, core_name: str, vm_ip: str, query_fields: list, field_weights:dict) -> None:
-        self.solr_url = f'http://{vm_ip}:8983/solr/'
-        self.connection = pysolr.Solr(self.solr_url + core_name, always_commit=True, timeout=5000000)
+    def __init__(self, core_name: str, vm_ip: str, query_fields: list, field_weights:dict, timeout: int = 60,
+                 port: int = 8983) -> None:
+        self.solr_url = f'http://{vm_ip}:{port}/solr/'
+        # Keep-alive session for admin and schema calls
+        self.session = requests.Session()
+        self.timeout = timeout
+        self.connection = pysolr.Solr(self.solr_url + core_name, always_commit=False, timeout=timeout)
         self.core_name = core_name
         self.query_fields = query_fields
         self.weights = field_weights
+        self.local = threading.local()
 
     def delete_core(self): 
         print(os.system('sudo -S su - solr -c "/opt/solr/bin/solr delete -c {core}"'.format(core=self.core_name)))
@@ -28,8 +39,101 @@ class Indexer:
         self.delete_core()
         self.create_core()
 
-    def create_documents(self, docs: dict):
-        print(self.connection.add(docs))
+    def thread_connection(self) -> pysolr.Solr:
+        # pysolr keeps a requests session per instance, so each ingest thread gets its own
+        if not hasattr(self.local, "connection"):
+            self.local.connection = pysolr.Solr(self.solr_url + self.core_name, always_commit=False, timeout=self.timeout)
+        return self.local.connection
+
+    def add_batch(self, batch: list, commit_within: int = None) -> int:
+        self.thread_connection().add(batch, commit=False, commitWithin=commit_within)
+        return len(batch)
+
+    def create_documents(self, docs, batch_size: int = 500, workers: int = 4, commit_within: int = None) -> dict:
+        # Streams any iterable of documents to Solr in batches over `workers` parallel
+        # connections. Commits once at the end unless commit_within (ms) is given.
+        start = time.perf_counter()
+        total = 0
+        docs = iter(docs)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for batch in iter(lambda: list(islice(docs, batch_size)), []):
+                # Bound the number of batches held in memory
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    total += sum(future.result() for future in done)
+                pending.add(executor.submit(self.add_batch, batch, commit_within))
+            total += sum(future.result() for future in pending)
+
+        if commit_within is None:
+            self.connection.commit()
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0.0
+        print(f"Indexed {total} documents in {elapsed:.1f}s ({rate:.0f} docs/s)")
+        return {"documents": total, "seconds": elapsed, "docs_per_second": rate}
+
+    def core_exists(self) -> bool:
+        response = self.session.get(self.solr_url + "admin/cores", params={"action": "STATUS", "core": self.core_name},
+                                    timeout=self.timeout)
+        return bool(response.json().get("status", {}).get(self.core_name))
+
+    @staticmethod
+    def document_key(doc: dict) -> str:
+        return doc.get("url") or doc["title"]
+
+    def sync_documents(self, data_path: str, manifest_path: str = "index_manifest.json", rebuild: bool = False) -> dict:
+        # Bring the core in line with data_path, touching only documents whose
+        # revision changed since the last sync recorded in manifest_path
+        stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        stat = os.stat(data_path)
+        corpus = {"path": os.path.abspath(data_path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+        manifest = None
+        if not rebuild and os.path.isfile(manifest_path):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("core") != self.core_name or manifest.get("schema") != SCHEMA_VERSION:
+                manifest = None
+
+        if manifest is None or not self.core_exists():
+            self.do_initial_setup()
+            self.add_fields()
+            previous = {}
+        else:
+            previous = manifest["documents"]
+            if manifest["corpus"] == corpus:
+                stats["unchanged"] = len(previous)
+                return stats
+
+        current = {}
+
+        def changed_documents():
+            for doc in iter_corpus(data_path):
+                key = self.document_key(doc)
+                revision = str(doc.get("revision_id"))
+                if isinstance(doc.get("topic"), list):
+                    # A change in merged topics has to reach Solr too
+                    revision += "|" + ",".join(doc["topic"])
+                current[key] = revision
+                if previous.get(key) == revision:
+                    stats["unchanged"] += 1
+                    continue
+                stats["updated" if key in previous else "added"] += 1
+                yield {**doc, "id": key}
+
+        self.create_documents(changed_documents())
+
+        removed = [key for key in previous if key not in current]
+        if removed:
+            self.connection.delete(id=removed, commit=True)
+            stats["deleted"] = len(removed)
+
+        # Write the manifest last so an interrupted sync is redone on the next start
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"core": self.core_name, "schema": SCHEMA_VERSION, "corpus": corpus, "documents": current}, f)
+        os.replace(tmp_path, manifest_path)
+        return stats
 
     def add_fields(self):
         data = {
@@ -62,28 +166,30 @@ class Indexer:
                     "multiValued": False
                 },
                 {
+                    # Documents merged by dedup.py belong to several topics
                     "name": "topic",
                     "type": "string",
                     "indexed": True,
-                    "multiValued": False
+                    "multiValued": True
                 },
             ]
         }
 
-        print(requests.post(self.solr_url + self.core_name + "/schema", json=data).json())
-    
-    def query_solr(self, query: str, topics:list, k:int = 10) -> pysolr.Results:
+        print(self.session.post(self.solr_url + self.core_name + "/schema", json=data, timeout=self.timeout).json())
 
+    def search_params(self, topics: list, k: int) -> dict:
         topic_filter = " OR ".join([f"topic:\"{topic}\"" for topic in topics])
-        
-        params = {
+
+        return {
             'fl': ','.join(self.query_fields + ['score']),
             'rows': k,
             'defType': 'edismax', 
             'qf': ' '.join([f"{field}^{weight}" for field, weight in (self.weights).items()]),
             'fq': topic_filter
         }
-        results = self.connection.search(query, **params)
+
+    def query_solr(self, query: str, topics:list, k:int = 10) -> pysolr.Results:
+        results = self.connection.search(query, **self.search_params(topics, k))
     
         return results
 
@@ -101,11 +207,8 @@ if __name__ == "__main__":
     i.do_initial_setup()
     i.add_fields()
 
-    with open("scraped_data3.json", "r") as f:
-        data = json.load(f)
-
-    # Add documents to the index
-    i.create_documents(data)
+    # Stream documents into the index in batches
+    i.create_documents(iter_corpus(find_corpus()))
 
     # Test query
     query = "What is a transformer in machine learning"
@@ -0,0 +1,71 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import samples
+from bench_utils import Timer, summarize, print_summary
+
+
+def post(url: str, message: str) -> tuple:
+    body = json.dumps({"message": message, "topics": ["Health"]}).encode("utf-8")
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def wait_until_up(url: str, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+            return
+        except OSError:
+            time.sleep(1)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+
+def run_load(base_url: str, requests: int, concurrency: int) -> dict:
+    messages = samples.queries + samples.chats
+    with Timer() as total:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda i: post(base_url + "/chat", messages[i % len(messages)]), range(requests)))
+    ok = [latency for status, latency in results if status == 200]
+    summary = summarize(ok, total.elapsed)
+    summary["rejected"] = sum(status == 503 for status, _ in results)
+    summary["errors"] = sum(status not in (200, 503) for status, _ in results)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test serve.py with different worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--startup-timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    for workers in args.workers:
+        server = subprocess.Popen([sys.executable, "serve.py", "--workers", str(workers), "--port", str(args.port)])
+        try:
+            wait_until_up(base_url + "/readyz", args.startup_timeout)
+            summary = run_load(base_url, args.requests, args.concurrency)
+            print_summary(f"{workers} workers", summary)
+            print(f"  rejected (503): {summary['rejected']}, errors: {summary['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
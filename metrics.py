@@ -0,0 +1,301 @@
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Log-spaced latency buckets from 1ms to ~2min, ~10% apart: quantiles are accurate to
+# about 5% and histograms from different processes merge by adding counts
+BUCKET_GROWTH = 1.1
+BUCKET_MIN = 0.001
+BUCKET_COUNT = 125
+# Prometheus gets a fixed, coarser subset of the edges (every 8th, ~2.1x apart) so
+# every scrape exposes the same `le` series
+PROMETHEUS_BUCKETS = list(range(0, BUCKET_COUNT, 8)) + [BUCKET_COUNT]
+
+
+def escape_label(value: str) -> str:
+    # Prometheus text format: backslash, double quote and newline are escaped in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (BUCKET_COUNT + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    @staticmethod
+    def bucket(value: float) -> int:
+        if value <= BUCKET_MIN:
+            return 0
+        return min(BUCKET_COUNT, int(math.log(value / BUCKET_MIN, BUCKET_GROWTH)) + 1)
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        return BUCKET_MIN * BUCKET_GROWTH ** index if index < BUCKET_COUNT else float('inf')
+
+    def observe(self, value: float):
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                # Report the bucket's upper edge, clamped to what was actually observed
+                return min(max(self.upper_bound(index), self.min), self.max)
+        return self.max
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "count": self.count, "sum": self.sum,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"] if data["min"] is not None else float('inf')
+        histogram.max = data["max"] if data["max"] is not None else float('-inf')
+        return histogram
+
+
+class Timeline:
+    # Ring buffer of per-topic event counts in fixed time buckets; memory is bounded by
+    # `size` buckets no matter how much traffic arrives
+    def __init__(self, bucket_seconds: int = 10, size: int = 360):
+        self.bucket_seconds = bucket_seconds
+        self.size = size
+        self.starts = [None] * size
+        self.counts = [None] * size
+
+    def add(self, topic: str, timestamp: float):
+        start = int(timestamp // self.bucket_seconds) * self.bucket_seconds
+        slot = (start // self.bucket_seconds) % self.size
+        if self.starts[slot] != start:
+            self.starts[slot] = start
+            self.counts[slot] = defaultdict(int)
+        self.counts[slot][topic] += 1
+
+    def buckets(self, since: float = 0) -> list:
+        # Buckets whose start is >= since (the bucket containing `since` is included
+        # so the caller can refresh a bucket that was still filling up)
+        since = int(since // self.bucket_seconds) * self.bucket_seconds
+        oldest = time.time() - self.bucket_seconds * self.size
+        return sorted(({"timestamp": start, "counts": dict(counts)}
+                       for start, counts in zip(self.starts, self.counts)
+                       if start is not None and start >= since and start >= oldest),
+                      key=lambda bucket: bucket["timestamp"])
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        return True
+    return True
+
+
+def clear_snapshots(shared_dir: str):
+    # Run by the server master before it starts, so snapshots from an earlier run are
+    # not merged into this one
+    for path in glob.glob(os.path.join(shared_dir, "*.json")) + glob.glob(os.path.join(shared_dir, ".*.tmp")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MetricsRegistry:
+    # Counters, latency histograms per (stage, label) and a topic timeline. All updates
+    # take one lock. With shared_dir set, each process periodically publishes a snapshot
+    # there and reads merge every process's snapshot, so pre-forked workers agree.
+    def __init__(self, shared_dir: str = None, publish_interval: float = 1.0):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = defaultdict(Histogram)
+        self.timeline = Timeline()
+        self.shared_dir = shared_dir
+        self.publish_interval = publish_interval
+        self.last_publish = 0.0
+        self.publish_lock = threading.Lock()
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    def reset_after_fork(self):
+        # A forked worker starts from zero; what the master counted before forking is
+        # already in the master's own snapshot. The locks are replaced rather than taken,
+        # since a thread of the master may have held them at the fork.
+        self.lock = threading.Lock()
+        self.publish_lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = defaultdict(Histogram)
+        self.timeline = Timeline()
+        self.last_publish = 0.0
+
+    def inc(self, name: str, label: str = "", value: float = 1):
+        with self.lock:
+            self.counters[(name, label)] += value
+        self.maybe_publish()
+
+    def observe(self, stage: str, seconds: float, label: str = ""):
+        with self.lock:
+            self.histograms[(stage, label)].observe(seconds)
+        self.maybe_publish()
+
+    def event(self, topic: str):
+        with self.lock:
+            self.timeline.add(topic, time.time())
+        self.maybe_publish()
+
+    @contextmanager
+    def time(self, stage: str, label: str = ""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, label)
+
+    def local_snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "counters": [[name, label, value] for (name, label), value in self.counters.items()],
+                "histograms": [[stage, label, histogram.to_dict()] for (stage, label), histogram in self.histograms.items()],
+                "timeline": self.timeline.buckets(),
+            }
+
+    def maybe_publish(self, force: bool = False):
+        # Never raises: a failed publish only leaves the previous snapshot in place
+        if not self.shared_dir:
+            return
+        with self.publish_lock:
+            now = time.monotonic()
+            if not force and now - self.last_publish < self.publish_interval:
+                return
+            self.last_publish = now
+        path = os.path.join(self.shared_dir, f"{os.getpid()}.json")
+        temporary = None
+        try:
+            # A unique temporary file per publish, so concurrent publishes never share one
+            fd, temporary = tempfile.mkstemp(dir=self.shared_dir, prefix=f".{os.getpid()}-", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.local_snapshot(), f)
+            os.replace(temporary, path)
+        except OSError as e:
+            logging.warning(f"Could not publish metrics to {self.shared_dir}: {e}")
+            if temporary is not None and os.path.exists(temporary):
+                os.remove(temporary)
+
+    def snapshot(self) -> tuple:
+        # Returns merged (counters, histograms, timeline buckets) across processes
+        if self.shared_dir:
+            self.maybe_publish(force=True)
+            snapshots = []
+            for path in glob.glob(os.path.join(self.shared_dir, "*.json")):
+                pid = os.path.basename(path)[:-len(".json")]
+                if not pid.isdigit() or not process_alive(int(pid)):
+                    # Left by a worker that exited or was restarted
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    with open(path, "r") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots = [self.local_snapshot()]
+
+        counters = defaultdict(float)
+        histograms = defaultdict(Histogram)
+        timeline = defaultdict(lambda: defaultdict(int))
+        for snapshot in snapshots:
+            for name, label, value in snapshot["counters"]:
+                counters[(name, label)] += value
+            for stage, label, data in snapshot["histograms"]:
+                histograms[(stage, label)].merge(Histogram.from_dict(data))
+            for bucket in snapshot["timeline"]:
+                for topic, count in bucket["counts"].items():
+                    timeline[bucket["timestamp"]][topic] += count
+        buckets = [{"timestamp": start, "counts": dict(counts)} for start, counts in sorted(timeline.items())]
+        return counters, histograms, buckets
+
+    def dashboard(self, since: float = 0) -> dict:
+        counters, histograms, buckets = self.snapshot()
+        queries_by_topic = {label: int(value) for (name, label), value in counters.items() if name == "queries"}
+        responses = {label: histogram for (stage, label), histogram in histograms.items() if stage == "response"}
+        total = Histogram()
+        for histogram in responses.values():
+            total.merge(histogram)
+
+        return {
+            "total_queries": int(sum(queries_by_topic.values())),
+            "chitchat_count": int(counters.get(("chitchat", ""), 0)),
+            "routing": {label: int(value) for (name, label), value in counters.items() if name == "routing"},
+            "queries_by_topic": queries_by_topic,
+            "avg_response_times": {label: histogram.sum / histogram.count for label, histogram in responses.items()},
+            "most_popular_topic": max(queries_by_topic, key=queries_by_topic.get, default="None"),
+            # Only buckets at or after `since`; the dashboard merges them into what it has
+            "topic_timeline": [bucket for bucket in buckets if bucket["timestamp"] >= since],
+            "min_response_time": total.min if total.count else 0.0,
+            "max_response_time": total.max if total.count else 0.0,
+            "latency_quantiles": {
+                f"{stage}:{label}" if label else stage: {
+                    "p50": histogram.quantile(0.5), "p95": histogram.quantile(0.95), "p99": histogram.quantile(0.99),
+                }
+                for (stage, label), histogram in histograms.items()
+            },
+            "server_time": time.time(),
+        }
+
+    def prometheus(self) -> str:
+        counters, histograms, _ = self.snapshot()
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE chatbot_{name}_total counter")
+            for (counter, label), value in sorted(counters.items()):
+                if counter == name:
+                    labels = f'{{label="{escape_label(label)}"}}' if label else ""
+                    lines.append(f"chatbot_{name}_total{labels} {value:g}")
+
+        lines.append("# TYPE chatbot_stage_seconds histogram")
+        for (stage, label), histogram in sorted(histograms.items()):
+            labels = f'stage="{escape_label(stage)}",label="{escape_label(label)}"'
+            cumulative = 0
+            previous = 0
+            for index in PROMETHEUS_BUCKETS:
+                cumulative += sum(histogram.counts[previous:index + 1])
+                previous = index + 1
+                bound = "+Inf" if index == BUCKET_COUNT else f"{histogram.upper_bound(index):.6g}"
+                lines.append(f'chatbot_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"chatbot_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"chatbot_stage_seconds_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
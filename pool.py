@@ -0,0 +1,43 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolFullError(Exception):
+    pass
+
+
+class InferencePool:
+    # Bounded executor for CPU-heavy work: at most `workers` tasks run and `max_queue`
+    # wait; anything beyond that is rejected immediately instead of piling up
+    def __init__(self, workers: int = 2, max_queue: int = 8):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.rejected = 0
+
+    def acquire(self):
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PoolFullError("Inference queue is full")
+
+    def release(self, *_):
+        self.slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        self.acquire()
+        try:
+            # Run in a copy of the caller's context so tracing spans nest under the request
+            future = self.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        except Exception:
+            self.release()
+            raise
+        future.add_done_callback(self.release)
+        return future
+
+    def reset_after_fork(self):
+        # Executor threads are not inherited by forked workers
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self.slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self.rejected = 0
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+
+from tracing import tracer
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def passage(doc: dict) -> str:
+    return f"{doc.get('title', '')}. {doc.get('summary', '')}"
+
+
+class CrossEncoderReranker:
+    # Second retrieval stage: rescores the top_n lexical candidates with a small
+    # cross-encoder in one batched CPU forward pass. The pass must finish within
+    # `budget` seconds or the lexical order is returned unchanged. The number of
+    # candidates is also trimmed to what the measured per-pair cost allows, but never
+    # below min_pairs: those passes keep measuring the cost, so one slow pass does not
+    # turn reranking off for good.
+    def __init__(self, model_name: str = RERANK_MODEL, top_n: int = 20, budget: float = 0.15,
+                 max_length: int = 256, scorer=None, min_pairs: int = 2):
+        self.model_name = model_name
+        self.top_n = top_n
+        self.min_pairs = min_pairs
+        self.budget = budget
+        self.max_length = max_length
+        # scorer(query, passages) -> scores; defaults to the cross-encoder
+        self.scorer = scorer
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self.idle = threading.Semaphore(1)
+        self.cost_per_pair = None
+        self.stats = defaultdict(int)
+
+    def load(self):
+        if self.scorer is None:
+            from sentence_transformers import CrossEncoder
+
+            model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+            self.scorer = lambda query, passages: model.predict(
+                [(query, text) for text in passages], batch_size=len(passages), show_progress_bar=False)
+            # The first forward pass is much slower than the rest
+            self.scorer("warm up", ["warm up", "warm up"])
+        return self
+
+    def score(self, query: str, docs: list) -> np.ndarray:
+        start = time.perf_counter()
+        try:
+            scores = np.asarray(self.scorer(query, [passage(doc) for doc in docs]), dtype=np.float32)
+        finally:
+            self.idle.release()
+        # Moving average of the cost of one (query, passage) pair
+        cost = (time.perf_counter() - start) / len(docs)
+        self.cost_per_pair = cost if self.cost_per_pair is None else 0.8 * self.cost_per_pair + 0.2 * cost
+        return scores
+
+    def rerank(self, query: str, results: list, budget: float = None) -> list:
+        budget = self.budget if budget is None else budget
+        if self.scorer is None:
+            self.load()
+        n = min(self.top_n, len(results))
+        if self.cost_per_pair and budget / self.cost_per_pair < n:
+            n = min(n, max(self.min_pairs, int(budget / self.cost_per_pair)))
+            self.stats["trimmed"] += 1
+        if n < 2:
+            self.stats["skipped"] += 1
+            return results
+        # A pass that overran its budget may still be running; do not queue behind it
+        if not self.idle.acquire(blocking=False):
+            self.stats["busy"] += 1
+            return results
+
+        with tracer.span("retriever.rerank") as span:
+            span.tag("candidates", n)
+            future = self.executor.submit(self.score, query, results[:n])
+            try:
+                scores = future.result(timeout=budget)
+            except TimeoutError:
+                self.stats["timeouts"] += 1
+                span.tag("fallback", "timeout")
+                return results
+            except Exception:
+                self.stats["errors"] += 1
+                span.tag("fallback", "error")
+                return results
+
+        self.stats["reranked"] += 1
+        order = np.argsort(-scores, kind="stable")
+        reranked = [{**results[i], "rerank_score": float(scores[i])} for i in order]
+        return reranked + results[n:]
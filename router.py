@@ -0,0 +1,97 @@
+import itertools
+import json
+import os
+
+import numpy as np
+
+from bm25 import tokenize
+
+ROUTER_PATH = "router.json"
+QUERY, CHITCHAT, UNCERTAIN = "query", "chitchat", "uncertain"
+
+
+def coverage(query: str, summary: str) -> float:
+    # Share of the query's terms that appear in the retrieved summary text (not the
+    # formatted response, whose "Title"/"Summary" labels would count as matches); how
+    # well retrieval answered, without needing the backend's uncalibrated scores
+    terms = set(tokenize(query))
+    if not terms:
+        return 0.0
+    return len(terms & set(tokenize(summary))) / len(terms)
+
+
+class ConfidenceRouter:
+    # Routes on the classifier's P(chit-chat). At or above `high` the message goes to
+    # generation, at or below `low` to retrieval. In between, retrieval runs while
+    # generation starts speculatively, and the retrieved answer wins (cancelling
+    # generation) when it covers at least `min_coverage` of the query terms.
+    def __init__(self, low: float = 0.3, high: float = 0.7, min_coverage: float = 0.5):
+        self.low = low
+        self.high = high
+        self.min_coverage = min_coverage
+
+    def decide(self, probability: float) -> str:
+        if probability >= self.high:
+            return CHITCHAT
+        if probability <= self.low:
+            return QUERY
+        return UNCERTAIN
+
+    def accept_retrieval(self, query: str, summary: str) -> bool:
+        return coverage(query, summary) >= self.min_coverage
+
+    def settings(self) -> dict:
+        return {"low": self.low, "high": self.high, "min_coverage": self.min_coverage}
+
+    def save(self, path: str = ROUTER_PATH, report: dict = None):
+        with open(path + ".tmp", "w") as f:
+            json.dump({**self.settings(), "report": report or {}}, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str = ROUTER_PATH):
+        # Tuned thresholds if tune_router.py has written them, the defaults otherwise
+        if not os.path.isfile(path):
+            return cls()
+        with open(path, "r") as f:
+            settings = json.load(f)
+        return cls(settings["low"], settings["high"], settings["min_coverage"])
+
+
+def simulate(router: ConfidenceRouter, probabilities: np.ndarray, coverages: np.ndarray, labels: np.ndarray,
+             retrieval_cost: float, generation_cost: float) -> dict:
+    # Outcome of routing a labelled set (1 = chit-chat): accuracy of the final
+    # answer type, mean latency and how many generations run to completion. A
+    # speculative generation that loses is cancelled when retrieval returns, so it
+    # costs no extra latency.
+    chat = probabilities >= router.high
+    query = probabilities <= router.low
+    uncertain = ~(chat | query)
+    retrieved = uncertain & (coverages >= router.min_coverage)
+    answered_chat = chat | (uncertain & ~retrieved)
+    # Speculative generation starts together with retrieval, so when it wins the
+    # answer takes the longer of the two
+    latency = np.select([chat, query | retrieved], [generation_cost, retrieval_cost],
+                        max(retrieval_cost, generation_cost))
+    return {
+        "accuracy": float(np.mean(answered_chat == (labels == 1))),
+        "latency": float(np.mean(latency)),
+        "generations": int(np.sum(answered_chat)),
+        "speculative": int(np.sum(uncertain)),
+        "cancelled": int(np.sum(retrieved)),
+    }
+
+
+def tune(probabilities: np.ndarray, coverages: np.ndarray, labels: np.ndarray, retrieval_cost: float,
+         generation_cost: float, tolerance: float = 0.005, step: float = 0.05) -> tuple:
+    # Grid search: the lowest mean latency among settings within `tolerance` of the
+    # best reachable accuracy. Returns the router and its simulated outcome.
+    grid = np.round(np.arange(0, 1 + step / 2, step), 4)
+    candidates = []
+    for low, high, min_coverage in itertools.product(grid[grid <= 0.5], grid[grid >= 0.5], grid[1:]):
+        router = ConfidenceRouter(float(low), float(high), float(min_coverage))
+        candidates.append((router, simulate(router, probabilities, coverages, labels, retrieval_cost,
+                                            generation_cost)))
+    best_accuracy = max(outcome["accuracy"] for _, outcome in candidates)
+    eligible = [candidate for candidate in candidates if candidate[1]["accuracy"] >= best_accuracy - tolerance]
+    return min(eligible, key=lambda candidate: (candidate[1]["latency"], -candidate[1]["accuracy"]))
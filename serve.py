@@ -0,0 +1,65 @@
+import argparse
+import gc
+import logging
+import os
+
+
+def post_fork(server, worker):
+    import chatbot
+
+    # Threads (inference pool, generation batcher) do not survive fork; the batcher
+    # restarts itself on first use, the pool is rebuilt here. Metrics restart from zero
+    # so the master's pre-fork counts are not merged once per worker.
+    chatbot.inference_pool.reset_after_fork()
+    chatbot.chat_system.metrics.reset_after_fork()
+    threads = int(os.environ.get("CHATBOT_TORCH_THREADS", 0))
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the chatbot")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2, help="Forked worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per worker")
+    parser.add_argument("--timeout", type=int, default=120)
+    args = parser.parse_args()
+
+    from gunicorn.app.base import BaseApplication
+
+    metrics_dir = os.environ.get("CHATBOT_METRICS_DIR")
+    if metrics_dir:
+        from metrics import clear_snapshots
+
+        clear_snapshots(metrics_dir)
+
+    # Importing chatbot builds Chatbot() once in the master, and every model is loaded
+    # before forking. Freezing the heap keeps the garbage collector from touching (and
+    # so copying) the model pages in each worker.
+    import chatbot
+    chatbot.chat_system.wait_until_ready()
+    gc.collect()
+    gc.freeze()
+
+    class ChatbotApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", args.timeout)
+            self.cfg.set("preload_app", True)
+            self.cfg.set("post_fork", post_fork)
+
+        def load(self):
+            return chatbot.app
+
+    logging.info(f"Serving on {args.host}:{args.port} with {args.workers} workers x {args.threads} threads")
+    ChatbotApplication().run()
+
+
+if __name__ == "__main__":
+    main()
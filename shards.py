@@ -0,0 +1,215 @@
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from bm25 import BM25Index
+from corpus import CorpusWriter, iter_corpus
+
+
+def shard_name(topic: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", topic).strip("_").lower() or "_"
+
+
+def file_fingerprint(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def file_equal(first: str, second: str, chunk_size: int = 1 << 20) -> bool:
+    if os.path.getsize(first) != os.path.getsize(second):
+        return False
+    with open(first, "rb") as a, open(second, "rb") as b:
+        while True:
+            chunk = a.read(chunk_size)
+            if chunk != b.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+
+def build_shard(partition_path: str, index_path: str, field_weights: dict, fingerprint: dict) -> str:
+    # Module-level so it can run in a worker process
+    BM25Index.build(iter_corpus(partition_path), field_weights).save(index_path, fingerprint)
+    return index_path
+
+
+class ShardedRetriever:
+    # One BM25 index per topic under shard_dir/<topic>/. Queries fan out to the
+    # selected shards in parallel. Shards score with collection-wide IDF (summed
+    # document frequencies across all shards, like Solr's distributed IDF), so
+    # their scores are comparable and the top-k lists merge by score.
+    # Shards can be added or rebuilt one at a time.
+    def __init__(self, shard_dir: str, field_weights: dict, shards: dict = None, workers: int = 8,
+                 parallel_shards: int = 4):
+        self.shard_dir = shard_dir
+        self.field_weights = field_weights
+        self.shards = shards or {}
+        self.stats = (0, {})
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard")
+        # Fewer selected shards than this are scored inline; thread hand-off costs more
+        # than it saves on small shards
+        self.parallel_shards = parallel_shards
+        if self.shards:
+            self.refresh_stats()
+
+    def shard_path(self, topic: str) -> str:
+        return os.path.join(self.shard_dir, shard_name(topic))
+
+    def partition_path(self, topic: str) -> str:
+        return os.path.join(self.shard_dir, shard_name(topic) + ".jsonl")
+
+    def manifest_path(self) -> str:
+        return os.path.join(self.shard_dir, "manifest.json")
+
+    def read_manifest(self) -> dict:
+        if not os.path.isfile(self.manifest_path()):
+            return {}
+        with open(self.manifest_path(), "r") as f:
+            return json.load(f)
+
+    def write_manifest(self, corpus: dict = None):
+        # The corpus the partitions were cut from and the topics with a shard. add_shard
+        # and remove_shard keep the recorded corpus and update the topics. Callers hold
+        # self.lock (or own the retriever), so writes are not interleaved.
+        if corpus is None:
+            corpus = self.read_manifest().get("corpus")
+        fd, temporary = tempfile.mkstemp(dir=self.shard_dir, prefix=".manifest-", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"corpus": corpus, "topics": sorted(self.shards)}, f)
+        os.replace(temporary, self.manifest_path())
+
+    @staticmethod
+    def partition(data_path: str, shard_dir: str) -> dict:
+        # One streaming pass writing each document to the partition of every topic it
+        # belongs to; returns topic -> partition path
+        os.makedirs(shard_dir, exist_ok=True)
+        writers = {}
+        for doc in iter_corpus(data_path):
+            topics = doc.get("topic") or []
+            for topic in [topics] if isinstance(topics, str) else topics:
+                if topic not in writers:
+                    writers[topic] = CorpusWriter(os.path.join(shard_dir, shard_name(topic) + ".jsonl.tmp"),
+                                                  append=False)
+                writers[topic].write(doc)
+        paths = {}
+        for topic, writer in writers.items():
+            writer.close()
+            paths[topic] = writer.path[:-len(".tmp")]
+            # Only replace partitions whose content changed, so unchanged shards keep
+            # matching their fingerprint
+            if os.path.isfile(paths[topic]) and file_equal(writer.path, paths[topic]):
+                os.remove(writer.path)
+            else:
+                os.replace(writer.path, paths[topic])
+        return paths
+
+    @classmethod
+    def build_or_load(cls, data_path: str, shard_dir: str, field_weights: dict, processes: int = None):
+        # Rebuilds only the shards whose partition changed since they were built
+        retriever = cls(shard_dir, field_weights)
+        manifest = retriever.read_manifest()
+        if manifest.get("corpus") == file_fingerprint(data_path):
+            partitions = {topic: retriever.partition_path(topic) for topic in manifest["topics"]}
+        else:
+            partitions = cls.partition(data_path, shard_dir)
+
+        stale = {}
+        for topic, partition_path in partitions.items():
+            fingerprint = file_fingerprint(partition_path)
+            index_path = retriever.shard_path(topic)
+            if os.path.isfile(os.path.join(index_path, "meta.json")):
+                index = BM25Index.load(index_path, field_weights)
+                if index.fingerprint == fingerprint:
+                    retriever.shards[topic] = index
+                    continue
+            stale[topic] = fingerprint
+
+        if stale:
+            # Spawned, not forked: this runs in a loader thread while other threads
+            # (model loading) may hold locks a forked child would inherit
+            with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {topic: pool.submit(build_shard, partitions[topic], retriever.shard_path(topic),
+                                              field_weights, fingerprint)
+                           for topic, fingerprint in stale.items()}
+                for topic, future in futures.items():
+                    retriever.shards[topic] = BM25Index.load(future.result(), field_weights)
+
+        retriever.refresh_stats()
+        retriever.write_manifest(file_fingerprint(data_path))
+        return retriever
+
+    def add_shard(self, topic: str, docs) -> BM25Index:
+        # Builds (or replaces) one topic's shard from documents without touching the others
+        os.makedirs(self.shard_dir, exist_ok=True)
+        with CorpusWriter(self.partition_path(topic), append=False) as writer:
+            writer.write_many(docs)
+        return self.rebuild_shard(topic)
+
+    def rebuild_shard(self, topic: str) -> BM25Index:
+        partition_path = self.partition_path(topic)
+        build_shard(partition_path, self.shard_path(topic), self.field_weights, file_fingerprint(partition_path))
+        index = BM25Index.load(self.shard_path(topic), self.field_weights)
+        with self.lock:
+            # Swap in a new dict so in-flight queries keep a consistent view
+            self.shards = {**self.shards, topic: index}
+            self.refresh_stats()
+            self.write_manifest()
+        return index
+
+    def remove_shard(self, topic: str):
+        with self.lock:
+            self.shards = {name: index for name, index in self.shards.items() if name != topic}
+            self.refresh_stats()
+            shutil.rmtree(self.shard_path(topic), ignore_errors=True)
+            if os.path.isfile(self.partition_path(topic)):
+                os.remove(self.partition_path(topic))
+            self.write_manifest()
+
+    def refresh_stats(self):
+        # Collection-wide document frequencies, recomputed whenever the set of shards
+        # changes (a document filed under several topics is counted in each)
+        frequencies = defaultdict(int)
+        for index in self.shards.values():
+            for field in self.field_weights:
+                counts = np.diff(index.fields[field].offsets).tolist()
+                for term, term_id in index.vocab.items():
+                    frequencies[(field, term)] += counts[term_id]
+        self.stats = (sum(index.num_docs for index in self.shards.values()), dict(frequencies))
+
+    def query_solr(self, query: str, topics: list, k: int = 10) -> list:
+        # No topics selected searches every shard
+        shards = self.shards
+        selected = [shards[topic] for topic in topics if topic in shards] if topics else list(shards.values())
+        if not selected:
+            return []
+        stats = self.stats
+        if len(selected) >= self.parallel_shards:
+            results = list(self.executor.map(lambda index: index.top_k(query, [], k, stats), selected))
+        else:
+            results = [index.top_k(query, [], k, stats) for index in selected]
+
+        # Merge the per-shard top-k by score and decode only the documents returned; a
+        # document filed under several topics is returned once, with its best score
+        candidates = sorted(((float(score), position, doc_id)
+                             for position, (ids, scores) in enumerate(results) for doc_id, score in zip(ids, scores)),
+                            key=lambda candidate: candidate[0], reverse=True)
+        merged, seen = [], set()
+        for score, position, doc_id in candidates:
+            doc = selected[position].docs[doc_id]
+            key = doc.get("url") or doc.get("title")
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append({**doc, "score": score})
+            if len(merged) == k:
+                break
+        return merged
@@ -0,0 +1,89 @@
+import asyncio
+
+import aiohttp
+import pysolr
+import pytest
+
+from async_solr import AsyncSolrClient
+from fake_solr import FakeSolr
+from indexer import Indexer
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+TOPICS = ["Health", "Environment", "Technology", "Sports"]
+DOCS = [
+    {"title": f"{subject} {i}", "summary": f"{subject} facts and figures, part {i} about {detail}.",
+     "url": f"https://en.wikipedia.org/wiki/{subject}_{i}", "topic": TOPICS[i % len(TOPICS)]}
+    for i, (subject, detail) in enumerate(
+        (subject, detail) for subject in ("Malaria", "Rainforest", "Robotics", "Football", "Vaccine", "Solar")
+        for detail in ("history", "statistics", "research", "costs"))
+]
+
+
+@pytest.fixture(scope="module")
+def solr():
+    fake = FakeSolr([{**doc, "id": doc["url"]} for doc in DOCS], FIELD_WEIGHTS)
+    indexer = Indexer("IRF24P3", "127.0.0.1", ["title", "summary", "url"], FIELD_WEIGHTS, port=fake.start())
+    client = AsyncSolrClient(indexer)
+    yield fake, indexer, client
+    client.close()
+    fake.stop()
+
+
+def assert_same_ranking(fan_out, sync):
+    # Same scores in the same order, and the same documents for every score. Documents
+    # with equal scores may come back in any order (Solr breaks ties by internal doc id,
+    # the fan-out by topic), and a tie cut off at k may keep different members.
+    assert [doc["score"] for doc in fan_out] == [doc["score"] for doc in sync]
+    groups = {}
+    for position, docs in enumerate((fan_out, sync)):
+        for doc in docs:
+            groups.setdefault(doc["score"], ([], []))[position].append(doc)
+    last = sync[-1]["score"] if sync else None
+    for score, (fan_out_docs, sync_docs) in groups.items():
+        if score != last:
+            assert sorted(fan_out_docs, key=lambda doc: doc["url"]) == sorted(sync_docs, key=lambda doc: doc["url"])
+
+
+def query_both(indexer, client, query, topics, k=10):
+    sync = [dict(doc) for doc in indexer.query_solr(query, topics, k)]
+    fan_out = asyncio.run(client.query_async(query, topics, k))
+    return sync, fan_out
+
+
+@pytest.mark.parametrize("topics", [[], ["Health"], ["Health", "Sports"], TOPICS])
+@pytest.mark.parametrize("query", ["malaria statistics", "robotics research costs", "facts"])
+def test_fan_out_matches_sync_query(solr, query, topics):
+    _, indexer, client = solr
+    sync, fan_out = query_both(indexer, client, query, topics)
+    assert sync
+    assert_same_ranking(fan_out, sync)
+
+
+def test_fan_out_respects_k(solr):
+    _, indexer, client = solr
+    sync, fan_out = query_both(indexer, client, "facts", TOPICS, k=3)
+    assert len(fan_out) == 3
+    assert_same_ranking(fan_out, sync)
+
+
+@pytest.mark.parametrize("query, topics", [("quantum chromodynamics", ["Health"]), ("malaria", ["Travel"]),
+                                           ("quantum chromodynamics", [])])
+def test_empty_results_match(solr, query, topics):
+    _, indexer, client = solr
+    sync, fan_out = query_both(indexer, client, query, topics)
+    assert sync == fan_out == []
+
+
+def test_error_response_raises_on_both_paths(solr):
+    fake, indexer, client = solr
+    fake.error_status = 500
+    try:
+        with pytest.raises(pysolr.SolrError):
+            indexer.query_solr("malaria", ["Health"])
+        with pytest.raises(aiohttp.ClientResponseError):
+            asyncio.run(client.query_async("malaria", ["Health", "Sports"]))
+    finally:
+        fake.error_status = None
+    # The pooled session keeps working once Solr recovers
+    sync, fan_out = query_both(indexer, client, "malaria", ["Health", "Sports"])
+    assert_same_ranking(fan_out, sync)
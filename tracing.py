@@ -0,0 +1,199 @@
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+
+TRACE_HEADER = "X-Trace-Id"
+# Incoming ids end up in profile file names, so only W3C/Zipkin-shaped hex ids are accepted
+TRACE_ID_PATTERN = re.compile(r"[0-9a-f]{16}|[0-9a-f]{32}")
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class NullSpan:
+    # Returned when the request is not being traced: entering and leaving cost a
+    # contextvar lookup and two no-op calls
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def tag(self, key, value):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Trace:
+    def __init__(self, trace_id: str, profile: bool):
+        self.trace_id = trace_id
+        self.profile = profile
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, profile: bool):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = current_span.get()
+        self.tags = {}
+        self.profiler = cProfile.Profile() if profile and trace.profile else None
+
+    def tag(self, key, value):
+        self.tags[key] = str(value)
+
+    def __enter__(self):
+        self.token = current_span.set(self.span_id)
+        self.start = time.time()
+        self.start_counter = time.perf_counter()
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                self.profiler = None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start_counter
+        if self.profiler is not None:
+            self.profiler.disable()
+            tracer.save_profile(self.profiler, self.trace.trace_id, self.name)
+        current_span.reset(self.token)
+        if exc_type is not None:
+            self.tags["error"] = exc_type.__name__
+        # Zipkin v2 span format, understood by Zipkin, Jaeger and the OpenTelemetry collector
+        record = {
+            "traceId": self.trace.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": int(self.start * 1e6),
+            "duration": max(1, int(duration * 1e6)),
+            "localEndpoint": {"serviceName": "chatbot"},
+            "tags": self.tags,
+        }
+        if self.parent:
+            record["parentId"] = self.parent
+        with self.trace.lock:
+            self.trace.spans.append(record)
+        return False
+
+
+class JsonLinesExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, spans: list):
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+
+
+class HttpExporter:
+    # Posts span batches to a Zipkin-compatible collector (e.g. http://localhost:9411/api/v2/spans)
+    # from a background thread; spans are dropped if the queue is full
+    def __init__(self, url: str, max_queue: int = 1000):
+        self.url = url
+        self.queue = queue.Queue(max_queue)
+        self.worker = None
+        self.worker_pid = None
+
+    def export(self, spans: list):
+        if self.worker is None or self.worker_pid != os.getpid():
+            self.worker = threading.Thread(target=self.run, daemon=True)
+            self.worker_pid = os.getpid()
+            self.worker.start()
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            pass
+
+    def run(self):
+        import requests
+
+        session = requests.Session()
+        while True:
+            spans = self.queue.get()
+            try:
+                session.post(self.url, json=spans, timeout=5)
+            except Exception as e:
+                logging.warning(f"Span export failed: {e}")
+
+
+def make_exporter(target: str):
+    if not target:
+        return None
+    if target.startswith("http://") or target.startswith("https://"):
+        return HttpExporter(target)
+    return JsonLinesExporter(target)
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, profile_rate: float = 0.0, exporter=None,
+                 profile_dir: str = "profiles"):
+        self.sample_rate = sample_rate
+        self.profile_rate = profile_rate
+        self.exporter = exporter
+        self.profile_dir = profile_dir
+
+    def configure(self, sample_rate: float = None, profile_rate: float = None):
+        # Can be called at runtime (see /debug/tracing); the exporter is fixed at startup
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if profile_rate is not None:
+            self.profile_rate = profile_rate
+
+    def settings(self) -> dict:
+        return {"sample_rate": self.sample_rate, "profile_rate": self.profile_rate,
+                "exporter": type(self.exporter).__name__ if self.exporter else None}
+
+    def start_trace(self, trace_id: str = None) -> str:
+        # Always hands back a trace id (to echo to the client); spans are only
+        # recorded for the sampled fraction of requests
+        if not trace_id or not TRACE_ID_PATTERN.fullmatch(trace_id.lower()):
+            trace_id = uuid.uuid4().hex
+        trace_id = trace_id.lower()
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            current_trace.set(Trace(trace_id, random.random() < self.profile_rate))
+        else:
+            current_trace.set(None)
+        return trace_id
+
+    def current_trace(self) -> Trace:
+        return current_trace.get()
+
+    def finish_trace(self, trace: Trace = None):
+        trace = trace or current_trace.get()
+        current_trace.set(None)
+        if trace is None or not trace.spans:
+            return
+        if self.exporter is not None:
+            self.exporter.export(trace.spans)
+
+    def span(self, name: str, profile: bool = False):
+        trace = current_trace.get()
+        if trace is None:
+            return NULL_SPAN
+        return Span(trace, name, profile)
+
+    def save_profile(self, profiler: cProfile.Profile, trace_id: str, name: str):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, f"{trace_id}-{name}.prof"))
+
+
+tracer = Tracer(sample_rate=float(os.environ.get("CHATBOT_TRACE_SAMPLE_RATE", 0)),
+                profile_rate=float(os.environ.get("CHATBOT_PROFILE_RATE", 0)),
+                exporter=make_exporter(os.environ.get("CHATBOT_TRACE_EXPORT", "traces.jsonl")))
@@ -0,0 +1,101 @@
+import argparse
+import logging
+import os
+import time
+
+os.environ.setdefault("CHATBOT_PRELOAD", "0")
+
+import numpy as np
+
+import samples
+from chatbot import WikipediaRetriever
+from classifier import load_classifier
+from fake_solr import FakeSolr
+from indexer import Indexer
+from router import ROUTER_PATH, ConfidenceRouter, coverage, simulate, tune
+from wikiqa import load_wikiqa
+
+FIELD_WEIGHTS = {"title": 1.0, "summary": 3.0}
+
+# chatbot logs every Solr request at DEBUG
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def split(labels: np.ndarray, tune_share: float, seed: int = 0) -> tuple:
+    # Stratified split into (tuning, reporting) index arrays, so both halves keep the
+    # query / chit-chat mix
+    rng = np.random.RandomState(seed)
+    tuning, reporting = [], []
+    for label in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == label))
+        cut = int(round(len(members) * tune_share))
+        tuning.extend(members[:cut])
+        reporting.extend(members[cut:])
+    return np.sort(tuning), np.sort(reporting)
+
+
+def print_outcome(name: str, router: ConfidenceRouter, outcome: dict):
+    print(f"{name:>9}: low {router.low:.2f} high {router.high:.2f} coverage {router.min_coverage:.2f} | "
+          f"accuracy {outcome['accuracy']:.3f}  mean latency {outcome['latency'] * 1000:7.1f}ms  "
+          f"generations {outcome['generations']}  speculative {outcome['speculative']}  "
+          f"cancelled {outcome['cancelled']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the confidence router's thresholds on held-out messages")
+    parser.add_argument("--data", nargs="+", default=["data/WikiQA-dev.tsv", "data/WikiQA-test.tsv"],
+                        help="Corpus the fake Solr serves")
+    parser.add_argument("--vm-ip", default=None, help="Retrieve from a real Solr instead of the local fake")
+    parser.add_argument("--generation-cost", type=float, default=1.0,
+                        help="Seconds per BlenderBot reply (measure with bench_chat.py)")
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Accuracy traded for lower latency")
+    parser.add_argument("--tune-share", type=float, default=0.5,
+                        help="Share of the messages the thresholds are tuned on; the rest is only reported on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=ROUTER_PATH)
+    args = parser.parse_args()
+
+    # The classifier never saw the sample lists; they are split again below so the
+    # thresholds are not reported on the messages they were tuned on
+    texts = samples.queries + samples.chats
+    labels = np.array([0] * len(samples.queries) + [1] * len(samples.chats))
+
+    fake = None
+    if args.vm_ip is None:
+        docs, _ = load_wikiqa(args.data)
+        fake = FakeSolr([{**doc, "id": doc["url"]} for doc in docs], FIELD_WEIGHTS)
+        indexer = Indexer("IRF24P3", "127.0.0.1", ["title", "summary"], FIELD_WEIGHTS, port=fake.start())
+    else:
+        indexer = Indexer("IRF24P3", args.vm_ip, ["title", "summary"], FIELD_WEIGHTS)
+    retriever = WikipediaRetriever(rerank_top_n=0, indexer=indexer)
+
+    probabilities = load_classifier().predict_proba(texts)[:, 1]
+    coverages, latencies = [], []
+    for text in texts:
+        start = time.perf_counter()
+        response = retriever.get_data(text, [])
+        latencies.append(time.perf_counter() - start)
+        coverages.append(coverage(text, WikipediaRetriever.answer_summary(response)))
+    if fake is not None:
+        fake.stop()
+    coverages = np.array(coverages)
+    retrieval_cost = float(np.mean(latencies))
+    print(f"{len(texts)} held-out messages, retrieval {retrieval_cost * 1000:.1f}ms, "
+          f"generation {args.generation_cost * 1000:.0f}ms")
+
+    costs = (retrieval_cost, args.generation_cost)
+    tuning, reporting = split(labels, args.tune_share, args.seed)
+    router, _ = tune(probabilities[tuning], coverages[tuning], labels[tuning], *costs, tolerance=args.tolerance)
+    print(f"tuned on {len(tuning)} messages, reported on the other {len(reporting)}")
+
+    held_out = (probabilities[reporting], coverages[reporting], labels[reporting])
+    hard = ConfidenceRouter(0.5, 0.5, 1.0)
+    print_outcome("hard 0.5", hard, simulate(hard, *held_out, *costs))
+    default = ConfidenceRouter()
+    print_outcome("default", default, simulate(default, *held_out, *costs))
+    outcome = simulate(router, *held_out, *costs)
+    print_outcome("tuned", router, outcome)
+
+    router.save(args.output, {**outcome, "tuning_messages": len(tuning), "messages": len(reporting),
+                              "retrieval_cost": retrieval_cost, "generation_cost": args.generation_cost})
+    print(f"Saved to {args.output}")
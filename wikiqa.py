@@ -0,0 +1,33 @@
+import csv
+from collections import OrderedDict
+
+
+def load_wikiqa(paths: list) -> tuple:
+    # Turns WikiQA TSVs into a document corpus (one doc per DocumentID, sentences
+    # joined as the summary) and a list of questions with their gold document
+    docs = OrderedDict()
+    questions = OrderedDict()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                doc = docs.setdefault(row["DocumentID"], {
+                    "title": row["DocumentTitle"],
+                    "summary": [],
+                    "url": row["DocumentID"],
+                    "topic": "WikiQA",
+                })
+                if row["Sentence"] not in doc["summary"]:
+                    doc["summary"].append(row["Sentence"])
+
+                question = questions.setdefault(row["QuestionID"], {
+                    "id": row["QuestionID"],
+                    "question": row["Question"],
+                    "document_id": row["DocumentID"],
+                    "answers": [],
+                })
+                if row.get("Label") == "1":
+                    question["answers"].append(row["Sentence"])
+
+    for doc in docs.values():
+        doc["summary"] = " ".join(doc["summary"])
+    return list(docs.values()), list(questions.values())